@@ -0,0 +1,99 @@
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Tk界面的后台加载器
+# 网络请求和指标计算放到工作线程执行，完成的结果放进队列，由Tk主线程定时取出并更新界面。
+# 每个通道（如"stock"）只保留最新一次请求：用户切换股票后，旧请求未开始的直接取消，
+# 已经在执行的结果到达时被丢弃，不会覆盖新股票的界面
+
+
+class BackgroundLoader:
+    def __init__(self, root, max_workers=2, poll_interval=50):
+        """初始化后台加载器
+
+        Args:
+            root: Tk根窗口，用于在主线程中定时处理完成的结果
+            max_workers: 工作线程数
+            poll_interval: 检查结果队列的间隔（毫秒）
+        """
+        self.root = root
+        self.poll_interval = poll_interval
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='loader')
+        self.results = queue.Queue()
+
+        self._lock = threading.Lock()
+        self._generations = {}
+        self._futures = {}
+        self._closed = False
+
+        self.root.after(self.poll_interval, self._poll)
+
+    def submit(self, channel, func, *args, on_done=None, on_error=None):
+        """在工作线程中执行func(*args)，完成后在主线程中调用on_done(结果)或on_error(异常)
+
+        同一通道的新请求会使旧请求失效
+
+        Returns:
+            int: 本次请求的序号
+        """
+        with self._lock:
+            generation = self._generations.get(channel, 0) + 1
+            self._generations[channel] = generation
+            previous = self._futures.get(channel)
+            if previous is not None:
+                # 尚未开始执行的旧请求直接取消
+                previous.cancel()
+            future = self.executor.submit(self._run, channel, generation, func, args, on_done, on_error)
+            self._futures[channel] = future
+        return generation
+
+    def is_current(self, channel, generation):
+        """请求是否仍是该通道的最新请求"""
+        with self._lock:
+            return self._generations.get(channel) == generation
+
+    def cancel(self, channel):
+        """使该通道的所有请求失效"""
+        with self._lock:
+            self._generations[channel] = self._generations.get(channel, 0) + 1
+            previous = self._futures.pop(channel, None)
+            if previous is not None:
+                previous.cancel()
+
+    def _run(self, channel, generation, func, args, on_done, on_error):
+        if not self.is_current(channel, generation):
+            return
+        try:
+            result, error = func(*args), None
+        except Exception as e:
+            result, error = None, e
+        self.results.put((channel, generation, result, error, on_done, on_error))
+
+    def _poll(self):
+        """在Tk主线程中处理已完成的请求，过期的结果直接丢弃"""
+        while True:
+            try:
+                channel, generation, result, error, on_done, on_error = self.results.get_nowait()
+            except queue.Empty:
+                break
+            if not self.is_current(channel, generation):
+                continue
+            try:
+                if error is not None:
+                    if on_error:
+                        on_error(error)
+                    else:
+                        print(f"后台任务出错: {error}")
+                elif on_done:
+                    on_done(result)
+            except Exception as e:
+                print(f"更新界面出错: {e}")
+
+        if not self._closed:
+            self.root.after(self.poll_interval, self._poll)
+
+    def shutdown(self):
+        """停止加载器，取消尚未开始的请求"""
+        self._closed = True
+        self.executor.shutdown(wait=False, cancel_futures=True)
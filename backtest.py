@@ -0,0 +1,268 @@
+import os
+import time
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from bar_store import BarStore
+from indicators import pivot_panel, rolling_mean
+
+# 移动平均策略的离线回测引擎
+# 按strategy_example.MovingAverageStrategy的规则回放本地日线：
+# 金叉且放量买入、死叉卖出、止损止盈风控。
+# 信号在整段历史上一次性计算，持仓按交易日推进，每一步对全部股票做数组运算
+
+
+class MovingAverageBacktester:
+    def __init__(self, short_window=5, long_window=20, stop_loss=0.05, take_profit=0.10,
+                 volume_ratio=1.2, volume_window=10, quantity=1000, fee_rate=0.0,
+                 initial_capital=1000000, intraday_stops=True):
+        """初始化回测引擎，参数默认值与MovingAverageStrategy一致
+
+        Args:
+            short_window: 短期均线周期
+            long_window: 长期均线周期
+            stop_loss: 止损比例
+            take_profit: 止盈比例
+            volume_ratio: 买入要求的成交量与均量之比
+            volume_window: 均量周期
+            quantity: 每次买入的股数
+            fee_rate: 单边交易费率
+            initial_capital: 初始资金，用于计算收益率、夏普比率和回撤（不限制开仓数量）
+            intraday_stops: 是否用日内最高/最低价触发止损止盈；为False时只用收盘价判断
+        """
+        self.short_window = short_window
+        self.long_window = long_window
+        self.stop_loss = stop_loss
+        self.take_profit = take_profit
+        self.volume_ratio = volume_ratio
+        self.volume_window = volume_window
+        self.quantity = quantity
+        self.fee_rate = fee_rate
+        self.initial_capital = initial_capital
+        self.intraday_stops = intraday_stops
+        self.output_dir = 'backtest_results'
+
+        # 确保输出目录存在
+        if not os.path.exists(self.output_dir):
+            os.makedirs(self.output_dir)
+
+    def compute_signals(self, close, vol):
+        """在整段历史上计算买卖信号
+
+        Args:
+            close: 收盘价，日期 × 股票 的二维数组
+            vol: 成交量，形状同close
+
+        Returns:
+            tuple: (买入信号, 卖出信号)，均为布尔二维数组
+        """
+        ma_short = rolling_mean(close, self.short_window)
+        ma_long = rolling_mean(close, self.long_window)
+        vol_mean = rolling_mean(vol, self.volume_window)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            above = ma_short > ma_long
+            below = ma_short < ma_long
+            prev_not_above = np.zeros_like(above)
+            prev_not_below = np.zeros_like(below)
+            # 前一日短均线不高于（不低于）长均线，NaN时不构成交叉
+            prev_not_above[1:] = ma_short[:-1] <= ma_long[:-1]
+            prev_not_below[1:] = ma_short[:-1] >= ma_long[:-1]
+
+            golden_cross = above & prev_not_above
+            death_cross = below & prev_not_below
+            # 成交量比均量放大
+            volume_ok = vol / vol_mean > self.volume_ratio
+
+        return golden_cross & volume_ok, death_cross
+
+    def run(self, panel):
+        """回测
+
+        Args:
+            panel: 字段名 -> DataFrame（日期 × 股票），需要open、high、low、close、vol
+
+        Returns:
+            dict: {'equity': 每日权益, 'trades': 成交记录, 'stats': 统计指标}
+        """
+        close_frame = panel['close']
+        arrays = {'close': close_frame.to_numpy(dtype=float),
+                  # 停牌日按最近收盘价计算持仓市值
+                  'mark': close_frame.ffill().to_numpy(dtype=float)}
+        for field in ('open', 'high', 'low', 'vol'):
+            arrays[field] = panel[field].reindex_like(close_frame).to_numpy(dtype=float)
+        return self.run_arrays(arrays, close_frame.index, close_frame.columns)
+
+    def run_arrays(self, arrays, dates, codes, signals=None):
+        """在NumPy数组上回测，数组可以是np.load(mmap_mode='r')得到的内存映射
+
+        Args:
+            arrays: 字段名 -> 二维数组（日期 × 股票），需要open、high、low、close、vol、mark（前值填充的收盘价）
+            dates: 交易日期
+            codes: 股票代码
+            signals: compute_signals的结果，参数扫描时同一组均线参数可以复用
+
+        Returns:
+            dict: {'equity': 每日权益, 'trades': 成交记录, 'stats': 统计指标}
+        """
+        start_time = time.perf_counter()
+        open_, high, low, close = arrays['open'], arrays['high'], arrays['low'], arrays['close']
+        mark = arrays['mark']
+
+        if signals is None:
+            signals = self.compute_signals(close, arrays['vol'])
+        buy_signal, sell_signal = signals
+
+        rows, count = close.shape
+        held = np.zeros(count, dtype=bool)
+        entry_price = np.full(count, np.nan)
+        entry_index = np.full(count, -1)
+        realized = 0.0
+        equity = np.empty(rows)
+        trades = []
+
+        def close_positions(mask, t, price, reason):
+            nonlocal realized
+            idx = np.nonzero(mask)[0]
+            if len(idx) == 0:
+                return
+            fill = price[idx]
+            pnl = (fill - entry_price[idx]) * self.quantity - fill * self.quantity * self.fee_rate
+            realized += pnl.sum()
+            trades.append((idx, entry_index[idx], np.full(len(idx), t), entry_price[idx], fill, pnl, reason))
+            held[idx] = False
+            entry_price[idx] = np.nan
+            entry_index[idx] = -1
+
+        with np.errstate(invalid='ignore'):
+            for t in range(rows):
+                # 风险管理：检查前一交易日及更早买入的持仓
+                if self.intraday_stops:
+                    stop_price = entry_price * (1 - self.stop_loss)
+                    profit_price = entry_price * (1 + self.take_profit)
+                    hit_stop = held & (low[t] <= stop_price)
+                    hit_profit = held & ~hit_stop & (high[t] >= profit_price)
+                    # 跳空时按开盘价成交
+                    close_positions(hit_stop, t, np.fmin(open_[t], stop_price), "止损")
+                    close_positions(hit_profit, t, np.fmax(open_[t], profit_price), "止盈")
+                else:
+                    return_rate = close[t] / entry_price - 1
+                    hit_stop = held & (return_rate <= -self.stop_loss)
+                    hit_profit = held & ~hit_stop & (return_rate >= self.take_profit)
+                    close_positions(hit_stop, t, close[t], "止损")
+                    close_positions(hit_profit, t, close[t], "止盈")
+
+                # 死叉卖出
+                close_positions(held & sell_signal[t], t, close[t], "死叉")
+
+                # 金叉放量买入
+                buy = ~held & buy_signal[t]
+                if buy.any():
+                    held[buy] = True
+                    entry_price[buy] = close[t][buy]
+                    entry_index[buy] = t
+                    realized -= (close[t][buy] * self.quantity * self.fee_rate).sum()
+
+                unrealized = np.where(held, mark[t] - entry_price, 0.0).sum() * self.quantity
+                equity[t] = self.initial_capital + realized + unrealized
+
+        # 期末仍持有的仓位按最后价格记录
+        close_positions(held.copy(), rows - 1, mark[-1], "持仓中")
+
+        equity = pd.Series(equity, index=dates, name='equity')
+        trades = self._build_trades(trades, dates, codes)
+        stats = self._calculate_stats(equity, trades)
+        stats['elapsed'] = time.perf_counter() - start_time
+        return {'equity': equity, 'trades': trades, 'stats': stats}
+
+    def run_long(self, df):
+        """对长表（包含ts_code、trade_date、open、high、low、close、vol列）回测"""
+        panel = pivot_panel(df, fields=('open', 'high', 'low', 'close', 'vol'))
+        return self.run(panel)
+
+    def _build_trades(self, trades, dates, codes):
+        columns = ['ts_code', 'entry_date', 'exit_date', 'entry_price', 'exit_price', 'pnl', 'return', 'reason']
+        if not trades:
+            return pd.DataFrame(columns=columns)
+
+        idx, entry_idx, exit_idx, entry_price, exit_price, pnl, reasons = zip(*trades)
+        entry_price = np.concatenate(entry_price)
+        exit_price = np.concatenate(exit_price)
+        result = pd.DataFrame({
+            'ts_code': np.asarray(codes)[np.concatenate(idx)],
+            'entry_date': np.asarray(dates)[np.concatenate(entry_idx)],
+            'exit_date': np.asarray(dates)[np.concatenate(exit_idx)],
+            'entry_price': entry_price,
+            'exit_price': exit_price,
+            'pnl': np.concatenate(pnl),
+            'return': exit_price / entry_price - 1,
+            'reason': np.repeat(reasons, [len(i) for i in idx]),
+        })
+        return result.sort_values(['entry_date', 'ts_code']).reset_index(drop=True)
+
+    def _calculate_stats(self, equity, trades):
+        daily_return = equity.pct_change().dropna()
+        std = daily_return.std()
+        drawdown = 1 - equity / equity.cummax()
+        closed = trades[trades['reason'] != "持仓中"]
+        years = max(len(equity) / 252, 1 / 252)
+
+        return {
+            'final_equity': float(equity.iloc[-1]),
+            'total_return': float(equity.iloc[-1] / self.initial_capital - 1),
+            'annual_return': float((equity.iloc[-1] / self.initial_capital) ** (1 / years) - 1),
+            'sharpe': float(daily_return.mean() / std * np.sqrt(252)) if std and std > 0 else 0.0,
+            'max_drawdown': float(drawdown.max()),
+            'trade_count': int(len(closed)),
+            'win_rate': float((closed['pnl'] > 0).mean()) if len(closed) else 0.0,
+            'avg_return': float(closed['return'].mean()) if len(closed) else 0.0,
+        }
+
+    def print_summary(self, result):
+        """打印回测统计"""
+        stats = result['stats']
+        print("\n回测结果")
+        print("==================")
+        print(f"期末权益: {stats['final_equity']:,.2f}")
+        print(f"总收益率: {stats['total_return']:.2%}")
+        print(f"年化收益率: {stats['annual_return']:.2%}")
+        print(f"夏普比率: {stats['sharpe']:.2f}")
+        print(f"最大回撤: {stats['max_drawdown']:.2%}")
+        print(f"交易次数: {stats['trade_count']}")
+        print(f"胜率: {stats['win_rate']:.2%}")
+        print(f"平均单笔收益率: {stats['avg_return']:.2%}")
+        print(f"耗时: {stats['elapsed']:.2f} 秒")
+
+    def save_results(self, result, name=None):
+        """保存每日权益和成交记录到CSV"""
+        name = name or datetime.now().strftime('%Y%m%d_%H%M%S')
+        equity_path = os.path.join(self.output_dir, f"equity_{name}.csv")
+        trades_path = os.path.join(self.output_dir, f"trades_{name}.csv")
+        result['equity'].to_csv(equity_path, encoding='utf-8-sig')
+        result['trades'].to_csv(trades_path, index=False, encoding='utf-8-sig')
+        print(f"回测结果已保存至 {equity_path} 和 {trades_path}")
+
+
+def main():
+    """用本地K线库中的全部股票回测移动平均策略"""
+    print("移动平均策略回测")
+    print("==================")
+
+    start_date = input("请输入开始日期(YYYYMMDD，可留空): ") or None
+    end_date = input("请输入结束日期(YYYYMMDD，可留空): ") or None
+
+    store = BarStore('tushare_data/bars')
+    df = store.read_many(start_date=start_date, end_date=end_date,
+                         columns=['open', 'high', 'low', 'close', 'vol'])
+    if df.empty:
+        print("本地K线库为空，请先通过TushareCrawler下载数据")
+        return
+
+    backtester = MovingAverageBacktester()
+    result = backtester.run_long(df)
+    backtester.print_summary(result)
+    backtester.save_results(result)
+
+
+if __name__ == "__main__":
+    main()
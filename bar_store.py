@@ -0,0 +1,279 @@
+import os
+import json
+from datetime import datetime, timedelta
+import pandas as pd
+
+# 本地列式K线库
+# 按 股票代码/年份 分区存储日线数据，并记录每只股票已同步的日期区间，
+# 这样每次只需要从Tushare拉取缺失的部分
+
+try:
+    import pyarrow
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+    print("pyarrow未安装，本地K线库将退化为CSV存储，推荐安装: pip install pyarrow")
+
+
+def next_day(date_str):
+    """返回YYYYMMDD格式日期的下一天"""
+    return (datetime.strptime(date_str, '%Y%m%d') + timedelta(days=1)).strftime('%Y%m%d')
+
+
+def prev_day(date_str):
+    """返回YYYYMMDD格式日期的前一天"""
+    return (datetime.strptime(date_str, '%Y%m%d') - timedelta(days=1)).strftime('%Y%m%d')
+
+
+def read_frame(path, columns=None):
+    """读取一个分区文件（Parquet或CSV）"""
+    if path.endswith('.parquet'):
+        return pd.read_parquet(path, columns=columns)
+    df = pd.read_csv(path, dtype={'trade_date': str, 'ts_code': str})
+    if columns:
+        df = df[[c for c in columns if c in df.columns]]
+    return df
+
+
+def write_frame(df, path):
+    """写入一个分区文件，先写临时文件再替换，避免中断时损坏已有数据"""
+    tmp_path = path + '.tmp'
+    if path.endswith('.parquet'):
+        df.to_parquet(tmp_path, index=False)
+    else:
+        df.to_csv(tmp_path, index=False, encoding='utf-8-sig')
+    os.replace(tmp_path, path)
+
+
+class BarStore:
+    def __init__(self, root_dir='tushare_data/bars'):
+        """初始化本地K线库
+
+        Args:
+            root_dir: 存储根目录，目录结构为 root_dir/000001_SZ/2024.parquet
+        """
+        self.root_dir = root_dir
+        self.file_ext = '.parquet' if PARQUET_AVAILABLE else '.csv'
+
+        # 确保存储目录存在
+        if not os.path.exists(self.root_dir):
+            os.makedirs(self.root_dir)
+
+    def _symbol_dir(self, ts_code):
+        return os.path.join(self.root_dir, ts_code.replace('.', '_'))
+
+    def _meta_path(self, ts_code):
+        return os.path.join(self._symbol_dir(ts_code), '_meta.json')
+
+    def _partition_path(self, ts_code, year):
+        return os.path.join(self._symbol_dir(ts_code), f"{year}{self.file_ext}")
+
+    def symbols(self):
+        """列出库中已有的股票代码"""
+        result = []
+        for name in sorted(os.listdir(self.root_dir)):
+            if os.path.exists(os.path.join(self.root_dir, name, '_meta.json')):
+                result.append(name.replace('_', '.'))
+        return result
+
+    def get_coverage(self, ts_code):
+        """获取某只股票已同步的日期区间
+
+        Returns:
+            dict: {'first_date': 'YYYYMMDD', 'last_date': 'YYYYMMDD'}，没有记录时返回None
+        """
+        meta_path = self._meta_path(ts_code)
+        if not os.path.exists(meta_path):
+            return None
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _save_coverage(self, ts_code, first_date, last_date):
+        meta = {
+            'ts_code': ts_code,
+            'first_date': first_date,
+            'last_date': last_date,
+            'updated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        }
+        meta_path = self._meta_path(ts_code)
+        tmp_path = meta_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, meta_path)
+
+    def missing_ranges(self, ts_code, start_date, end_date):
+        """计算请求区间中尚未同步的部分
+
+        Returns:
+            list: [(start_date, end_date), ...]，为空表示本地数据已完整
+        """
+        coverage = self.get_coverage(ts_code)
+        if not coverage or not coverage.get('last_date'):
+            return [(start_date, end_date)]
+
+        ranges = []
+        first_date = coverage['first_date']
+        last_date = coverage['last_date']
+        # 缺失的头部
+        if start_date < first_date:
+            ranges.append((start_date, min(prev_day(first_date), end_date)))
+        # 缺失的尾部
+        if end_date > last_date:
+            ranges.append((max(next_day(last_date), start_date), end_date))
+        return ranges
+
+    def write(self, ts_code, df, start_date, end_date):
+        """把一次拉取的结果合并进本地库并更新同步区间
+
+        Args:
+            ts_code: 股票代码
+            df: pro.daily返回的数据，可以为空
+            start_date: 本次拉取的开始日期
+            end_date: 本次拉取的结束日期
+        """
+        symbol_dir = self._symbol_dir(ts_code)
+        if not os.path.exists(symbol_dir):
+            os.makedirs(symbol_dir)
+
+        received_last = None
+        if df is not None and not df.empty:
+            df = df.copy()
+            df['trade_date'] = df['trade_date'].astype(str)
+            received_last = df['trade_date'].max()
+
+            # 按年份分区合并，同一交易日以新数据为准
+            for year, part in df.groupby(df['trade_date'].str[:4]):
+                path = self._partition_path(ts_code, year)
+                if os.path.exists(path):
+                    part = pd.concat([read_frame(path), part], ignore_index=True)
+                part = part.drop_duplicates(subset='trade_date', keep='last')
+                part = part.sort_values('trade_date').reset_index(drop=True)
+                write_frame(part, path)
+
+        # 已经过去的日期不会再有新数据，可以直接记为已同步；
+        # 当天的数据可能尚未发布，只记录实际收到的最后一个交易日
+        today = datetime.now().strftime('%Y%m%d')
+        synced_last = received_last
+        if end_date < today and (synced_last is None or end_date > synced_last):
+            synced_last = end_date
+        if synced_last is None:
+            return
+
+        coverage = self.get_coverage(ts_code)
+        if coverage and coverage.get('last_date') and start_date <= next_day(coverage['last_date']) \
+                and synced_last >= prev_day(coverage['first_date']):
+            # 与已有区间相连，合并
+            first_date = min(coverage['first_date'], start_date)
+            last_date = max(coverage['last_date'], synced_last)
+        else:
+            # 中间有空缺，只记录本次区间，空缺部分下次会重新拉取
+            first_date = start_date
+            last_date = synced_last
+        self._save_coverage(ts_code, first_date, last_date)
+
+    def _market_dates_path(self):
+        return os.path.join(self.root_dir, '_market_dates.json')
+
+    def get_synced_market_dates(self):
+        """获取已按交易日整体同步过的日期集合（全市场截面）"""
+        path = self._market_dates_path()
+        if not os.path.exists(path):
+            return set()
+        with open(path, 'r', encoding='utf-8') as f:
+            return set(json.load(f))
+
+    def mark_market_dates(self, trade_dates):
+        """记录已按交易日整体同步的日期"""
+        dates = self.get_synced_market_dates() | set(trade_dates)
+        path = self._market_dates_path()
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(sorted(dates), f)
+        os.replace(tmp_path, path)
+
+    def write_cross_sections(self, df, start_date, end_date):
+        """把按交易日拉取的全市场截面拆分写入各股票的分区
+
+        Args:
+            df: 多个交易日的pro.daily(trade_date=...)结果拼接而成的数据
+            start_date: 本次截面覆盖的开始日期
+            end_date: 本次截面覆盖的结束日期
+
+        Returns:
+            int: 写入的股票数量
+        """
+        if df is None or df.empty:
+            return 0
+        count = 0
+        for ts_code, part in df.groupby('ts_code'):
+            self.write(ts_code, part, start_date, end_date)
+            count += 1
+        return count
+
+    def read(self, ts_code, start_date=None, end_date=None, columns=None):
+        """从本地库读取日线数据
+
+        Args:
+            ts_code: 股票代码
+            start_date: 开始日期（YYYYMMDD，可为空）
+            end_date: 结束日期（YYYYMMDD，可为空）
+            columns: 只读取指定列，为空则读取全部列
+
+        Returns:
+            pandas.DataFrame: 按trade_date升序排列的日线数据
+        """
+        symbol_dir = self._symbol_dir(ts_code)
+        if not os.path.exists(symbol_dir):
+            return pd.DataFrame()
+
+        if columns is not None and 'trade_date' not in columns:
+            columns = ['trade_date'] + list(columns)
+
+        frames = []
+        for name in sorted(os.listdir(symbol_dir)):
+            if not name.endswith(self.file_ext):
+                continue
+            year = name[:4]
+            # 只读取与请求区间有交集的年份分区
+            if start_date and year < start_date[:4]:
+                continue
+            if end_date and year > end_date[:4]:
+                continue
+            frames.append(read_frame(os.path.join(symbol_dir, name), columns))
+
+        if not frames:
+            return pd.DataFrame()
+
+        df = pd.concat(frames, ignore_index=True)
+        if start_date:
+            df = df[df['trade_date'] >= start_date]
+        if end_date:
+            df = df[df['trade_date'] <= end_date]
+        return df.reset_index(drop=True)
+
+    def read_many(self, ts_codes=None, start_date=None, end_date=None, columns=None):
+        """读取多只股票的日线数据并拼接为长表，可直接交给indicators.calculate_long_indicators
+
+        Args:
+            ts_codes: 股票代码列表，为空则读取库中全部股票
+            start_date: 开始日期（YYYYMMDD，可为空）
+            end_date: 结束日期（YYYYMMDD，可为空）
+            columns: 只读取指定列，为空则读取全部列
+
+        Returns:
+            pandas.DataFrame: 包含ts_code列的长表
+        """
+        if ts_codes is None:
+            ts_codes = self.symbols()
+
+        frames = []
+        for ts_code in ts_codes:
+            df = self.read(ts_code, start_date, end_date, columns)
+            if df.empty:
+                continue
+            df['ts_code'] = ts_code
+            frames.append(df)
+
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames, ignore_index=True)
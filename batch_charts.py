@@ -0,0 +1,284 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+import pandas as pd
+import matplotlib
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import PolyCollection
+import matplotlib.dates as mdates
+from bar_store import BarStore
+from indicators import calculate_indicators
+
+# 批量绘制技术分析图表
+# 与StockAnalyzer.plot_*画相同的五张图（股价、成交量、MACD、KDJ、布林带），但不经过pyplot：
+# 每个进程只创建一次五个Figure模板（坐标轴、标题、图例、线条对象），之后每只股票只替换线条数据和坐标范围，
+# 用Agg后端直接保存为PNG或SVG。多只股票分块交给进程池，每只股票的五张图在一次调用中画完
+
+# 每张图: (文件名后缀, 图表尺寸, 标题, Y轴标题, [(列名, 图例)], 柱状图列名)
+PANELS = (
+    ('price', (12, 6), '股价走势图', '价格',
+     [('close', '收盘价'), ('MA5', '5日均线'), ('MA10', '10日均线'), ('MA20', '20日均线'), ('MA30', '30日均线')], None),
+    ('volume', (12, 4), '成交量', '成交量', [], 'vol'),
+    ('macd', (12, 4), 'MACD', '值', [('DIF', 'DIF'), ('DEA', 'DEA')], 'MACD'),
+    ('kdj', (12, 4), 'KDJ', '值', [('K', 'K'), ('D', 'D'), ('J', 'J')], None),
+    ('boll', (12, 4), '布林带', '价格',
+     [('close', '收盘价'), ('BOLL_UPPER', '上轨'), ('BOLL_MIDDLE', '中轨'), ('BOLL_LOWER', '下轨')], None),
+)
+
+FORMATS = ('png', 'svg')
+
+
+def chart_path(output_dir, ts_code, panel, fmt='png'):
+    """图表文件路径，命名与StockAnalyzer.plot_*相同"""
+    return os.path.join(output_dir, f"{ts_code.replace('.', '_')}_{panel}.{fmt}")
+
+
+def _value_range(arrays):
+    values = np.concatenate([a[np.isfinite(a)] for a in arrays]) if arrays else np.empty(0)
+    if values.size == 0:
+        return None
+    low, high = float(values.min()), float(values.max())
+    margin = (high - low) * 0.05 or max(abs(high) * 0.05, 0.5)
+    return low - margin, high + margin
+
+
+class ChartRenderer:
+    def __init__(self, output_dir='analysis_results', fmt='png', dpi=100):
+        """创建五张图的模板
+
+        Args:
+            output_dir: 图表保存目录
+            fmt: 图片格式，png或svg
+            dpi: 分辨率
+        """
+        if fmt not in FORMATS:
+            raise ValueError(f"不支持的图片格式: {fmt}，可选: {', '.join(FORMATS)}")
+        self.output_dir = output_dir
+        self.fmt = fmt
+        self.dpi = dpi
+
+        # 确保输出目录存在
+        if not os.path.exists(self.output_dir):
+            os.makedirs(self.output_dir)
+
+        matplotlib.rcParams['font.sans-serif'] = ['SimHei', 'Microsoft YaHei']
+        matplotlib.rcParams['axes.unicode_minus'] = False
+        self.templates = [self._create_template(*panel) for panel in PANELS]
+
+    def _create_template(self, name, figsize, title, ylabel, lines, bar_column):
+        figure = Figure(figsize=figsize, dpi=self.dpi)
+        FigureCanvasAgg(figure)
+        ax = figure.add_subplot(111)
+        ax.xaxis_date()
+        locator = mdates.AutoDateLocator()
+        ax.xaxis.set_major_locator(locator)
+        ax.xaxis.set_major_formatter(mdates.AutoDateFormatter(locator))
+        ax.set_xlabel('日期')
+        ax.set_ylabel(ylabel)
+        ax.grid(True)
+
+        line_artists = []
+        for column, label in lines:
+            line, = ax.plot([], [], label=label)
+            line_artists.append((column, line))
+        bars = None
+        if bar_column:
+            bars = PolyCollection([], alpha=0.7, linewidths=0)
+            ax.add_collection(bars)
+        if line_artists:
+            # 固定图例位置，避免每次保存都搜索最佳位置
+            ax.legend(loc='upper left')
+
+        return {'name': name, 'figure': figure, 'ax': ax, 'title': title,
+                'lines': line_artists, 'bar_column': bar_column, 'bars': bars}
+
+    def _fill(self, template, x, df):
+        """把一只股票的数据放进模板"""
+        arrays = []
+        for column, line in template['lines']:
+            y = df[column].to_numpy(dtype=float)
+            line.set_data(x, y)
+            arrays.append(y)
+
+        bar_column = template['bar_column']
+        if bar_column:
+            y = df[bar_column].to_numpy(dtype=float)
+            verts = np.empty((len(x), 4, 2))
+            verts[:, :, 0] = x[:, None] + [-0.4, -0.4, 0.4, 0.4]
+            verts[:, :, 1] = np.column_stack([np.zeros(len(y)), y, y, np.zeros(len(y))])
+            template['bars'].set_verts(np.nan_to_num(verts))
+            if bar_column == 'MACD':
+                template['bars'].set_facecolors(np.where(y > 0, 'red', 'green'))
+            else:
+                template['bars'].set_facecolor('blue')
+            arrays.extend([y, np.zeros(1)])
+
+        ax = template['ax']
+        ax.set_xlim(x[0] - 1, x[-1] + 1)
+        y_range = _value_range(arrays)
+        if y_range:
+            ax.set_ylim(*y_range)
+
+    def render(self, df, ts_code):
+        """画一只股票的五张图并保存
+
+        Args:
+            df: 以日期为索引、包含技术指标的DataFrame（calculate_indicators的结果）
+            ts_code: 股票代码
+
+        Returns:
+            list: 保存的文件路径，没有数据时返回空列表
+        """
+        if df is None or df.empty:
+            return []
+
+        x = mdates.date2num(pd.DatetimeIndex(df.index).to_pydatetime())
+        paths = []
+        for template in self.templates:
+            self._fill(template, x, df)
+            template['ax'].set_title(f"{ts_code} {template['title']}")
+            path = chart_path(self.output_dir, ts_code, template['name'], self.fmt)
+            template['figure'].savefig(path, format=self.fmt)
+            paths.append(path)
+        return paths
+
+
+# 工作进程中的模板和数据源
+_worker_renderer = None
+_worker_store = None
+
+
+def _init_worker(output_dir, fmt, dpi, store_dir):
+    """工作进程初始化：选择Agg后端并创建一次图表模板"""
+    global _worker_renderer, _worker_store
+    matplotlib.use('Agg')
+    _worker_renderer = ChartRenderer(output_dir, fmt, dpi)
+    _worker_store = BarStore(store_dir) if store_dir else None
+
+
+def _render_chunk(items, start_date, end_date):
+    """渲染一批股票
+
+    Args:
+        items: [(股票代码, 含指标的DataFrame或None)]，DataFrame为None时从本地K线库读取并计算指标
+
+    Returns:
+        list: [(股票代码, 文件路径列表或None, 错误信息或None)]
+    """
+    results = []
+    for ts_code, df in items:
+        try:
+            if df is None:
+                bars = _worker_store.read(ts_code, start_date, end_date)
+                if not bars.empty:
+                    bars['trade_date'] = pd.to_datetime(bars['trade_date'])
+                    df = calculate_indicators(bars.set_index('trade_date'))
+            results.append((ts_code, _worker_renderer.render(df, ts_code), None))
+        except Exception as e:
+            results.append((ts_code, None, str(e)))
+    return results
+
+
+class BatchChartRenderer:
+    def __init__(self, output_dir='analysis_results', fmt='png', dpi=100, max_workers=None, chunk_size=20,
+                 store_dir='tushare_data/bars'):
+        """初始化批量图表渲染器
+
+        Args:
+            output_dir: 图表保存目录
+            fmt: 图片格式，png或svg
+            dpi: 分辨率
+            max_workers: 进程数，默认为CPU核数
+            chunk_size: 每次交给工作进程的股票数量
+            store_dir: 本地K线库目录，render_store从这里读取数据
+        """
+        if fmt not in FORMATS:
+            raise ValueError(f"不支持的图片格式: {fmt}，可选: {', '.join(FORMATS)}")
+        self.output_dir = output_dir
+        self.fmt = fmt
+        self.dpi = dpi
+        self.max_workers = max_workers or os.cpu_count()
+        self.chunk_size = chunk_size
+        self.store_dir = store_dir
+
+        # 确保输出目录存在
+        if not os.path.exists(self.output_dir):
+            os.makedirs(self.output_dir)
+
+    def _run(self, items, start_date=None, end_date=None):
+        chunks = [items[i:i + self.chunk_size] for i in range(0, len(items), self.chunk_size)]
+        start_time = time.perf_counter()
+        rendered = {}
+        failed = {}
+        with ProcessPoolExecutor(max_workers=self.max_workers, initializer=_init_worker,
+                                 initargs=(self.output_dir, self.fmt, self.dpi, self.store_dir)) as executor:
+            futures = [executor.submit(_render_chunk, chunk, start_date, end_date) for chunk in chunks]
+            for done, future in enumerate(as_completed(futures), 1):
+                try:
+                    results = future.result()
+                except Exception as e:
+                    print(f"渲染进程出错: {e}")
+                    continue
+                for ts_code, paths, error in results:
+                    if error:
+                        failed[ts_code] = error
+                    elif paths:
+                        rendered[ts_code] = paths
+                print(f"进度: {done}/{len(chunks)} 批")
+
+        for ts_code, error in failed.items():
+            print(f"{ts_code} 绘图失败: {error}")
+        elapsed = time.perf_counter() - start_time
+        print(f"共绘制 {len(rendered)} 只股票、{sum(len(p) for p in rendered.values())} 张图，耗时 {elapsed:.1f} 秒")
+        return rendered
+
+    def render(self, frames):
+        """并行绘制已计算好指标的多只股票
+
+        Args:
+            frames: 股票代码 -> 含技术指标的DataFrame
+
+        Returns:
+            dict: 股票代码 -> 保存的文件路径列表
+        """
+        columns = sorted({col for panel in PANELS for col, _ in panel[4]} | {'vol', 'MACD'})
+        items = [(ts_code, df[[col for col in columns if col in df.columns]])
+                 for ts_code, df in frames.items() if df is not None and not df.empty]
+        return self._run(items)
+
+    def render_store(self, ts_codes=None, start_date=None, end_date=None):
+        """并行绘制本地K线库中的多只股票，读取数据和计算指标都在工作进程中完成
+
+        Args:
+            ts_codes: 股票代码列表，默认为K线库中的全部股票
+            start_date: 开始日期（格式：YYYYMMDD）
+            end_date: 结束日期（格式：YYYYMMDD）
+
+        Returns:
+            dict: 股票代码 -> 保存的文件路径列表
+        """
+        if ts_codes is None:
+            ts_codes = BarStore(self.store_dir).symbols()
+        return self._run([(ts_code, None) for ts_code in ts_codes], start_date, end_date)
+
+
+def main():
+    """为本地K线库中的股票批量生成技术分析图表"""
+    print("批量生成技术分析图表")
+    print("==================")
+
+    codes = input("请输入股票代码，多个用逗号分隔(留空为K线库中的全部股票): ").strip()
+    start_date = input("请输入开始日期(YYYYMMDD，可留空): ") or None
+    end_date = input("请输入结束日期(YYYYMMDD，可留空): ") or None
+    fmt = input("请选择图片格式(png/svg，默认png): ").strip() or 'png'
+
+    renderer = BatchChartRenderer(fmt=fmt)
+    ts_codes = [code.strip() for code in codes.split(',') if code.strip()] or None
+    rendered = renderer.render_store(ts_codes, start_date, end_date)
+    print(f"图表已保存至 {renderer.output_dir}，共 {len(rendered)} 只股票")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,445 @@
+import os
+import time
+import string
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+from bar_store import BarStore
+from indicators import pivot_panel, calculate_panel_indicators
+
+# 批量生成技术分析报告
+# generate_analysis_report的判断规则写成np.select，对全部股票一次求值，
+# 数值先按列批量格式化，再填入预先编译的string.Template，每份报告只做一次模板替换。
+# 报告边生成边交给线程池写入磁盘，最后生成一份市场汇总
+
+REPORT_TEMPLATE = string.Template("""\
+# ${ts_code} 股票分析报告
+
+## 基本信息
+
+- 股票代码: ${ts_code}
+- 分析日期: ${analysis_time}
+- 数据区间: ${start_date} 至 ${end_date}
+
+## 最新交易日数据
+
+- 日期: ${end_date}
+- 开盘价: ${open}
+- 最高价: ${high}
+- 最低价: ${low}
+- 收盘价: ${close}
+- 涨跌幅: ${change_pct}%
+- 成交量: ${vol}
+
+## 技术指标分析
+
+### 移动平均线
+
+- MA5: ${ma5}
+- MA10: ${ma10}
+- MA20: ${ma20}
+- MA30: ${ma30}
+
+${ma_comment}
+
+### MACD
+
+- DIF: ${dif}
+- DEA: ${dea}
+- MACD: ${macd}
+
+${macd_comment}
+
+### KDJ
+
+- K值: ${k}
+- D值: ${d}
+- J值: ${j}
+
+${kdj_comment}
+
+### 布林带
+
+- 上轨: ${boll_upper}
+- 中轨: ${boll_middle}
+- 下轨: ${boll_lower}
+
+${boll_comment}
+
+### RSI
+
+- RSI: ${rsi}
+
+${rsi_comment}
+
+## 综合分析
+
+**${overall}**
+
+*注意：本分析报告仅基于技术指标生成，不构成投资建议。投资决策需结合基本面分析和市场环境等多方面因素。*
+""")
+
+SUMMARY_TEMPLATE = string.Template("""\
+# 市场技术分析汇总
+
+- 分析日期: ${analysis_time}
+- 最新交易日: ${end_date}
+- 股票数量: ${count}
+- 上涨/下跌/平盘: ${up_count}/${down_count}/${flat_count}
+
+## 综合信号分布
+
+| 综合判断 | 股票数量 | 占比 |
+| --- | --- | --- |
+${overall_rows}
+
+## 涨幅前${top_n}
+
+| 股票代码 | 收盘价 | 涨跌幅 | 综合判断 |
+| --- | --- | --- | --- |
+${gainer_rows}
+
+## 跌幅前${top_n}
+
+| 股票代码 | 收盘价 | 涨跌幅 | 综合判断 |
+| --- | --- | --- | --- |
+${loser_rows}
+
+## 看涨信号最强的${top_n}只股票
+
+| 股票代码 | 收盘价 | 看涨信号 | 看跌信号 | 综合判断 |
+| --- | --- | --- | --- | --- |
+${bullish_rows}
+
+*注意：本汇总仅基于技术指标生成，不构成投资建议。*
+""")
+
+PRICE_COLUMNS = ['open', 'high', 'low', 'close', 'vol']
+INDICATOR_COLUMNS = ['MA5', 'MA10', 'MA20', 'MA30', 'DIF', 'DEA', 'MACD', 'K', 'D', 'J',
+                     'BOLL_UPPER', 'BOLL_MIDDLE', 'BOLL_LOWER', 'RSI']
+REPORT_COLUMNS = PRICE_COLUMNS + INDICATOR_COLUMNS
+
+# 各数值在报告中的小数位数，成交量保持原样
+DECIMALS = {col: 2 for col in ['open', 'high', 'low', 'close', 'change_pct', 'MA5', 'MA10', 'MA20', 'MA30',
+                               'K', 'D', 'J', 'BOLL_UPPER', 'BOLL_MIDDLE', 'BOLL_LOWER', 'RSI']}
+DECIMALS.update({'DIF': 4, 'DEA': 4, 'MACD': 4})
+
+OVERALL_LABELS = ["综合技术指标显示强烈的看涨信号。", "综合技术指标显示强烈的看跌信号。",
+                  "综合技术指标偏向看涨，但信号不够强烈。", "综合技术指标偏向看跌，但信号不够强烈。"]
+OVERALL_DEFAULT = "综合技术指标显示趋势不明确，建议观望。"
+
+
+def report_path(output_dir, ts_code):
+    """报告文件路径，命名与generate_analysis_report相同"""
+    return os.path.join(output_dir, f"{ts_code.replace('.', '_')}_analysis_report.md")
+
+
+def latest_from_frame(df, ts_code):
+    """取单只股票指标表的最后一行，整理为classify和render_reports需要的格式"""
+    latest = df.iloc[[-1]][REPORT_COLUMNS].astype(float)
+    latest.index = pd.Index([ts_code], name='ts_code')
+    latest['prev_close'] = float(df['close'].iloc[-2])
+    latest['start_date'] = df.index[0].strftime('%Y-%m-%d')
+    latest['end_date'] = df.index[-1].strftime('%Y-%m-%d')
+    return latest
+
+
+def latest_from_panel(panel):
+    """取各股票最后一个有收盘价的交易日的数据
+
+    Args:
+        panel: 字段名 -> DataFrame（日期 × 股票），需包含open、high、low、close、vol和各项指标
+
+    Returns:
+        pandas.DataFrame: 每行一只股票，包含REPORT_COLUMNS、prev_close、start_date、end_date
+    """
+    close = panel['close']
+    valid = close.notna().to_numpy()
+    has_data = valid.any(axis=0)
+    n = len(close)
+    cols = np.arange(close.shape[1])[has_data]
+    # 每只股票最后一个和第一个有效交易日的位置
+    last = n - 1 - valid[::-1].argmax(axis=0)[has_data]
+    first = valid.argmax(axis=0)[has_data]
+
+    latest = pd.DataFrame({col: panel[col].reindex_like(close).to_numpy(dtype=float)[last, cols]
+                           for col in REPORT_COLUMNS},
+                          index=pd.Index(close.columns[has_data], name='ts_code'))
+    # 上一个有收盘价的交易日，停牌日用之前的收盘价
+    previous = close.ffill().shift(1).to_numpy(dtype=float)
+    latest['prev_close'] = previous[last, cols]
+    dates = pd.DatetimeIndex(pd.to_datetime(close.index)).strftime('%Y-%m-%d').to_numpy()
+    latest['start_date'] = dates[first]
+    latest['end_date'] = dates[last]
+    return latest
+
+
+def classify(latest):
+    """对每只股票应用generate_analysis_report的判断规则
+
+    Args:
+        latest: latest_from_frame或latest_from_panel的结果
+
+    Returns:
+        pandas.DataFrame: 涨跌幅、各项指标的判断文字、看涨/看跌信号数和综合判断
+    """
+    v = {col: latest[col].to_numpy(dtype=float) for col in REPORT_COLUMNS + ['prev_close']}
+    close, ma5, ma10, ma20, ma30 = v['close'], v['MA5'], v['MA10'], v['MA20'], v['MA30']
+    dif, dea, macd = v['DIF'], v['DEA'], v['MACD']
+    k, d, j = v['K'], v['D'], v['J']
+    upper, middle, lower = v['BOLL_UPPER'], v['BOLL_MIDDLE'], v['BOLL_LOWER']
+    rsi = v['RSI']
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        change_pct = (close - v['prev_close']) / v['prev_close'] * 100
+
+        # 移动平均线
+        ma_bull = (close > ma5) & (ma5 > ma10) & (ma10 > ma20) & (ma20 > ma30)
+        ma_bear = (close < ma5) & (ma5 < ma10) & (ma10 < ma20) & (ma20 < ma30)
+        ma_comment = np.select(
+            [ma_bull, ma_bear, (close > ma5) & (close > ma10) & (ma5 > ma10), (close < ma5) & (close < ma10) & (ma5 < ma10)],
+            ["移动平均线呈多头排列，股价处于上升趋势。", "移动平均线呈空头排列，股价处于下降趋势。",
+             "短期均线向上，可能有上涨动能。", "短期均线向下，可能有下跌压力。"],
+            "均线交叉，趋势不明确。")
+        ma_conditions = [ma_bull, ma_bear, (close > ma5) & (close > ma10), (close < ma5) & (close < ma10)]
+
+        # MACD
+        macd_comment = np.select(
+            [(dif > dea) & (macd > 0), (dif < dea) & (macd < 0), (dif > dea) & (macd < 0), (dif < dea) & (macd > 0)],
+            ["MACD金叉且柱线为正，可能是买入信号。", "MACD死叉且柱线为负，可能是卖出信号。",
+             "MACD金叉但柱线仍为负，趋势可能即将转变。", "MACD死叉但柱线仍为正，趋势可能即将转变。"],
+            "MACD指标显示趋势不明确。")
+        macd_conditions = [(dif > dea) & (macd > 0), (dif < dea) & (macd < 0), dif > dea, dif < dea]
+
+        # KDJ
+        oversold = (k < 20) & (d < 20) & (j < 20)
+        overbought = (k > 80) & (d > 80) & (j > 80)
+        kdj_comment = np.select(
+            [(k > d) & (j > 0), (k < d) & (j < 100), overbought, oversold],
+            ["KDJ金叉，可能是买入信号。", "KDJ死叉，可能是卖出信号。",
+             "KDJ三线都处于超买区域，可能面临回调。", "KDJ三线都处于超卖区域，可能有反弹机会。"],
+            "KDJ指标显示趋势不明确。")
+        kdj_conditions = [(k > d) & (j > 0), (k < d) & (j < 100), oversold, overbought]
+
+        # 布林带
+        boll_comment = np.select(
+            [close > upper, close < lower, (close > middle) & (close < upper), (close < middle) & (close > lower)],
+            ["股价突破布林带上轨，可能处于强势，但也有回调风险。", "股价跌破布林带下轨，可能处于弱势，但也有反弹机会。",
+             "股价位于布林带上半轨，呈现偏强走势。", "股价位于布林带下半轨，呈现偏弱走势。"],
+            "股价位于布林带中轨附近，趋势不明确。")
+        boll_conditions = [close > upper, close < lower, close > middle, close < middle]
+
+        # RSI
+        rsi_comment = np.select(
+            [rsi > 70, rsi < 30, (rsi > 50) & (rsi < 70), (rsi > 30) & (rsi < 50)],
+            ["RSI处于超买区域，可能面临回调。", "RSI处于超卖区域，可能有反弹机会。",
+             "RSI处于强势区域，但未达超买。", "RSI处于弱势区域，但未达超卖。"],
+            "RSI指标显示趋势中性。")
+        rsi_conditions = [rsi > 70, rsi < 30, rsi > 50, rsi < 50]
+
+    # 综合信号计分
+    bullish = (np.select(ma_conditions, [2, 0, 1, 0], 0)
+               + np.select(macd_conditions, [2, 0, 1, 0], 0)
+               + np.select(kdj_conditions, [1, 0, 1, 0], 0)
+               + np.select(boll_conditions, [1, 1, 1, 0], 0)
+               + np.select(rsi_conditions, [0, 1, 0.5, 0], 0))
+    bearish = (np.select(ma_conditions, [0, 2, 0, 1], 0)
+               + np.select(macd_conditions, [0, 2, 0, 1], 0)
+               + np.select(kdj_conditions, [0, 1, 0, 1], 0)
+               + np.select(boll_conditions, [1, 1, 0, 1], 0)
+               + np.select(rsi_conditions, [1, 0, 0, 0.5], 0))
+    overall = np.select([bullish > bearish + 2, bearish > bullish + 2, bullish > bearish, bearish > bullish],
+                        OVERALL_LABELS, OVERALL_DEFAULT)
+
+    return pd.DataFrame({
+        'change_pct': change_pct,
+        'ma_comment': ma_comment,
+        'macd_comment': macd_comment,
+        'kdj_comment': kdj_comment,
+        'boll_comment': boll_comment,
+        'rsi_comment': rsi_comment,
+        'bullish_signals': bullish,
+        'bearish_signals': bearish,
+        'overall': overall,
+    }, index=latest.index)
+
+
+def render_reports(latest, classified, analysis_time=None):
+    """逐只股票填充报告模板
+
+    Args:
+        latest: latest_from_frame或latest_from_panel的结果
+        classified: classify的结果
+        analysis_time: 报告中的分析日期，默认为当前时间
+
+    Yields:
+        (股票代码, 报告文本)
+    """
+    analysis_time = analysis_time or datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    # 按列批量格式化数值，模板替换时只做字符串拼接
+    columns = {'ts_code': latest.index.astype(str).to_numpy(),
+               'start_date': latest['start_date'].to_numpy(),
+               'end_date': latest['end_date'].to_numpy(),
+               'vol': latest['vol'].astype(float).astype(str).to_numpy()}
+    for col, digits in DECIMALS.items():
+        values = classified[col] if col == 'change_pct' else latest[col]
+        columns[col.lower()] = np.char.mod(f'%.{digits}f', values.to_numpy(dtype=float))
+    for col in ('ma_comment', 'macd_comment', 'kdj_comment', 'boll_comment', 'rsi_comment', 'overall'):
+        columns[col] = classified[col].to_numpy()
+
+    names = list(columns)
+    for values in zip(*(columns[name] for name in names)):
+        fields = dict(zip(names, values))
+        fields['analysis_time'] = analysis_time
+        yield fields['ts_code'], REPORT_TEMPLATE.substitute(fields)
+
+
+def render_report(df, ts_code, analysis_time=None):
+    """生成单只股票的分析报告文本"""
+    latest = latest_from_frame(df, ts_code)
+    return next(render_reports(latest, classify(latest), analysis_time))[1]
+
+
+def _write_files(items):
+    for path, text in items:
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+    return len(items)
+
+
+class BatchReportGenerator:
+    def __init__(self, output_dir='analysis_results', max_workers=8, chunk_size=200, top_n=10):
+        """初始化批量报告生成器
+
+        Args:
+            output_dir: 报告保存目录
+            max_workers: 写文件的线程数
+            chunk_size: 每次交给写入线程的报告数量
+            top_n: 市场汇总中各排行榜的股票数量
+        """
+        self.output_dir = output_dir
+        self.max_workers = max_workers
+        self.chunk_size = chunk_size
+        self.top_n = top_n
+
+        # 确保输出目录存在
+        if not os.path.exists(self.output_dir):
+            os.makedirs(self.output_dir)
+
+    def generate(self, panel):
+        """为面板中的全部股票生成报告和市场汇总
+
+        Args:
+            panel: 字段名 -> DataFrame（日期 × 股票），需包含open、high、low、close、vol和各项指标
+
+        Returns:
+            pandas.DataFrame: 每只股票的涨跌幅、信号数和综合判断
+        """
+        start_time = time.perf_counter()
+        latest = latest_from_panel(panel)
+        classified = classify(latest)
+        analysis_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+        # 报告边生成边写入
+        written = 0
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = []
+            chunk = []
+            for ts_code, text in render_reports(latest, classified, analysis_time):
+                chunk.append((report_path(self.output_dir, ts_code), text))
+                if len(chunk) >= self.chunk_size:
+                    futures.append(executor.submit(_write_files, chunk))
+                    chunk = []
+            if chunk:
+                futures.append(executor.submit(_write_files, chunk))
+            for future in futures:
+                try:
+                    written += future.result()
+                except Exception as e:
+                    print(f"写入报告失败: {e}")
+
+        summary_path = self.write_summary(latest, classified, analysis_time)
+        print(f"共生成 {written} 份分析报告，耗时 {time.perf_counter() - start_time:.1f} 秒")
+        print(f"市场汇总已保存至 {summary_path}")
+        return classified
+
+    def render_summary(self, latest, classified, analysis_time):
+        """生成市场汇总文本"""
+        result = latest[['close', 'end_date']].join(classified)
+        count = len(result)
+        change = result['change_pct']
+
+        counts = result['overall'].value_counts()
+        overall_rows = '\n'.join(
+            f"| {label} | {counts.get(label, 0)} | {counts.get(label, 0) / count * 100:.1f}% |"
+            for label in OVERALL_LABELS + [OVERALL_DEFAULT])
+
+        def change_rows(frame):
+            return '\n'.join(f"| {row.Index} | {row.close:.2f} | {row.change_pct:.2f}% | {row.overall} |"
+                              for row in frame.itertuples())
+
+        ranked = result.dropna(subset=['change_pct'])
+        strength = result.assign(strength=result['bullish_signals'] - result['bearish_signals'])
+        strongest = strength.sort_values(['strength', 'bullish_signals'], ascending=False).head(self.top_n)
+        bullish_rows = '\n'.join(
+            f"| {row.Index} | {row.close:.2f} | {row.bullish_signals:g} | {row.bearish_signals:g} | {row.overall} |"
+            for row in strongest.itertuples())
+
+        return SUMMARY_TEMPLATE.substitute(
+            analysis_time=analysis_time,
+            end_date=result['end_date'].max() if count else '',
+            count=count,
+            up_count=int((change > 0).sum()),
+            down_count=int((change < 0).sum()),
+            flat_count=int((change == 0).sum()),
+            top_n=self.top_n,
+            overall_rows=overall_rows,
+            gainer_rows=change_rows(ranked.nlargest(self.top_n, 'change_pct')),
+            loser_rows=change_rows(ranked.nsmallest(self.top_n, 'change_pct')),
+            bullish_rows=bullish_rows)
+
+    def write_summary(self, latest, classified, analysis_time=None):
+        """保存市场汇总"""
+        analysis_time = analysis_time or datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        end_date = latest['end_date'].max() if len(latest) else datetime.now().strftime('%Y-%m-%d')
+        file_path = os.path.join(self.output_dir, f"market_summary_{end_date.replace('-', '')}.md")
+        with open(file_path, 'w', encoding='utf-8') as f:
+            f.write(self.render_summary(latest, classified, analysis_time))
+        return file_path
+
+
+def panel_from_store(store, start_date=None, end_date=None, ts_codes=None):
+    """从本地K线库读取日线并计算全部股票的指标
+
+    Returns:
+        dict: 字段名 -> DataFrame（日期 × 股票），包含价格字段和各项指标；没有数据时返回None
+    """
+    df = store.read_many(ts_codes, start_date, end_date, columns=PRICE_COLUMNS)
+    if df.empty:
+        return None
+    panel = pivot_panel(df, fields=PRICE_COLUMNS)
+    panel.update(calculate_panel_indicators(panel['close'], panel['high'], panel['low']))
+    return panel
+
+
+def main():
+    """为本地K线库中的全部股票生成分析报告和市场汇总"""
+    print("批量生成技术分析报告")
+    print("==================")
+
+    # 指标最长需要约60个交易日的数据预热
+    start_date = input("请输入开始日期(YYYYMMDD，默认最近一年): ") or (datetime.now() - timedelta(days=365)).strftime('%Y%m%d')
+    end_date = input("请输入结束日期(YYYYMMDD，可留空): ") or None
+
+    panel = panel_from_store(BarStore('tushare_data/bars'), start_date, end_date)
+    if panel is None:
+        print("本地K线库为空，请先通过TushareCrawler下载数据")
+        return
+
+    result = BatchReportGenerator().generate(panel)
+    print(result['overall'].value_counts().to_string())
+
+
+if __name__ == "__main__":
+    main()
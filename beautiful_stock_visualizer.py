@@ -1,43 +1,41 @@
-import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
-import mplfinance as mpf
+# 最先导入，启动耗时从这里开始计
+from lazy_imports import is_available, lazy_import, load_pyplot, preload, startup_timer
 import os
 import time
 import threading
 import tkinter as tk
 from tkinter import ttk, messagebox, scrolledtext
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 from datetime import datetime, timedelta
-import matplotlib
-import requests
-import json
-from PIL import Image, ImageTk
 import tkinter.font as tkFont
-matplotlib.use('TkAgg')
+from market_snapshot import MarketSnapshotCache, TradeCalendar
+from background_loader import BackgroundLoader
 
-# 尝试导入免费的股票数据库
-try:
-    import akshare as ak
-    AKSHARE_AVAILABLE = True
-except ImportError:
-    AKSHARE_AVAILABLE = False
+# pandas、绘图库和数据源都在第一次使用时才导入，窗口可以先显示出来
+pd = lazy_import('pandas')
+np = lazy_import('numpy')
+indicators = lazy_import('indicators')
+kline_chart = lazy_import('kline_chart')
+watchlist = lazy_import('watchlist')
+
+# 检查免费的股票数据库是否已安装，只查找不导入
+AKSHARE_AVAILABLE = is_available('akshare')
+ak = lazy_import('akshare')
+if not AKSHARE_AVAILABLE:
     print("AKShare未安装，请运行: pip install akshare")
 
-try:
-    import adata
-    ADATA_AVAILABLE = True
-except ImportError:
-    ADATA_AVAILABLE = False
+ADATA_AVAILABLE = is_available('adata')
+adata = lazy_import('adata')
+if not ADATA_AVAILABLE:
     print("AData未安装，请运行: pip install adata")
 
-try:
-    from Ashare import get_price
-    ASHARE_AVAILABLE = True
-except ImportError:
-    ASHARE_AVAILABLE = False
+# Ashare是单文件库，我们可以直接下载使用
+ASHARE_AVAILABLE = is_available('Ashare')
+Ashare = lazy_import('Ashare')
+if not ASHARE_AVAILABLE:
     print("Ashare未安装，请从GitHub下载Ashare.py文件")
 
+startup_timer.mark("模块导入")
+
 class BeautifulStockVisualizer:
     def __init__(self):
         """初始化美化版股票可视化工具"""
@@ -45,11 +43,18 @@ class BeautifulStockVisualizer:
         self.stock_list = None
         self.current_stock = None
         self.current_data = None
+        self.streaming = None  # 当前股票的增量指标状态
+        self.streaming_stock = None
         self.update_thread = None
         self.is_updating = False
         self.update_interval = 60
         self.hot_stocks = []  # 热门股票列表
         
+        # 全市场行情快照缓存，热门股票、股票列表和实时行情共用同一份快照
+        self.snapshot_cache = MarketSnapshotCache(lambda: ak.stock_zh_a_spot(), ttl=30) if AKSHARE_AVAILABLE else None
+        # 快照不带日期，节假日返回的是上一交易日的行情，用交易日历判断能否当作当日K线
+        self.trade_calendar = TradeCalendar(lambda: ak.tool_trade_date_hist_sina()) if AKSHARE_AVAILABLE else None
+        
         # 确保输出目录存在
         if not os.path.exists(self.output_dir):
             os.makedirs(self.output_dir)
@@ -81,33 +86,21 @@ class BeautifulStockVisualizer:
         
         try:
             if source == 'akshare' and AKSHARE_AVAILABLE:
-                # 添加重试机制
-                for attempt in range(3):
-                    try:
-                        # 获取涨跌幅排行榜
-                        df_up = ak.stock_zh_a_spot()
-                        if not df_up.empty:
-                            # 按涨跌幅排序，取前20名
-                            df_sorted = df_up.sort_values('涨跌幅', ascending=False).head(20)
-                            hot_stocks = []
-                            for _, row in df_sorted.iterrows():
-                                hot_stocks.append({
-                                    'code': row['代码'],
-                                    'name': row['名称'],
-                                    'price': row['最新价'],
-                                    'change': row['涨跌幅'],
-                                    'volume': row['成交量'],
-                                    'amount': row['成交额']
-                                })
-                            self.hot_stocks = hot_stocks
-                            return hot_stocks
-                        break
-                    except Exception as retry_e:
-                        if attempt < 2:  # 前两次失败时等待重试
-                            time.sleep(1)
-                            continue
-                        else:
-                            raise retry_e
+                # 从共享快照中按涨跌幅排序，取前20名（快照自带重试机制）
+                df_sorted = self.snapshot_cache.top(20, '涨跌幅')
+                if df_sorted is not None and not df_sorted.empty:
+                    hot_stocks = []
+                    for row in df_sorted.to_dict('records'):
+                        hot_stocks.append({
+                            'code': row['代码'],
+                            'name': row['名称'],
+                            'price': row['最新价'],
+                            'change': row['涨跌幅'],
+                            'volume': row['成交量'],
+                            'amount': row['成交额']
+                        })
+                    self.hot_stocks = hot_stocks
+                    return hot_stocks
             
             # 如果无法获取实时数据，返回模拟数据
             return self.get_demo_hot_stocks()
@@ -137,27 +130,18 @@ class BeautifulStockVisualizer:
         
         try:
             if source == 'akshare' and AKSHARE_AVAILABLE:
-                # 添加重试机制
-                for attempt in range(3):
-                    try:
-                        df = ak.stock_zh_a_spot()
-                        df = df.rename(columns={
-                            '代码': 'ts_code',
-                            '名称': 'name',
-                            '最新价': 'close',
-                            '涨跌幅': 'pct_chg',
-                            '涨跌额': 'change',
-                            '成交量': 'vol',
-                            '成交额': 'amount'
-                        })
-                        self.stock_list = df
-                        return df
-                    except Exception as retry_e:
-                        if attempt < 2:
-                            time.sleep(1)
-                            continue
-                        else:
-                            raise retry_e
+                # rename返回新的DataFrame，不会修改共享快照
+                df = self.snapshot_cache.get_frame().rename(columns={
+                    '代码': 'ts_code',
+                    '名称': 'name',
+                    '最新价': 'close',
+                    '涨跌幅': 'pct_chg',
+                    '涨跌额': 'change',
+                    '成交量': 'vol',
+                    '成交额': 'amount'
+                })
+                self.stock_list = df
+                return df
             
             elif source == 'adata' and ADATA_AVAILABLE:
                 df = adata.stock.info.all_code()
@@ -183,30 +167,20 @@ class BeautifulStockVisualizer:
         
         try:
             if source == 'akshare' and AKSHARE_AVAILABLE:
-                # 添加重试机制
-                for attempt in range(3):
-                    try:
-                        df = ak.stock_zh_a_spot()
-                        stock_data = df[df['代码'] == stock_code]
-                        if not stock_data.empty:
-                            return {
-                                'name': stock_data.iloc[0]['名称'],
-                                'price': stock_data.iloc[0]['最新价'],
-                                'change': stock_data.iloc[0]['涨跌额'],
-                                'pct_change': stock_data.iloc[0]['涨跌幅'],
-                                'volume': stock_data.iloc[0]['成交量'],
-                                'amount': stock_data.iloc[0]['成交额'],
-                                'high': stock_data.iloc[0]['最高'],
-                                'low': stock_data.iloc[0]['最低'],
-                                'open': stock_data.iloc[0]['今开']
-                            }
-                        break
-                    except Exception as retry_e:
-                        if attempt < 2:
-                            time.sleep(1)
-                            continue
-                        else:
-                            raise retry_e
+                # 从共享快照的代码索引中直接查找
+                row = self.snapshot_cache.get_row(stock_code)
+                if row is not None:
+                    return {
+                        'name': row['名称'],
+                        'price': row['最新价'],
+                        'change': row['涨跌额'],
+                        'pct_change': row['涨跌幅'],
+                        'volume': row['成交量'],
+                        'amount': row['成交额'],
+                        'high': row['最高'],
+                        'low': row['最低'],
+                        'open': row['今开']
+                    }
                 
                 # 如果在实时数据中找不到，返回模拟数据
                 return self.get_demo_stock_data(stock_code)
@@ -233,6 +207,19 @@ class BeautifulStockVisualizer:
             print(f"获取实时行情失败: {e}")
             return self.get_demo_stock_data(stock_code)
     
+    def is_trading_day(self):
+        """今天是否为交易日，没有交易日历时只排除周末"""
+        if self.trade_calendar is None:
+            return datetime.now().weekday() < 5
+        return self.trade_calendar.is_trading_day()
+    
+    def get_live_quote(self, stock_code, source='auto'):
+        """在工作线程中获取实时行情，并标记今天是否为交易日（交易日历每天只下载一次）"""
+        quote = self.get_realtime_quotes(stock_code, source)
+        if quote is not None:
+            quote = dict(quote, is_trading_day=self.is_trading_day())
+        return quote
+    
     def get_demo_stock_data(self, stock_code):
         """获取演示用股票数据"""
         # 根据股票代码返回不同的模拟数据
@@ -255,7 +242,8 @@ class BeautifulStockVisualizer:
                 'amount': data['price'] * 1000000,
                 'high': data['price'] * 1.02,
                 'low': data['price'] * 0.98,
-                'open': data['price'] * 0.99
+                'open': data['price'] * 0.99,
+                'is_demo': True
             }
         else:
             return {
@@ -267,7 +255,8 @@ class BeautifulStockVisualizer:
                 'amount': 5000000,
                 'high': 10.20,
                 'low': 9.80,
-                'open': 9.90
+                'open': 9.90,
+                'is_demo': True
             }
     
     def get_daily_data(self, stock_code, days=60, source='auto'):
@@ -314,47 +303,50 @@ class BeautifulStockVisualizer:
             print(f"获取日线数据失败: {e}")
             return None
     
-    def calculate_indicators(self, df):
+    def calculate_indicators(self, df, stock_code=None):
         """计算技术指标"""
-        if df is None or df.empty:
+        return indicators.calculate_indicators(df, symbol=stock_code, ma_windows=(5, 10, 20))
+    
+    def init_streaming(self, stock_code, df):
+        """用历史K线初始化增量指标状态"""
+        self.streaming = indicators.StreamingIndicators(ma_windows=(5, 10, 20))
+        self.streaming.warm_up(df)
+        self.streaming_stock = stock_code
+    
+    def update_live_bar(self, stock_code, quote):
+        """用实时行情增量更新当日K线和技术指标
+        
+        Args:
+            stock_code: 股票代码
+            quote: get_live_quote返回的行情字典
+            
+        Returns:
+            pandas.DataFrame: 更新后的指标表，无法增量更新时返回None
+        """
+        if self.streaming is None or self.current_data is None or self.streaming_stock != stock_code:
+            return None
+        # 演示数据和休市日（周末和节假日）的快照不能当作当日K线
+        if not quote or quote.get('is_demo') or not quote.get('is_trading_day'):
             return None
         
-        result = df.copy()
-        
-        # 移动平均线
-        result['MA5'] = result['close'].rolling(window=5).mean()
-        result['MA10'] = result['close'].rolling(window=10).mean()
-        result['MA20'] = result['close'].rolling(window=20).mean()
-        
-        # MACD
-        result['EMA12'] = result['close'].ewm(span=12, adjust=False).mean()
-        result['EMA26'] = result['close'].ewm(span=26, adjust=False).mean()
-        result['DIF'] = result['EMA12'] - result['EMA26']
-        result['DEA'] = result['DIF'].ewm(span=9, adjust=False).mean()
-        result['MACD'] = 2 * (result['DIF'] - result['DEA'])
-        
-        # KDJ
-        low_min = result['low'].rolling(window=9).min()
-        high_max = result['high'].rolling(window=9).max()
-        result['RSV'] = (result['close'] - low_min) / (high_max - low_min) * 100
-        result['K'] = result['RSV'].ewm(com=2).mean()
-        result['D'] = result['K'].ewm(com=2).mean()
-        result['J'] = 3 * result['K'] - 2 * result['D']
-        
-        # BOLL
-        result['BOLL_MIDDLE'] = result['close'].rolling(window=20).mean()
-        result['BOLL_STD'] = result['close'].rolling(window=20).std()
-        result['BOLL_UPPER'] = result['BOLL_MIDDLE'] + 2 * result['BOLL_STD']
-        result['BOLL_LOWER'] = result['BOLL_MIDDLE'] - 2 * result['BOLL_STD']
-        
-        # RSI
-        delta = result['close'].diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
-        rs = gain / loss
-        result['RSI'] = 100 - (100 / (1 + rs))
+        try:
+            bar = {
+                'open': float(quote['open']),
+                'high': float(quote['high']),
+                'low': float(quote['low']),
+                'close': float(quote['price']),
+                'vol': float(quote['volume']) / 100  # 快照单位为股，日线为手
+            }
+        except (KeyError, TypeError, ValueError):
+            return None
+        # 未开盘时价格为0
+        if bar['open'] <= 0 or bar['close'] <= 0:
+            return None
         
-        return result
+        trade_date = pd.Timestamp(datetime.now().date())
+        values = self.streaming.update(bar, trade_date)
+        self.current_data = indicators.apply_streaming_update(self.current_data, trade_date, bar, values)
+        return self.current_data
     
     def analyze_stock(self, df):
         """分析股票走势并给出建议"""
@@ -439,18 +431,24 @@ class BeautifulStockVisualizerGUI:
         """初始化美化版GUI界面"""
         self.visualizer = BeautifulStockVisualizer()
         self.root = tk.Tk()
-        self.root.title("【股票可视化分析工具】"
+        self.root.title("【股票可视化分析工具】")
         self.root.geometry("1400x900")
         self.root.configure(bg='#f0f0f0')
         
+        # 网络请求和指标计算在后台线程执行，界面只接收计算好的结果
+        self.loader = BackgroundLoader(self.root)
+        # 正在完整加载的股票代码，加载期间自动刷新暂停，避免结果互相覆盖
+        self.loading_stock = None
+        
+        # K线图在第一次显示时创建，之后只更新数据
+        self.kline_chart = None
+        self.watchlist_window = None
+        
         # 设置应用图标和样式
         self.setup_styles()
         
-        # 设置中文字体
-        plt.rcParams['font.sans-serif'] = ['SimHei', 'Microsoft YaHei']
-        plt.rcParams['axes.unicode_minus'] = False
-        
         self.setup_gui()
+        startup_timer.mark("界面创建")
         
     def setup_styles(self):
         """设置界面样式"""
@@ -814,6 +812,15 @@ class BeautifulStockVisualizerGUI:
                                         **button_style)
         self.auto_update_btn.pack(fill=tk.X, pady=(0, 8))
         
+        # 自选股监控按钮
+        watchlist_btn = tk.Button(content_frame,
+                                 text="【自选股监控】",
+                                 bg=self.colors['info'],
+                                 fg='white',
+                                 command=self.open_watchlist,
+                                 **button_style)
+        watchlist_btn.pack(fill=tk.X, pady=(0, 8))
+        
         # 状态指示器
         self.status_label = tk.Label(content_frame,
                                     text="状态: 就绪",
@@ -965,40 +972,38 @@ class BeautifulStockVisualizerGUI:
         welcome_label.pack(anchor=tk.W)
     
     def refresh_hot_stocks(self):
-        """刷新热门股票"""
-        try:
-            self.status_label.config(text="状态: 获取热门股票中...", fg=self.colors['warning'])
-            self.root.update()
-            
-            source = self.source_var.get()
-            hot_stocks = self.visualizer.get_hot_stocks(source)
-            
-            # 清空现有列表
-            for item in self.hot_tree.get_children():
-                self.hot_tree.delete(item)
-            
-            if hot_stocks:
-                for stock in hot_stocks[:15]:  # 显示前15只
-                    change_color = 'red' if stock['change'] > 0 else 'green' if stock['change'] < 0 else 'black'
-                    
-                    item = self.hot_tree.insert('', tk.END, values=(
-                        stock['code'],
-                        stock['name'][:6],  # 限制名称长度
-                        f"{stock['price']:.2f}",
-                        f"{stock['change']:.2f}%"
-                    ))
-                    
-                    # 设置颜色
-                    if stock['change'] > 0:
-                        self.hot_tree.set(item, 'change', f"+{stock['change']:.2f}%")
-                
-                self.status_label.config(text=f"状态: 已加载 {len(hot_stocks)} 只热门股票", fg=self.colors['success'])
-            else:
-                self.status_label.config(text="状态: 获取热门股票失败", fg=self.colors['danger'])
+        """刷新热门股票（后台获取，完成后更新列表）"""
+        self.status_label.config(text="状态: 获取热门股票中...", fg=self.colors['warning'])
+        source = self.source_var.get()
+        self.loader.submit('hot', self.visualizer.get_hot_stocks, source,
+                           on_done=self.show_hot_stocks, on_error=self.on_hot_stocks_error)
+    
+    def show_hot_stocks(self, hot_stocks):
+        """在界面中显示热门股票"""
+        # 清空现有列表
+        for item in self.hot_tree.get_children():
+            self.hot_tree.delete(item)
+        
+        if hot_stocks:
+            for stock in hot_stocks[:15]:  # 显示前15只
+                item = self.hot_tree.insert('', tk.END, values=(
+                    stock['code'],
+                    stock['name'][:6],  # 限制名称长度
+                    f"{stock['price']:.2f}",
+                    f"{stock['change']:.2f}%"
+                ))
                 
-        except Exception as e:
-            self.status_label.config(text=f"状态: 错误 - {str(e)[:20]}...", fg=self.colors['danger'])
-            messagebox.showerror("错误", f"刷新热门股票失败: {e}")
+                # 设置颜色
+                if stock['change'] > 0:
+                    self.hot_tree.set(item, 'change', f"+{stock['change']:.2f}%")
+            
+            self.status_label.config(text=f"状态: 已加载 {len(hot_stocks)} 只热门股票", fg=self.colors['success'])
+        else:
+            self.status_label.config(text="状态: 获取热门股票失败", fg=self.colors['danger'])
+    
+    def on_hot_stocks_error(self, e):
+        self.status_label.config(text=f"状态: 错误 - {str(e)[:20]}...", fg=self.colors['danger'])
+        messagebox.showerror("错误", f"刷新热门股票失败: {e}")
     
     def refresh_stock_list(self):
         """刷新股票列表"""
@@ -1038,39 +1043,78 @@ class BeautifulStockVisualizerGUI:
             self.load_stock_data(stock_code)
     
     def load_stock_data(self, stock_code):
-        """加载股票数据"""
-        try:
-            self.status_label.config(text=f"状态: 加载 {stock_code} 数据中...", fg=self.colors['warning'])
-            self.root.update()
-            
-            source = self.source_var.get()
-            
-            # 获取实时行情
-            realtime_data = self.visualizer.get_realtime_quotes(stock_code, source)
-            
-            # 获取历史数据
-            df = self.visualizer.get_daily_data(stock_code, days=120, source=source)
-            
-            if df is not None:
-                # 计算技术指标
-                df_with_indicators = self.visualizer.calculate_indicators(df)
-                
-                # 更新显示
-                self.update_overview_display(stock_code, realtime_data, df_with_indicators)
-                self.update_chart_display(stock_code, df_with_indicators)
-                self.update_analysis_display(df_with_indicators)
-                
-                self.visualizer.current_stock = stock_code
-                self.visualizer.current_data = df_with_indicators
-                
-                self.status_label.config(text=f"状态: {stock_code} 数据加载完成", fg=self.colors['success'])
-            else:
-                self.status_label.config(text=f"状态: {stock_code} 数据加载失败", fg=self.colors['danger'])
-                messagebox.showerror("错误", f"获取股票 {stock_code} 数据失败")
-                
-        except Exception as e:
-            self.status_label.config(text=f"状态: 加载失败 - {str(e)[:15]}...", fg=self.colors['danger'])
-            messagebox.showerror("错误", f"加载股票数据失败: {e}")
+        """加载股票数据：后台获取行情和计算指标，完成后更新界面
+        
+        切换到其他股票时，尚未完成的旧请求和自动刷新都会被取消
+        """
+        self.status_label.config(text=f"状态: 加载 {stock_code} 数据中...", fg=self.colors['warning'])
+        source = self.source_var.get()
+        self.loader.cancel('live')
+        self.loading_stock = stock_code
+        self.loader.submit('stock', self.fetch_stock_data, stock_code, source,
+                           on_done=self.show_stock_data,
+                           on_error=lambda e: self.on_load_error(stock_code, e))
+    
+    def fetch_stock_data(self, stock_code, source):
+        """在工作线程中获取实时行情、历史数据并计算技术指标"""
+        realtime_data = self.visualizer.get_realtime_quotes(stock_code, source)
+        df = self.visualizer.get_daily_data(stock_code, days=120, source=source)
+        df_with_indicators = None
+        if df is not None:
+            df_with_indicators = self.visualizer.calculate_indicators(df, stock_code)
+        return stock_code, realtime_data, df, df_with_indicators
+    
+    def show_stock_data(self, result):
+        """在主线程中显示加载完成的数据"""
+        stock_code, realtime_data, df, df_with_indicators = result
+        self.loading_stock = None
+        if df_with_indicators is None:
+            self.status_label.config(text=f"状态: {stock_code} 数据加载失败", fg=self.colors['danger'])
+            messagebox.showerror("错误", f"获取股票 {stock_code} 数据失败")
+            return
+        
+        # 更新显示
+        self.update_overview_display(stock_code, realtime_data, df_with_indicators)
+        self.update_chart_display(stock_code, df_with_indicators)
+        self.update_analysis_display(df_with_indicators)
+        
+        self.visualizer.current_stock = stock_code
+        self.visualizer.current_data = df_with_indicators
+        self.visualizer.init_streaming(stock_code, df)
+        
+        self.status_label.config(text=f"状态: {stock_code} 数据加载完成", fg=self.colors['success'])
+    
+    def on_load_error(self, stock_code, e):
+        self.loading_stock = None
+        self.status_label.config(text=f"状态: 加载失败 - {str(e)[:15]}...", fg=self.colors['danger'])
+        messagebox.showerror("错误", f"加载股票 {stock_code} 数据失败: {e}")
+    
+    def refresh_live_data(self, stock_code):
+        """自动刷新：后台获取实时行情，只用它增量更新当日K线，无法增量更新时完整加载
+        
+        自动刷新使用单独的通道，不会取消用户刚点击的加载；完整加载进行中时跳过本次刷新
+        """
+        if self.loading_stock is not None or stock_code is None:
+            return
+        source = self.source_var.get()
+        self.loader.submit('live', self.visualizer.get_live_quote, stock_code, source,
+                           on_done=lambda quote: self.show_live_data(stock_code, quote),
+                           on_error=lambda e: print(f"自动更新错误: {e}"))
+    
+    def show_live_data(self, stock_code, realtime_data):
+        """用后台取回的实时行情更新当日K线和界面"""
+        # 刷新期间已切换到其他股票时，丢弃旧股票的行情
+        if self.loading_stock is not None or stock_code != self.visualizer.current_stock:
+            return
+        df = self.visualizer.update_live_bar(stock_code, realtime_data)
+        if df is None:
+            self.load_stock_data(stock_code)
+            return
+        
+        self.update_overview_display(stock_code, realtime_data, df)
+        self.update_chart_display(stock_code, df)
+        self.update_analysis_display(df)
+        self.status_label.config(text=f"状态: {stock_code} 实时数据已更新", fg=self.colors['success'])
     
     def update_overview_display(self, stock_code, realtime_data, df):
         """更新概览显示"""
@@ -1293,45 +1337,17 @@ class BeautifulStockVisualizerGUI:
                     wraplength=400).pack(anchor=tk.W, padx=10, pady=(0, 5))
     
     def update_chart_display(self, stock_code, df):
-        """更新K线图显示"""
-        # 清空现有图表
-        for widget in self.chart_frame.winfo_children():
-            widget.destroy()
-        
+        """更新K线图显示：图表只创建一次，之后只替换数据"""
         if df is None or df.empty:
             return
         
         try:
-            # 准备数据
-            df_plot = df.copy()
-            df_plot.index = pd.to_datetime(df_plot.index)
-            
-            # 创建图表
-            fig, axes = plt.subplots(2, 1, figsize=(14, 10), gridspec_kw={'height_ratios': [3, 1]})
-            fig.patch.set_facecolor('#FAFAFA')
-            
-            # K线图
-            mpf.plot(df_plot.tail(60), type='candle', ax=axes[0], volume=axes[1],
-                    mav=(5, 10, 20), style='charles', title=f'{stock_code} K线图')
-            
-            # 设置图表样式
-            axes[0].set_facecolor('#FFFFFF')
-            axes[1].set_facecolor('#FFFFFF')
-            
-            # 嵌入到Tkinter
-            canvas = FigureCanvasTkAgg(fig, self.chart_frame)
-            canvas.draw()
-            canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
-            
-            plt.close(fig)
+            if self.kline_chart is None:
+                self.kline_chart = kline_chart.KLineChart(self.chart_frame, bars=60, figsize=(14, 10))
+            self.kline_chart.update(df, title=f'{stock_code} K线图')
             
         except Exception as e:
-            error_label = tk.Label(self.chart_frame,
-                                 text=f"图表显示错误: {e}",
-                                 font=('Microsoft YaHei', 12),
-                                 fg=self.colors['danger'],
-                                 bg=self.colors['background'])
-            error_label.pack(expand=True)
+            self.status_label.config(text=f"状态: 图表显示错误 - {str(e)[:15]}...", fg=self.colors['danger'])
     
     def update_analysis_display(self, df):
         """更新分析报告显示"""
@@ -1399,7 +1415,7 @@ class BeautifulStockVisualizerGUI:
             while self.visualizer.is_updating:
                 try:
                     if self.visualizer.current_stock:
-                        self.root.after(0, lambda: self.load_stock_data(self.visualizer.current_stock))
+                        self.root.after(0, lambda: self.refresh_live_data(self.visualizer.current_stock))
                     time.sleep(self.visualizer.update_interval)
                 except Exception as e:
                     print(f"自动更新错误: {e}")
@@ -1414,13 +1430,48 @@ class BeautifulStockVisualizerGUI:
         self.auto_update_btn.config(text="【开始自动更新】", bg=self.colors['primary'])
         self.status_label.config(text="状态: 已停止自动更新", fg=self.colors['success'])
     
+    def open_watchlist(self):
+        """打开自选股监控窗口，所有自选股共用一个刷新调度器和行情快照"""
+        if self.watchlist_window is not None and self.watchlist_window.exists():
+            self.watchlist_window.window.lift()
+            return
+        
+        if self.visualizer.snapshot_cache is None:
+            messagebox.showwarning("警告", "自选股监控需要AKShare全市场行情，请运行: pip install akshare")
+            return
+        
+        source = self.source_var.get()
+        scheduler = watchlist.WatchlistScheduler(
+            self.visualizer.snapshot_cache,
+            history_func=lambda code: self.visualizer.get_daily_data(code, days=120, source=source),
+            trading_day_func=self.visualizer.is_trading_day)
+        self.watchlist_window = watchlist.WatchlistWindow(
+            self.root, scheduler, self.loader,
+            interval=self.visualizer.update_interval,
+            path=os.path.join(self.visualizer.output_dir, 'watchlist.txt'),
+            on_select=self.load_stock_data)
+    
+    def preload_modules(self):
+        """窗口显示后在后台导入绘图库、数据处理库和数据源"""
+        modules = [load_pyplot, pd, np, indicators, kline_chart, watchlist]
+        if AKSHARE_AVAILABLE:
+            modules.append(ak)
+        if ADATA_AVAILABLE:
+            modules.append(adata)
+        preload(*modules)
+    
     def run(self):
         """运行GUI"""
+        # 窗口显示后打印启动耗时（设置STARTUP_TIMING=1），再在后台预加载其余模块
+        startup_timer.report_when_shown(self.root)
+        self.root.after(100, self.preload_modules)
+        
         # 启动时自动刷新热门股票
         self.root.after(1000, self.refresh_hot_stocks)
         
         # 启动主循环
         self.root.mainloop()
+        self.loader.shutdown()
 
 def main():
     """主函数"""
@@ -1,5 +1,12 @@
 import asyncio
 import os
+import json
+import math
+import time
+import sqlite3
+import hashlib
+from collections import deque
+from urllib.parse import urljoin, urldefrag, urlparse
 from crawl4ai import AsyncWebCrawler
 from crawl4ai.async_configs import CrawlerRunConfig
 from crawl4ai.deep_crawl_strategy import DeepCrawlStrategy, DeepCrawlMode
@@ -59,5 +66,334 @@ async def main():
         
         print(f"\n索引文件已保存到 {index_path}")
 
+# ---------------- 可恢复的大规模深度爬取 ----------------
+# DeepCrawlStrategy把全部结果留在内存里，适合几个页面的演示。
+# FrontierCrawler把待爬URL队列保存在SQLite中，已见URL用持久化的布隆过滤器判重，
+# 每个站点单独限速，N个协程并发抓取，页面抓完立即写盘。中断后重新运行会从上次的位置继续
+
+# URL状态
+PENDING, IN_PROGRESS, DONE, FAILED = 0, 1, 2, 3
+
+
+class BloomFilter:
+    """保存在文件中的布隆过滤器，用于在不查数据库的情况下判断URL是否见过"""
+
+    def __init__(self, capacity=1000000, error_rate=0.001, path=None):
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.path = path
+        self.bits = bytearray((self.size + 7) // 8)
+        if path and os.path.exists(path):
+            with open(path, "rb") as f:
+                data = f.read()
+            if len(data) == len(self.bits):
+                self.bits = bytearray(data)
+            else:
+                print(f"布隆过滤器文件 {path} 与当前容量不符，已忽略")
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hash_count)]
+
+    def __contains__(self, item):
+        return all(self.bits[p >> 3] & (1 << (p & 7)) for p in self._positions(item))
+
+    def add(self, item):
+        for p in self._positions(item):
+            self.bits[p >> 3] |= 1 << (p & 7)
+
+    def save(self):
+        if not self.path:
+            return
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(self.bits)
+        os.replace(tmp_path, self.path)
+
+
+class UrlFrontier:
+    """SQLite中的待爬URL队列，记录每个URL的深度、状态和重试次数"""
+
+    def __init__(self, db_path):
+        self.conn = sqlite3.connect(db_path)
+        # WAL模式下每个页面提交一次的开销很小
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""CREATE TABLE IF NOT EXISTS urls (
+            url TEXT PRIMARY KEY,
+            host TEXT NOT NULL,
+            depth INTEGER NOT NULL,
+            status INTEGER NOT NULL DEFAULT 0,
+            attempts INTEGER NOT NULL DEFAULT 0)""")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_urls_status ON urls(status, depth)")
+        # 上次中断时正在抓取的URL重新排队
+        self.conn.execute("UPDATE urls SET status=? WHERE status=?", (PENDING, IN_PROGRESS))
+        self.conn.commit()
+
+    def add_many(self, items):
+        """加入新URL，items为[(url, depth), ...]，已存在的URL会被忽略"""
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO urls(url, host, depth) VALUES (?, ?, ?)",
+            [(url, urlparse(url).netloc, depth) for url, depth in items])
+
+    def take(self, limit):
+        """取出一批待爬URL并标记为抓取中，浅层URL优先"""
+        rows = self.conn.execute(
+            "SELECT url, host, depth FROM urls WHERE status=? ORDER BY depth, rowid LIMIT ?",
+            (PENDING, limit)).fetchall()
+        self.conn.executemany("UPDATE urls SET status=? WHERE url=?", [(IN_PROGRESS, row[0]) for row in rows])
+        return rows
+
+    def mark(self, url, status, attempted=True):
+        self.conn.execute("UPDATE urls SET status=?, attempts=attempts+? WHERE url=?",
+                          (status, 1 if attempted else 0, url))
+
+    def count(self, status):
+        return self.conn.execute("SELECT COUNT(*) FROM urls WHERE status=?", (status,)).fetchone()[0]
+
+    def commit(self):
+        self.conn.commit()
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+
+class FrontierCrawler:
+    def __init__(self, start_urls, output_dir="output/deep_crawl", max_pages=100000, max_depth=3,
+                 workers=8, host_delay=1.0, url_patterns=None, exclude_patterns=None,
+                 max_retries=2, buffer_size=500, bloom_capacity=2000000):
+        """初始化深度爬虫
+
+        Args:
+            start_urls: 起始URL列表
+            output_dir: 输出目录，同时保存队列数据库、布隆过滤器、页面文件和索引
+            max_pages: 最多抓取的页面数（包括之前运行中已抓取的）
+            max_depth: 最大链接深度
+            workers: 并发抓取的协程数
+            host_delay: 同一站点两次请求之间的最小间隔（秒）
+            url_patterns: URL需包含其中之一才会加入队列，为空则不限制
+            exclude_patterns: URL包含其中之一则跳过
+            max_retries: 抓取失败时的最多尝试次数
+            buffer_size: 内存中预取的URL数量上限
+            bloom_capacity: 布隆过滤器的设计容量
+        """
+        self.start_urls = start_urls
+        self.output_dir = output_dir
+        self.max_pages = max_pages
+        self.max_depth = max_depth
+        self.workers = workers
+        self.host_delay = host_delay
+        self.url_patterns = url_patterns or []
+        self.exclude_patterns = exclude_patterns or []
+        self.max_retries = max_retries
+        self.buffer_size = buffer_size
+        self.pages_dir = os.path.join(output_dir, "pages")
+
+        # 确保输出目录存在
+        os.makedirs(self.pages_dir, exist_ok=True)
+
+        self.frontier = UrlFrontier(os.path.join(output_dir, "frontier.db"))
+        self.seen = BloomFilter(bloom_capacity, path=os.path.join(output_dir, "seen.bloom"))
+
+        # 按站点分组的预取队列、站点下次允许请求的时间、正在请求的站点
+        self._queues = {}
+        self._buffered = 0
+        self._host_ready_at = {}
+        self._busy_hosts = set()
+        self._in_flight = 0
+        self._lock = asyncio.Lock()
+        self.pages_done = self.frontier.count(DONE)
+        self._dedupe_index()
+
+    def _accept(self, url):
+        if not url.startswith(("http://", "https://")):
+            return False
+        if self.url_patterns and not any(p in url for p in self.url_patterns):
+            return False
+        return not any(p in url for p in self.exclude_patterns)
+
+    def _enqueue(self, urls, depth):
+        """新URL先经布隆过滤器判重再写入队列数据库"""
+        items = []
+        for url in urls:
+            url = urldefrag(url)[0]
+            if not self._accept(url) or url in self.seen:
+                continue
+            self.seen.add(url)
+            items.append((url, depth))
+        if items:
+            self.frontier.add_many(items)
+        return len(items)
+
+    def _refill(self):
+        if self._buffered >= self.buffer_size // 2:
+            return
+        for url, host, depth in self.frontier.take(self.buffer_size - self._buffered):
+            self._queues.setdefault(host, deque()).append((url, depth))
+            self._buffered += 1
+
+    async def _next_url(self):
+        """取下一个可以抓取的URL：站点不在请求中且已过限速间隔。没有可抓取的URL时返回None"""
+        while True:
+            async with self._lock:
+                if self.pages_done + self._in_flight >= self.max_pages:
+                    return None
+                self._refill()
+                now = time.monotonic()
+                wait = None
+                for host, queue in self._queues.items():
+                    if host in self._busy_hosts:
+                        continue
+                    ready_at = self._host_ready_at.get(host, 0)
+                    if ready_at <= now:
+                        url, depth = queue.popleft()
+                        if not queue:
+                            del self._queues[host]
+                        self._buffered -= 1
+                        self._busy_hosts.add(host)
+                        self._in_flight += 1
+                        return url, host, depth
+                    wait = ready_at - now if wait is None else min(wait, ready_at - now)
+                if not self._queues and self._in_flight == 0:
+                    # 队列为空且没有正在抓取的页面，不会再有新URL
+                    return None
+            await asyncio.sleep(wait if wait is not None else 0.05)
+
+    def _dedupe_index(self):
+        """上次在写完索引行、提交队列之前中断时，该页面会被重新抓取，恢复时去掉索引中的重复行"""
+        index_path = os.path.join(self.output_dir, "index.jsonl")
+        if not os.path.exists(index_path):
+            return
+        with open(index_path, "r", encoding="utf-8") as f:
+            lines = f.readlines()
+        seen_urls = set()
+        unique = []
+        for line in lines:
+            try:
+                url = json.loads(line)["url"]
+            except (ValueError, KeyError):
+                continue
+            if url not in seen_urls:
+                seen_urls.add(url)
+                unique.append(line)
+        if len(unique) == len(lines):
+            return
+        tmp_path = index_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.writelines(unique)
+        os.replace(tmp_path, index_path)
+        print(f"索引中去掉了 {len(lines) - len(unique)} 行重复或损坏的记录")
+
+    def _save_page(self, url, depth, markdown):
+        """页面抓取完成后立即写盘，并在索引中追加一行"""
+        name = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        folder = os.path.join(self.pages_dir, name[:2])
+        os.makedirs(folder, exist_ok=True)
+        file_path = os.path.join(folder, f"{name}.md")
+        with open(file_path, "w", encoding="utf-8") as f:
+            f.write(f"# {url}\n\n")
+            f.write(markdown or "")
+        with open(os.path.join(self.output_dir, "index.jsonl"), "a", encoding="utf-8") as f:
+            f.write(json.dumps({"url": url, "depth": depth,
+                                "file": os.path.relpath(file_path, self.output_dir)}, ensure_ascii=False) + "\n")
+
+    @staticmethod
+    def _links(result, base_url):
+        links = []
+        for group in (getattr(result, "links", None) or {}).values():
+            for link in group:
+                href = link.get("href") if isinstance(link, dict) else link
+                if href:
+                    links.append(urljoin(base_url, href))
+        return links
+
+    async def _worker(self, crawler, config):
+        while True:
+            task = await self._next_url()
+            if task is None:
+                return
+            url, host, depth = task
+            try:
+                result = await crawler.arun(url=url, config=config)
+                success = getattr(result, "success", True)
+            except Exception as e:
+                print(f"抓取 {url} 失败: {e}")
+                result, success = None, False
+
+            async with self._lock:
+                self._in_flight -= 1
+                self._busy_hosts.discard(host)
+                self._host_ready_at[host] = time.monotonic() + self.host_delay
+
+                if success:
+                    self._save_page(url, depth, str(result.markdown or ""))
+                    self.frontier.mark(url, DONE)
+                    self.pages_done += 1
+                    if depth < self.max_depth:
+                        self._enqueue(self._links(result, url), depth + 1)
+                else:
+                    attempts = self.frontier.conn.execute(
+                        "SELECT attempts FROM urls WHERE url=?", (url,)).fetchone()[0]
+                    self.frontier.mark(url, PENDING if attempts + 1 < self.max_retries else FAILED)
+                # 页面状态、新链接和刚写入的索引行一起提交，中断后不会重复抓取已保存的页面
+                self.frontier.commit()
+                if success and self.pages_done % 100 == 0:
+                    # 布隆过滤器在队列提交之后保存，其中的URL一定已在队列中；
+                    # 中断时未保存的部分只会让链接再次入队，由队列表的主键去重
+                    self.seen.save()
+                    print(f"已抓取 {self.pages_done} 个页面，待抓取 {self.frontier.count(PENDING) + self._buffered} 个")
+
+    def _checkpoint(self):
+        self.frontier.commit()
+        self.seen.save()
+
+    async def run(self):
+        """开始或继续爬取
+
+        Returns:
+            int: 累计抓取的页面数
+        """
+        start_time = time.perf_counter()
+        done_before = self.pages_done
+        self._enqueue(self.start_urls, 0)
+        self.frontier.commit()
+        print(f"开始深度爬取，已完成 {done_before} 个页面，并发数 {self.workers}")
+
+        config = CrawlerRunConfig()
+        try:
+            async with AsyncWebCrawler() as crawler:
+                await asyncio.gather(*(self._worker(crawler, config) for _ in range(self.workers)))
+        finally:
+            # 未抓取的预取URL放回队列
+            for queue in self._queues.values():
+                for url, _ in queue:
+                    self.frontier.mark(url, PENDING, attempted=False)
+            self._checkpoint()
+            self.frontier.close()
+
+        elapsed = time.perf_counter() - start_time
+        print(f"本次抓取 {self.pages_done - done_before} 个页面，累计 {self.pages_done} 个，耗时 {elapsed:.1f} 秒")
+        return self.pages_done
+
+
+async def frontier_crawl_example():
+    crawler = FrontierCrawler(
+        ["https://docs.crawl4ai.com"],
+        output_dir="output/deep_crawl_frontier",
+        max_pages=1000,
+        max_depth=3,
+        workers=8,
+        url_patterns=["docs.crawl4ai.com"],
+        exclude_patterns=["github.com", "discord.gg"]
+    )
+    await crawler.run()
+
+
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(main())
+    
+    # 大规模、可中断续爬的版本
+    # asyncio.run(frontier_crawl_example())
\ No newline at end of file
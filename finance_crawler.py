@@ -4,42 +4,149 @@ import json
 from datetime import datetime
 import pandas as pd
 import tushare as ts
+from tushare_client import TushareClient
+from page_cache import PageCache
+from item_store import ItemStore
+from sentiment import KeywordSentimentScorer
+from sentiment_series import SentimentSeries, item_time
 from crawl4ai import AsyncWebCrawler, CrawlerRunConfig
 from crawl4ai.extraction import JsonCssExtractionStrategy
 
 
 class FinanceCrawler:
-    def __init__(self, tushare_token=None):
+    def __init__(self, tushare_token=None, max_concurrency=5, pool_size=1, cache_ttl=3600):
         """初始化财经爬虫
         
         Args:
             tushare_token: Tushare Pro的API token
+            max_concurrency: 同时进行的页面抓取数量上限
+            pool_size: 常驻浏览器实例数量，多个页面抓取共用这些浏览器
+            cache_ttl: 网页磁盘缓存的有效期（秒），为None时不使用磁盘缓存
         """
         self.tushare_token = tushare_token
         self.pro = None
         self.output_dir = 'finance_data'
+        self.max_concurrency = max_concurrency
+        self.pool_size = pool_size
+        
+        # 浏览器会话池，第一次抓取时启动，调用close()时关闭
+        self._crawlers = []
+        self._next_crawler = 0
+        self._pool_lock = None
+        self._semaphore = None
         
         # 确保输出目录存在
         if not os.path.exists(self.output_dir):
             os.makedirs(self.output_dir)
+        
+        # 网页磁盘缓存，进程重启后未变化的页面不需要重新抓取和提取
+        self.page_cache = None
+        if cache_ttl is not None:
+            self.page_cache = PageCache(os.path.join(self.output_dir, 'page_cache'), ttl=cache_ttl)
+        
+        # 新闻和论坛条目的去重存储，每次抓取只保存和分析新出现的条目
+        self.item_store = ItemStore(os.path.join(self.output_dir, 'items'))
+        
+        # 关键词情感打分器，可替换为自定义词表
+        self.sentiment_scorer = KeywordSentimentScorer()
+        
+        # 按股票保存的小时级情感序列，可与日线数据按交易日对齐
+        self.sentiment_series = SentimentSeries(os.path.join(self.output_dir, 'sentiment'))
     
     def login_tushare(self):
         """登录Tushare Pro API"""
         if self.tushare_token:
             ts.set_token(self.tushare_token)
-            self.pro = ts.pro_api()
+            self.pro = TushareClient(ts.pro_api(), token=self.tushare_token)
             print("成功登录Tushare Pro API")
             return True
         else:
             print("未提供Tushare Pro API token，部分功能将不可用")
             return False
     
+    async def _get_crawler(self):
+        """从会话池中取一个浏览器实例，池为空时先启动"""
+        if self._pool_lock is None:
+            self._pool_lock = asyncio.Lock()
+        async with self._pool_lock:
+            if not self._crawlers:
+                for _ in range(self.pool_size):
+                    crawler = AsyncWebCrawler()
+                    await crawler.__aenter__()
+                    self._crawlers.append(crawler)
+                print(f"已启动 {self.pool_size} 个浏览器实例")
+            crawler = self._crawlers[self._next_crawler % len(self._crawlers)]
+            self._next_crawler += 1
+            return crawler
+    
+    async def fetch(self, url, config):
+        """使用会话池抓取页面，同时进行的抓取数量不超过max_concurrency
+        
+        Args:
+            url: 页面地址
+            config: CrawlerRunConfig
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        async with self._semaphore:
+            crawler = await self._get_crawler()
+            return await crawler.arun(url=url, config=config)
+    
+    async def fetch_extracted(self, url, config, field):
+        """抓取页面并返回提取结果中的指定字段，优先使用磁盘缓存
+        
+        缓存在有效期内直接返回；过期后发条件请求确认页面未变化也直接返回，
+        只有页面变化或没有缓存时才启动浏览器抓取和提取
+        
+        Args:
+            url: 页面地址
+            config: CrawlerRunConfig
+            field: 提取结果中的字段名，如news、posts
+        """
+        if self.page_cache:
+            cached = self.page_cache.get(url)
+            if cached is None:
+                cached = await asyncio.to_thread(self.page_cache.revalidate, url)
+            if cached is not None:
+                print(f"{url} 未变化，使用缓存的提取结果")
+                return cached
+        
+        result = await self.fetch(url, config)
+        if not result.extracted_data or field not in result.extracted_data:
+            return None
+        
+        extracted = result.extracted_data[field]
+        if self.page_cache:
+            await asyncio.to_thread(self.page_cache.put, url, getattr(result, 'html', ''), extracted,
+                                    response_headers=getattr(result, 'response_headers', None))
+        return extracted
+    
+    async def close(self):
+        """关闭会话池中的浏览器，并保存网页缓存索引"""
+        crawlers, self._crawlers = self._crawlers, []
+        for crawler in crawlers:
+            try:
+                await crawler.__aexit__(None, None, None)
+            except Exception as e:
+                print(f"关闭浏览器失败: {e}")
+        if self.page_cache:
+            await asyncio.to_thread(self.page_cache.close)
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+    
     async def crawl_stock_news(self, stock_code=None, pages=1):
         """爬取股票相关新闻
         
         Args:
             stock_code: 股票代码，如果为None则爬取财经首页新闻
             pages: 爬取的页面数量
+            
+        Returns:
+            list: 本次新出现的新闻，此前抓取过的条目不会再次返回
         """
         # 根据是否有股票代码决定爬取的URL
         if stock_code:
@@ -67,43 +174,43 @@ class FinanceCrawler:
             })
         )
         
-        # 创建爬虫实例
-        async with AsyncWebCrawler() as crawler:
-            print(f"正在爬取 {base_url} 的新闻...")
-            result = await crawler.arun(url=base_url, config=config)
-            
-            # 保存提取的数据
-            if result.extracted_data and 'news' in result.extracted_data:
-                news_data = result.extracted_data['news']
-                timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-                file_name = f"news_{stock_code or 'finance'}_{timestamp}.json"
-                file_path = os.path.join(self.output_dir, file_name)
-                
-                with open(file_path, 'w', encoding='utf-8') as f:
-                    json.dump(news_data, f, ensure_ascii=False, indent=2)
-                print(f"新闻数据已保存至 {file_path}")
-                
-                # 同时保存Markdown格式的内容
-                md_file_path = os.path.join(self.output_dir, f"news_{stock_code or 'finance'}_{timestamp}.md")
-                with open(md_file_path, 'w', encoding='utf-8') as f:
-                    f.write(f"# 财经新闻 - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
-                    for item in news_data:
-                        f.write(f"## {item.get('title', '无标题')}\n")
-                        f.write(f"来源: {item.get('source', '未知')} | 时间: {item.get('time', '未知')}\n\n")
-                        f.write(f"{item.get('summary', '无摘要')}\n\n")
-                        f.write(f"[阅读全文]({item.get('url', '#')})\n\n---\n\n")
-                print(f"新闻数据(Markdown格式)已保存至 {md_file_path}")
-                
-                return news_data
-            else:
-                print("未能提取到新闻数据")
-                return None
+        # 使用常驻的浏览器会话抓取，页面未变化时直接使用缓存
+        print(f"正在爬取 {base_url} 的新闻...")
+        news_data = await self.fetch_extracted(base_url, config, 'news')
+        
+        if not news_data:
+            print("未能提取到新闻数据")
+            return None
+        
+        # 只保存新出现的新闻
+        symbol = stock_code or 'finance'
+        new_items = self.item_store.add('news', symbol, news_data)
+        print(f"提取到 {len(news_data)} 条新闻，其中新增 {len(new_items)} 条")
+        if not new_items:
+            return []
+        print(f"新增新闻已追加至 {self.item_store.root_dir}")
+        
+        # 同时把新增新闻追加到Markdown文件
+        md_file_path = os.path.join(self.output_dir, f"news_{symbol}.md")
+        with open(md_file_path, 'a', encoding='utf-8') as f:
+            f.write(f"# 财经新闻 - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
+            for item in new_items:
+                f.write(f"## {item.get('title', '无标题')}\n")
+                f.write(f"来源: {item.get('source', '未知')} | 时间: {item.get('time', '未知')}\n\n")
+                f.write(f"{item.get('summary', '无摘要')}\n\n")
+                f.write(f"[阅读全文]({item.get('url', '#')})\n\n---\n\n")
+        print(f"新闻数据(Markdown格式)已追加至 {md_file_path}")
+        
+        return new_items
     
     async def crawl_stock_forum(self, stock_code):
         """爬取股票论坛讨论
         
         Args:
             stock_code: 股票代码
+            
+        Returns:
+            list: 本次新出现的帖子，此前抓取过的条目不会再次返回
         """
         # 这里使用东方财富股吧作为示例
         url = f"http://guba.eastmoney.com/list,{stock_code}.html"
@@ -126,26 +233,20 @@ class FinanceCrawler:
             })
         )
         
-        # 创建爬虫实例
-        async with AsyncWebCrawler() as crawler:
-            print(f"正在爬取 {url} 的论坛讨论...")
-            result = await crawler.arun(url=url, config=config)
-            
-            # 保存提取的数据
-            if result.extracted_data and 'posts' in result.extracted_data:
-                posts_data = result.extracted_data['posts']
-                timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-                file_name = f"forum_{stock_code}_{timestamp}.json"
-                file_path = os.path.join(self.output_dir, file_name)
-                
-                with open(file_path, 'w', encoding='utf-8') as f:
-                    json.dump(posts_data, f, ensure_ascii=False, indent=2)
-                print(f"论坛数据已保存至 {file_path}")
-                
-                return posts_data
-            else:
-                print("未能提取到论坛数据")
-                return None
+        # 使用常驻的浏览器会话抓取，页面未变化时直接使用缓存
+        print(f"正在爬取 {url} 的论坛讨论...")
+        posts_data = await self.fetch_extracted(url, config, 'posts')
+        
+        if not posts_data:
+            print("未能提取到论坛数据")
+            return None
+        
+        # 只保存新出现的帖子
+        new_items = self.item_store.add('posts', stock_code, posts_data)
+        print(f"提取到 {len(posts_data)} 条帖子，其中新增 {len(new_items)} 条")
+        if new_items:
+            print(f"新增帖子已追加至 {self.item_store.root_dir}")
+        return new_items
     
     def get_stock_data(self, stock_code, start_date=None, end_date=None):
         """获取股票历史数据
@@ -178,59 +279,24 @@ class FinanceCrawler:
             print(f"获取 {stock_code} 的历史数据失败: {e}")
             return None
     
-    async def analyze_stock_sentiment(self, stock_code):
-        """分析股票相关新闻和论坛的情感
+    async def analyze_stock_sentiment(self, stock_code, verbose=True):
+        """分析股票相关新闻和论坛的情感，只统计本次新出现的条目
         
         Args:
             stock_code: 股票代码
+            verbose: 是否打印情感分析报告
         """
-        # 爬取新闻和论坛数据
-        news_data = await self.crawl_stock_news(stock_code)
-        forum_data = await self.crawl_stock_forum(stock_code)
-        
-        # 这里可以添加情感分析的代码
-        # 简单示例：统计标题中的关键词
-        positive_keywords = ['涨', '利好', '增长', '突破', '机会', '看好']
-        negative_keywords = ['跌', '利空', '下跌', '风险', '警惕', '担忧']
-        
-        sentiment_results = {
-            'positive_count': 0,
-            'negative_count': 0,
-            'neutral_count': 0,
-            'total_count': 0
-        }
-        
-        # 分析新闻情感
-        if news_data:
-            for item in news_data:
-                title = item.get('title', '')
-                sentiment_results['total_count'] += 1
-                
-                is_positive = any(keyword in title for keyword in positive_keywords)
-                is_negative = any(keyword in title for keyword in negative_keywords)
-                
-                if is_positive and not is_negative:
-                    sentiment_results['positive_count'] += 1
-                elif is_negative and not is_positive:
-                    sentiment_results['negative_count'] += 1
-                else:
-                    sentiment_results['neutral_count'] += 1
-        
-        # 分析论坛情感
-        if forum_data:
-            for item in forum_data:
-                title = item.get('title', '')
-                sentiment_results['total_count'] += 1
-                
-                is_positive = any(keyword in title for keyword in positive_keywords)
-                is_negative = any(keyword in title for keyword in negative_keywords)
-                
-                if is_positive and not is_negative:
-                    sentiment_results['positive_count'] += 1
-                elif is_negative and not is_positive:
-                    sentiment_results['negative_count'] += 1
-                else:
-                    sentiment_results['neutral_count'] += 1
+        # 新闻和论坛并发爬取
+        news_data, forum_data = await asyncio.gather(
+            self.crawl_stock_news(stock_code),
+            self.crawl_stock_forum(stock_code)
+        )
+        
+        # 新闻和论坛标题一起打分
+        items = (news_data or []) + (forum_data or [])
+        scored = self.sentiment_scorer.score_items(items)
+        sentiment_results = self.sentiment_scorer.summarize(scored)
+        self.sentiment_series.update(stock_code, scored, [item_time(item) for item in items])
         
         # 保存情感分析结果
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
@@ -241,6 +307,9 @@ class FinanceCrawler:
             json.dump(sentiment_results, f, ensure_ascii=False, indent=2)
         print(f"情感分析结果已保存至 {file_path}")
         
+        if not verbose:
+            return sentiment_results
+        
         # 打印简单的情感分析报告
         print("\n情感分析报告:")
         print(f"总计分析条目: {sentiment_results['total_count']}")
@@ -262,6 +331,39 @@ class FinanceCrawler:
                 print("整体情感: 中性 😐")
         
         return sentiment_results
+    
+    async def analyze_watchlist_sentiment(self, stock_codes):
+        """并发分析一组股票的情感，所有页面抓取共用会话池并受并发上限约束
+        
+        Args:
+            stock_codes: 股票代码列表
+            
+        Returns:
+            dict: 股票代码 -> 情感统计结果，失败的股票不包含在内
+        """
+        start_time = datetime.now()
+        results = await asyncio.gather(
+            *(self.analyze_stock_sentiment(code, verbose=False) for code in stock_codes),
+            return_exceptions=True
+        )
+        
+        summary = {}
+        for stock_code, result in zip(stock_codes, results):
+            if isinstance(result, Exception):
+                print(f"分析 {stock_code} 的情感失败: {result}")
+                continue
+            summary[stock_code] = result
+        
+        # 保存汇总结果
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        file_path = os.path.join(self.output_dir, f"sentiment_watchlist_{timestamp}.json")
+        with open(file_path, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+        
+        elapsed = (datetime.now() - start_time).total_seconds()
+        print(f"完成 {len(summary)}/{len(stock_codes)} 只股票的情感分析，耗时 {elapsed:.1f} 秒")
+        print(f"汇总结果已保存至 {file_path}")
+        return summary
 
 
 async def main():
@@ -281,6 +383,7 @@ async def main():
         print("2. 爬取股票论坛讨论")
         print("3. 获取股票历史数据 (需要Tushare token)")
         print("4. 股票情感分析")
+        print("5. 批量股票情感分析")
         print("0. 退出")
         
         choice = input("请输入选项编号: ")
@@ -312,7 +415,15 @@ async def main():
                 await crawler.analyze_stock_sentiment(stock_code)
             else:
                 print("股票代码不能为空")
+        elif choice == '5':
+            codes = input("请输入股票代码，用逗号分隔(如: 000001,600036): ")
+            stock_codes = [code.strip() for code in codes.split(',') if code.strip()]
+            if stock_codes:
+                await crawler.analyze_watchlist_sentiment(stock_codes)
+            else:
+                print("股票代码不能为空")
         elif choice == '0':
+            await crawler.close()
             print("程序已退出")
             break
         else:
@@ -1,42 +1,39 @@
-import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
-import mplfinance as mpf
+# 最先导入，启动耗时从这里开始计
+from lazy_imports import is_available, lazy_import, load_pyplot, preload, startup_timer
 import os
 import time
 import threading
 import tkinter as tk
 from tkinter import ttk, messagebox, scrolledtext
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 from datetime import datetime, timedelta
-import matplotlib
-import requests
-import json
-matplotlib.use('TkAgg')
+from background_loader import BackgroundLoader
 
-# 尝试导入免费的股票数据库
-try:
-    import akshare as ak
-    AKSHARE_AVAILABLE = True
-except ImportError:
-    AKSHARE_AVAILABLE = False
+# pandas、绘图库和数据源都在第一次使用时才导入，窗口可以先显示出来
+pd = lazy_import('pandas')
+np = lazy_import('numpy')
+mpf = lazy_import('mplfinance')
+backend_tkagg = lazy_import('matplotlib.backends.backend_tkagg')
+indicators = lazy_import('indicators')
+
+# 检查免费的股票数据库是否已安装，只查找不导入
+AKSHARE_AVAILABLE = is_available('akshare')
+ak = lazy_import('akshare')
+if not AKSHARE_AVAILABLE:
     print("AKShare未安装，请运行: pip install akshare")
 
-try:
-    import adata
-    ADATA_AVAILABLE = True
-except ImportError:
-    ADATA_AVAILABLE = False
+ADATA_AVAILABLE = is_available('adata')
+adata = lazy_import('adata')
+if not ADATA_AVAILABLE:
     print("AData未安装，请运行: pip install adata")
 
 # Ashare是单文件库，我们可以直接下载使用
-try:
-    from Ashare import get_price
-    ASHARE_AVAILABLE = True
-except ImportError:
-    ASHARE_AVAILABLE = False
+ASHARE_AVAILABLE = is_available('Ashare')
+Ashare = lazy_import('Ashare')
+if not ASHARE_AVAILABLE:
     print("Ashare未安装，请从GitHub下载Ashare.py文件")
 
+startup_timer.mark("模块导入")
+
 class FreeStockVisualizer:
     def __init__(self):
         """初始化免费股票可视化工具"""
@@ -233,7 +230,7 @@ class FreeStockVisualizer:
                 else:
                     symbol = f'sz{stock_code}'
                 
-                df = get_price(symbol, frequency='1d', count=days)
+                df = Ashare.get_price(symbol, frequency='1d', count=days)
                 
                 if not df.empty:
                     # 重置索引并标准化列名
@@ -252,55 +249,17 @@ class FreeStockVisualizer:
             print(f"获取日线数据失败: {e}")
             return None
     
-    def calculate_indicators(self, df):
+    def calculate_indicators(self, df, stock_code=None):
         """计算技术指标
         
         Args:
             df: 股票历史数据DataFrame
+            stock_code: 股票代码，提供时同一股票同一段数据只计算一次
             
         Returns:
             pandas.DataFrame: 添加了技术指标的DataFrame
         """
-        if df is None or df.empty:
-            return None
-        
-        # 复制DataFrame以避免修改原始数据
-        result = df.copy()
-        
-        # 计算移动平均线
-        result['MA5'] = result['close'].rolling(window=5).mean()
-        result['MA10'] = result['close'].rolling(window=10).mean()
-        result['MA20'] = result['close'].rolling(window=20).mean()
-        
-        # 计算MACD
-        result['EMA12'] = result['close'].ewm(span=12, adjust=False).mean()
-        result['EMA26'] = result['close'].ewm(span=26, adjust=False).mean()
-        result['DIF'] = result['EMA12'] - result['EMA26']
-        result['DEA'] = result['DIF'].ewm(span=9, adjust=False).mean()
-        result['MACD'] = 2 * (result['DIF'] - result['DEA'])
-        
-        # 计算KDJ
-        low_min = result['low'].rolling(window=9).min()
-        high_max = result['high'].rolling(window=9).max()
-        result['RSV'] = (result['close'] - low_min) / (high_max - low_min) * 100
-        result['K'] = result['RSV'].ewm(com=2).mean()
-        result['D'] = result['K'].ewm(com=2).mean()
-        result['J'] = 3 * result['K'] - 2 * result['D']
-        
-        # 计算BOLL指标
-        result['BOLL_MIDDLE'] = result['close'].rolling(window=20).mean()
-        result['BOLL_STD'] = result['close'].rolling(window=20).std()
-        result['BOLL_UPPER'] = result['BOLL_MIDDLE'] + 2 * result['BOLL_STD']
-        result['BOLL_LOWER'] = result['BOLL_MIDDLE'] - 2 * result['BOLL_STD']
-        
-        # 计算RSI
-        delta = result['close'].diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
-        rs = gain / loss
-        result['RSI'] = 100 - (100 / (1 + rs))
-        
-        return result
+        return indicators.calculate_indicators(df, symbol=stock_code, ma_windows=(5, 10, 20))
     
     def analyze_stock(self, df):
         """分析股票走势并给出建议
@@ -412,11 +371,13 @@ class FreeStockVisualizerGUI:
         self.root.title("免费股票可视化分析工具")
         self.root.geometry("1200x800")
         
-        # 设置中文字体
-        plt.rcParams['font.sans-serif'] = ['SimHei', 'Microsoft YaHei']
-        plt.rcParams['axes.unicode_minus'] = False
+        # 网络请求和指标计算在后台线程执行，界面只接收计算好的结果
+        self.loader = BackgroundLoader(self.root)
+        # 正在加载的股票代码，加载期间自动刷新暂停，避免结果互相覆盖
+        self.loading_stock = None
         
         self.setup_gui()
+        startup_timer.mark("界面创建")
         
     def setup_gui(self):
         """设置GUI界面"""
@@ -603,33 +564,60 @@ pip install adata
             self.load_stock_data(stock_code)
     
     def load_stock_data(self, stock_code):
-        """加载股票数据"""
-        try:
-            source = self.source_var.get()
-            
-            # 获取实时行情
-            realtime_data = self.visualizer.get_realtime_quotes(stock_code, source)
-            
-            # 获取历史数据
-            df = self.visualizer.get_daily_data(stock_code, days=120, source=source)
-            
-            if df is not None:
-                # 计算技术指标
-                df_with_indicators = self.visualizer.calculate_indicators(df)
-                
-                # 更新显示
-                self.update_info_display(stock_code, realtime_data, df_with_indicators)
-                self.update_chart_display(stock_code, df_with_indicators)
-                self.update_analysis_display(df_with_indicators)
-                
-                self.visualizer.current_stock = stock_code
-                self.visualizer.current_data = df_with_indicators
-                
-            else:
-                messagebox.showerror("错误", f"获取股票 {stock_code} 数据失败")
-                
-        except Exception as e:
-            messagebox.showerror("错误", f"加载股票数据失败: {e}")
+        """加载股票数据：后台获取行情和计算指标，完成后更新界面
+        
+        切换到其他股票时，尚未完成的旧请求和自动刷新都会被取消
+        """
+        source = self.source_var.get()
+        self.loader.cancel('live')
+        self.loading_stock = stock_code
+        self.loader.submit('stock', self.fetch_stock_data, stock_code, source,
+                           on_done=self.show_stock_data,
+                           on_error=self.on_load_error)
+    
+    def on_load_error(self, e):
+        self.loading_stock = None
+        messagebox.showerror("错误", f"加载股票数据失败: {e}")
+    
+    def refresh_stock_data(self, stock_code):
+        """自动刷新：使用单独的通道，不会取消用户刚点击的加载；加载进行中时跳过本次刷新"""
+        if self.loading_stock is not None or stock_code is None:
+            return
+        source = self.source_var.get()
+        self.loader.submit('live', self.fetch_stock_data, stock_code, source,
+                           on_done=self.show_live_data,
+                           on_error=lambda e: print(f"自动更新错误: {e}"))
+    
+    def show_live_data(self, result):
+        """显示自动刷新的结果，刷新期间已切换到其他股票时丢弃"""
+        if self.loading_stock is not None or result[0] != self.visualizer.current_stock:
+            return
+        self.show_stock_data(result)
+    
+    def fetch_stock_data(self, stock_code, source):
+        """在工作线程中获取实时行情、历史数据并计算技术指标"""
+        realtime_data = self.visualizer.get_realtime_quotes(stock_code, source)
+        df = self.visualizer.get_daily_data(stock_code, days=120, source=source)
+        df_with_indicators = None
+        if df is not None:
+            df_with_indicators = self.visualizer.calculate_indicators(df, stock_code)
+        return stock_code, realtime_data, df_with_indicators
+    
+    def show_stock_data(self, result):
+        """在主线程中显示加载完成的数据"""
+        stock_code, realtime_data, df_with_indicators = result
+        self.loading_stock = None
+        if df_with_indicators is None:
+            messagebox.showerror("错误", f"获取股票 {stock_code} 数据失败")
+            return
+        
+        # 更新显示
+        self.update_info_display(stock_code, realtime_data, df_with_indicators)
+        self.update_chart_display(stock_code, df_with_indicators)
+        self.update_analysis_display(df_with_indicators)
+        
+        self.visualizer.current_stock = stock_code
+        self.visualizer.current_data = df_with_indicators
     
     def update_info_display(self, stock_code, realtime_data, df):
         """更新基本信息显示"""
@@ -676,6 +664,7 @@ pip install adata
             df_plot.index = pd.to_datetime(df_plot.index)
             
             # 创建图表
+            plt = load_pyplot()
             fig, axes = plt.subplots(2, 1, figsize=(12, 8), gridspec_kw={'height_ratios': [3, 1]})
             
             # K线图
@@ -683,7 +672,7 @@ pip install adata
                     mav=(5, 10, 20), style='charles', title=f'{stock_code} K线图')
             
             # 嵌入到tkinter
-            canvas = FigureCanvasTkAgg(fig, self.chart_frame)
+            canvas = backend_tkagg.FigureCanvasTkAgg(fig, self.chart_frame)
             canvas.draw()
             canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
             
@@ -748,7 +737,7 @@ pip install adata
             try:
                 if self.visualizer.current_stock:
                     # 在主线程中更新UI
-                    self.root.after(0, lambda: self.load_stock_data(self.visualizer.current_stock))
+                    self.root.after(0, lambda: self.refresh_stock_data(self.visualizer.current_stock))
                 
                 # 等待更新间隔
                 for _ in range(self.visualizer.update_interval):
@@ -760,9 +749,23 @@ pip install adata
                 print(f"自动更新错误: {e}")
                 break
     
+    def preload_modules(self):
+        """窗口显示后在后台导入绘图库、数据处理库和数据源"""
+        modules = [load_pyplot, pd, np, indicators, mpf, backend_tkagg]
+        if AKSHARE_AVAILABLE:
+            modules.append(ak)
+        if ADATA_AVAILABLE:
+            modules.append(adata)
+        preload(*modules)
+    
     def run(self):
         """运行GUI"""
+        # 窗口显示后打印启动耗时（设置STARTUP_TIMING=1），再在后台预加载其余模块
+        startup_timer.report_when_shown(self.root)
+        self.root.after(100, self.preload_modules)
+        
         self.root.mainloop()
+        self.loader.shutdown()
 
 def main():
     """主函数"""
@@ -771,12 +774,9 @@ def main():
     # 检查依赖
     missing_deps = []
     
-    try:
-        import matplotlib
-        import pandas
-        import numpy
-    except ImportError as e:
-        missing_deps.append(str(e))
+    for module in ('matplotlib', 'pandas', 'numpy', 'mplfinance'):
+        if not is_available(module):
+            missing_deps.append(f"No module named '{module}'")
     
     if missing_deps:
         print("缺少必要依赖:")
@@ -0,0 +1,549 @@
+import math
+import threading
+from collections import deque, OrderedDict
+import numpy as np
+import pandas as pd
+
+# 多股票向量化技术指标引擎
+# 价格按 日期 × 股票 的二维数组排列，一次计算全市场的MA、MACD、KDJ、BOLL、RSI，
+# 时间方向逐行递推，股票方向整体用NumPy计算，不再对每只股票单独循环
+#
+# 计算口径与StockAnalyzer.calculate_technical_indicators一致：
+# 滚动窗口要求窗口内数据完整（与pandas rolling默认min_periods相同），
+# EWM与pandas ewm(adjust=..., ignore_na=False)的递推方式相同，停牌日（NaN）沿用上一个值
+
+
+def _as_array(values):
+    if isinstance(values, pd.DataFrame):
+        return values.to_numpy(dtype=float)
+    values = np.asarray(values, dtype=float)
+    if values.ndim == 1:
+        values = values.reshape(-1, 1)
+    return values
+
+
+def _rolling_reduce(values, window, reducer):
+    """沿时间方向做滚动聚合，循环次数为窗口长度，与股票数量无关"""
+    rows = values.shape[0]
+    result = np.full(values.shape, np.nan)
+    if rows < window:
+        return result
+    count = rows - window + 1
+    acc = values[:count].copy()
+    for k in range(1, window):
+        acc = reducer(acc, values[k:k + count])
+    result[window - 1:] = acc
+    return result
+
+
+def rolling_mean(values, window):
+    """滚动均值，窗口内有缺失时结果为NaN"""
+    values = _as_array(values)
+    return _rolling_reduce(values, window, np.add) / window
+
+
+def rolling_std(values, window):
+    """滚动标准差（ddof=1），先求均值再求离差平方和，避免大数相减的精度损失"""
+    values = _as_array(values)
+    rows = values.shape[0]
+    result = np.full(values.shape, np.nan)
+    if rows < window or window < 2:
+        return result
+    count = rows - window + 1
+    mean = rolling_mean(values, window)[window - 1:]
+    acc = np.zeros_like(mean)
+    for k in range(window):
+        diff = values[k:k + count] - mean
+        acc += diff * diff
+    result[window - 1:] = np.sqrt(acc / (window - 1))
+    return result
+
+
+def rolling_min(values, window):
+    values = _as_array(values)
+    return _rolling_reduce(values, window, np.minimum)
+
+
+def rolling_max(values, window):
+    values = _as_array(values)
+    return _rolling_reduce(values, window, np.maximum)
+
+
+def ewm_mean(values, alpha, adjust=True):
+    """指数加权均值，递推方式与pandas ewm(alpha=..., adjust=..., ignore_na=False).mean()一致
+
+    Args:
+        values: 日期 × 股票 的二维数组
+        alpha: 平滑系数
+        adjust: 是否使用pandas的adjust加权方式
+    """
+    values = _as_array(values)
+    decay = 1.0 - alpha
+    new_wt = 1.0 if adjust else alpha
+    result = np.full(values.shape, np.nan)
+    weighted = np.full(values.shape[1], np.nan)
+    old_wt = np.ones(values.shape[1])
+
+    for t in range(values.shape[0]):
+        cur = values[t]
+        observed = ~np.isnan(cur)
+        started = ~np.isnan(weighted)
+
+        old_wt = np.where(started, old_wt * decay, old_wt)
+        update = started & observed
+        weighted = np.where(update, (old_wt * weighted + new_wt * cur) / (old_wt + new_wt), weighted)
+        old_wt = np.where(update, old_wt + new_wt if adjust else 1.0, old_wt)
+        # 第一个有效值直接作为初始值
+        weighted = np.where(~started & observed, cur, weighted)
+        result[t] = weighted
+
+    return result
+
+
+def calculate_panel_indicators(close, high, low, ma_windows=(5, 10, 20, 30)):
+    """一次计算多只股票的技术指标
+
+    Args:
+        close: 收盘价，日期 × 股票 的二维数组或DataFrame
+        high: 最高价，形状同close
+        low: 最低价，形状同close
+        ma_windows: 需要计算的均线周期
+
+    Returns:
+        dict: 指标名 -> 二维数组（输入为DataFrame时为同索引的DataFrame），
+              指标名与calculate_technical_indicators生成的列名相同
+    """
+    frame = close if isinstance(close, pd.DataFrame) else None
+    close = _as_array(close)
+    high = _as_array(high)
+    low = _as_array(low)
+
+    result = {}
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # 移动平均线
+        for window in ma_windows:
+            result[f'MA{window}'] = rolling_mean(close, window)
+
+        # MACD
+        result['EMA12'] = ewm_mean(close, 2 / (12 + 1), adjust=False)
+        result['EMA26'] = ewm_mean(close, 2 / (26 + 1), adjust=False)
+        result['DIF'] = result['EMA12'] - result['EMA26']
+        result['DEA'] = ewm_mean(result['DIF'], 2 / (9 + 1), adjust=False)
+        result['MACD'] = 2 * (result['DIF'] - result['DEA'])
+
+        # KDJ
+        low_min = rolling_min(low, 9)
+        high_max = rolling_max(high, 9)
+        result['RSV'] = (close - low_min) / (high_max - low_min) * 100
+        result['K'] = ewm_mean(result['RSV'], 1 / (1 + 2))
+        result['D'] = ewm_mean(result['K'], 1 / (1 + 2))
+        result['J'] = 3 * result['K'] - 2 * result['D']
+
+        # BOLL
+        result['BOLL_MIDDLE'] = rolling_mean(close, 20)
+        result['BOLL_STD'] = rolling_std(close, 20)
+        result['BOLL_UPPER'] = result['BOLL_MIDDLE'] + 2 * result['BOLL_STD']
+        result['BOLL_LOWER'] = result['BOLL_MIDDLE'] - 2 * result['BOLL_STD']
+
+        # RSI
+        delta = np.full(close.shape, np.nan)
+        delta[1:] = close[1:] - close[:-1]
+        up = np.where(delta > 0, delta, np.where(np.isnan(delta), np.nan, 0.0))
+        down = np.where(delta < 0, -delta, np.where(np.isnan(delta), np.nan, 0.0))
+        ema_up = ewm_mean(up, 1 / (1 + 13), adjust=False)
+        ema_down = ewm_mean(down, 1 / (1 + 13), adjust=False)
+        result['RSI'] = 100 - (100 / (1 + ema_up / ema_down))
+
+    if frame is not None:
+        result = {name: pd.DataFrame(values, index=frame.index, columns=frame.columns)
+                  for name, values in result.items()}
+    return result
+
+
+def pivot_panel(df, fields=('open', 'high', 'low', 'close', 'vol'),
+                date_col='trade_date', code_col='ts_code'):
+    """把长表（每行一只股票一个交易日）转换为 日期 × 股票 的宽表
+
+    Returns:
+        dict: 字段名 -> DataFrame（索引为日期，列为股票代码）
+    """
+    df = df.drop_duplicates(subset=[date_col, code_col], keep='last')
+    panel = {}
+    for field in fields:
+        if field in df.columns:
+            panel[field] = df.pivot(index=date_col, columns=code_col, values=field).sort_index()
+    return panel
+
+
+def calculate_long_indicators(df, date_col='trade_date', code_col='ts_code', ma_windows=(5, 10, 20, 30)):
+    """对长表计算全市场技术指标
+
+    Args:
+        df: 包含ts_code、trade_date、high、low、close列的长表，例如多只股票pro.daily结果拼接
+
+    Returns:
+        dict: 指标名 -> DataFrame（日期 × 股票）
+    """
+    panel = pivot_panel(df, fields=('high', 'low', 'close'), date_col=date_col, code_col=code_col)
+    return calculate_panel_indicators(panel['close'], panel['high'], panel['low'], ma_windows)
+
+
+def latest_cross_section(panel):
+    """取各股票最新一个交易日的指标值
+
+    Args:
+        panel: 字段名 -> DataFrame（日期 × 股票），可以同时包含价格字段和指标
+
+    Returns:
+        pandas.DataFrame: 每行一只股票，列为各字段最新值
+    """
+    return pd.DataFrame({name: frame.iloc[-1] for name, frame in panel.items()})
+
+
+# 中文列名（akshare日线）到统一列名的映射
+CHINESE_COLUMNS = {'开盘': 'open', '收盘': 'close', '最高': 'high', '最低': 'low', '成交量': 'vol'}
+
+
+class IndicatorCache:
+    def __init__(self, max_size=64):
+        """技术指标结果缓存，按(股票代码, 最新K线, 参数)索引，超过容量时淘汰最久未使用的结果
+
+        Args:
+            max_size: 最多缓存的结果数量
+        """
+        self.max_size = max_size
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            result = self._items.get(key)
+            if result is not None:
+                self._items.move_to_end(key)
+            return result
+
+    def put(self, key, result):
+        with self._lock:
+            self._items[key] = result
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+
+indicator_cache = IndicatorCache()
+
+
+def _cache_key(df, symbol, close, high, low, params):
+    # 同一股票、同样的K线区间、最新K线未变化时结果一定相同；
+    # 首尾K线的价格也放入键中，盘中K线变化或索引为行号时都能区分
+    first = df.iloc[0]
+    last = df.iloc[-1]
+    first_bar = tuple(float(first[col]) for col in (close, high, low))
+    last_bar = tuple(float(last[col]) for col in (close, high, low))
+    return (symbol, len(df), df.index[0], df.index[-1], first_bar, last_bar, params)
+
+
+def calculate_indicators(df, symbol=None, ma_windows=(5, 10, 20, 30), rsi_window=14, column_map=None,
+                         use_cache=True):
+    """计算单只股票的技术指标，所有工具共用的统一实现
+
+    Args:
+        df: 按日期升序排列的K线数据
+        symbol: 股票代码，提供时按(股票代码, 最新K线, 参数)缓存结果，切换页面或重新加载同一股票不会重复计算
+        ma_windows: 需要计算的均线周期
+        rsi_window: RSI周期，RSI统一使用Wilder平滑
+        column_map: 原始列名到open/high/low/close的映射，例如CHINESE_COLUMNS
+        use_cache: 是否使用缓存
+
+    Returns:
+        pandas.DataFrame: 添加了技术指标的DataFrame（原始列名保持不变）
+    """
+    if df is None or df.empty:
+        return None
+
+    names = {'open': 'open', 'high': 'high', 'low': 'low', 'close': 'close'}
+    if column_map:
+        names.update({target: source for source, target in column_map.items()})
+    close_col, high_col, low_col = names['close'], names['high'], names['low']
+
+    key = None
+    if symbol is not None and use_cache:
+        key = _cache_key(df, symbol, close_col, high_col, low_col,
+                         (tuple(ma_windows), rsi_window))
+        cached = indicator_cache.get(key)
+        if cached is not None:
+            # 返回副本，调用方修改结果不会影响缓存
+            return cached.copy()
+
+    # 复制DataFrame以避免修改原始数据
+    result = df.copy()
+    close = result[close_col]
+
+    # 移动平均线
+    for window in ma_windows:
+        result[f'MA{window}'] = close.rolling(window=window).mean()
+
+    # MACD
+    result['EMA12'] = close.ewm(span=12, adjust=False).mean()
+    result['EMA26'] = close.ewm(span=26, adjust=False).mean()
+    result['DIF'] = result['EMA12'] - result['EMA26']
+    result['DEA'] = result['DIF'].ewm(span=9, adjust=False).mean()
+    result['MACD'] = 2 * (result['DIF'] - result['DEA'])
+
+    # KDJ
+    low_min = result[low_col].rolling(window=9).min()
+    high_max = result[high_col].rolling(window=9).max()
+    result['RSV'] = (close - low_min) / (high_max - low_min) * 100
+    result['K'] = result['RSV'].ewm(com=2).mean()
+    result['D'] = result['K'].ewm(com=2).mean()
+    result['J'] = 3 * result['K'] - 2 * result['D']
+
+    # BOLL
+    result['BOLL_MIDDLE'] = close.rolling(window=20).mean()
+    result['BOLL_STD'] = close.rolling(window=20).std()
+    result['BOLL_UPPER'] = result['BOLL_MIDDLE'] + 2 * result['BOLL_STD']
+    result['BOLL_LOWER'] = result['BOLL_MIDDLE'] - 2 * result['BOLL_STD']
+
+    # RSI（Wilder平滑）
+    delta = close.diff()
+    up = delta.clip(lower=0)
+    down = -1 * delta.clip(upper=0)
+    avg_up = up.ewm(com=rsi_window - 1, adjust=False).mean()
+    avg_down = down.ewm(com=rsi_window - 1, adjust=False).mean()
+    rs = avg_up / avg_down
+    result['RSI'] = 100 - (100 / (1 + rs))
+
+    if key is not None:
+        indicator_cache.put(key, result)
+        return result.copy()
+    return result
+
+
+class _EwmState:
+    """单个序列的EWM递推状态，递推方式与ewm_mean相同"""
+
+    def __init__(self, alpha, adjust=True):
+        self.decay = 1.0 - alpha
+        self.new_wt = 1.0 if adjust else alpha
+        self.adjust = adjust
+        self.weighted = math.nan
+        self.old_wt = 1.0
+
+    def _step(self, x):
+        weighted, old_wt = self.weighted, self.old_wt
+        if not math.isnan(weighted):
+            old_wt *= self.decay
+            if not math.isnan(x):
+                weighted = (old_wt * weighted + self.new_wt * x) / (old_wt + self.new_wt)
+                old_wt = old_wt + self.new_wt if self.adjust else 1.0
+        elif not math.isnan(x):
+            weighted = x
+        return weighted, old_wt
+
+    def peek(self, x):
+        """计算加入x后的值，不改变状态"""
+        return self._step(x)[0]
+
+    def push(self, x):
+        """加入x并更新状态"""
+        self.weighted, self.old_wt = self._step(x)
+        return self.weighted
+
+
+class _RollingWindow:
+    """固定长度的滚动窗口，只保存已确认的前window-1个值和它们的和"""
+
+    def __init__(self, window):
+        self.window = window
+        self.values = deque(maxlen=window - 1)
+        self.total = 0.0
+        self.nan_count = 0
+
+    def _ready(self, x):
+        return len(self.values) == self.window - 1 and self.nan_count == 0 and not math.isnan(x)
+
+    def peek(self, x):
+        """加入x后的窗口均值，窗口不满或含缺失值时为NaN"""
+        if not self._ready(x):
+            return math.nan
+        return (self.total + x) / self.window
+
+    def std(self, x):
+        """加入x后的窗口标准差（ddof=1），开销只与窗口长度有关"""
+        if not self._ready(x) or self.window < 2:
+            return math.nan
+        mean = (self.total + x) / self.window
+        acc = (x - mean) ** 2
+        for value in self.values:
+            acc += (value - mean) ** 2
+        return math.sqrt(acc / (self.window - 1))
+
+    def push(self, x):
+        """确认x，返回加入后的窗口均值"""
+        mean = self.peek(x)
+        if self.window == 1:
+            return mean
+        if len(self.values) == self.window - 1:
+            left = self.values[0]
+            if math.isnan(left):
+                self.nan_count -= 1
+            else:
+                self.total -= left
+        if math.isnan(x):
+            self.nan_count += 1
+        else:
+            self.total += x
+        self.values.append(x)
+        return mean
+
+
+class StreamingIndicators:
+    def __init__(self, ma_windows=(5, 10, 20, 30), boll_window=20, kdj_window=9,
+                 rsi_window=14):
+        """初始化增量指标计算器
+
+        保存滚动窗口和EWM的中间状态，每来一根新K线或盘中K线有变化时只做常数次运算，
+        结果与calculate_panel_indicators对整段历史重新计算的结果一致。
+
+        Args:
+            ma_windows: 需要计算的均线周期
+            boll_window: 布林带周期
+            kdj_window: KDJ的RSV周期
+            rsi_window: RSI周期，与calculate_indicators相同使用Wilder平滑
+        """
+        self.ma = {window: _RollingWindow(window) for window in ma_windows}
+        self.boll = _RollingWindow(boll_window)
+        self.highs = deque(maxlen=kdj_window - 1)
+        self.lows = deque(maxlen=kdj_window - 1)
+        self.kdj_window = kdj_window
+
+        self.ema12 = _EwmState(2 / (12 + 1), adjust=False)
+        self.ema26 = _EwmState(2 / (26 + 1), adjust=False)
+        self.dea = _EwmState(2 / (9 + 1), adjust=False)
+        self.k = _EwmState(1 / (1 + 2))
+        self.d = _EwmState(1 / (1 + 2))
+
+        self.rsi_up = _EwmState(1 / rsi_window, adjust=False)
+        self.rsi_down = _EwmState(1 / rsi_window, adjust=False)
+
+        self.prev_close = math.nan
+        self.pending_key = None
+        self.pending_bar = None
+
+    def _process(self, bar, commit):
+        close = float(bar['close'])
+        high = float(bar['high'])
+        low = float(bar['low'])
+
+        def step(state, x):
+            return state.push(x) if commit else state.peek(x)
+
+        values = {}
+        # 移动平均线
+        for window, state in self.ma.items():
+            values[f'MA{window}'] = step(state, close)
+
+        # MACD
+        values['EMA12'] = step(self.ema12, close)
+        values['EMA26'] = step(self.ema26, close)
+        values['DIF'] = values['EMA12'] - values['EMA26']
+        values['DEA'] = step(self.dea, values['DIF'])
+        values['MACD'] = 2 * (values['DIF'] - values['DEA'])
+
+        # KDJ
+        rsv = math.nan
+        if len(self.lows) == self.kdj_window - 1:
+            low_min = min(min(self.lows, default=low), low)
+            high_max = max(max(self.highs, default=high), high)
+            if high_max != low_min:
+                rsv = (close - low_min) / (high_max - low_min) * 100
+        values['RSV'] = rsv
+        values['K'] = step(self.k, rsv)
+        values['D'] = step(self.d, values['K'])
+        values['J'] = 3 * values['K'] - 2 * values['D']
+
+        # BOLL
+        values['BOLL_MIDDLE'] = self.boll.peek(close)
+        values['BOLL_STD'] = self.boll.std(close)
+        values['BOLL_UPPER'] = values['BOLL_MIDDLE'] + 2 * values['BOLL_STD']
+        values['BOLL_LOWER'] = values['BOLL_MIDDLE'] - 2 * values['BOLL_STD']
+        if commit:
+            self.boll.push(close)
+
+        # RSI
+        delta = close - self.prev_close
+        if math.isnan(delta):
+            # 第一根K线没有涨跌，Wilder平滑从第二根开始
+            up = down = math.nan
+        else:
+            up = max(delta, 0.0)
+            down = max(-delta, 0.0)
+        ema_up = step(self.rsi_up, up)
+        ema_down = step(self.rsi_down, down)
+        if math.isnan(ema_up) or math.isnan(ema_down) or ema_up == ema_down == 0:
+            values['RSI'] = math.nan
+        elif ema_down == 0:
+            values['RSI'] = 100.0
+        else:
+            values['RSI'] = 100 - (100 / (1 + ema_up / ema_down))
+
+        if commit:
+            self.prev_close = close
+            self.highs.append(high)
+            self.lows.append(low)
+        return values
+
+    def update(self, bar, key=None):
+        """加入一根K线
+
+        key与上一次相同时视为盘中K线的更新，替换上一次的值；key不同时先确认上一根K线再加入新K线。
+
+        Args:
+            bar: 包含open、high、low、close的字典或Series
+            key: K线标识，通常为交易日期
+
+        Returns:
+            dict: 最新K线的指标值
+        """
+        if self.pending_bar is not None and (key is None or key != self.pending_key):
+            self._process(self.pending_bar, commit=True)
+        self.pending_key = key
+        self.pending_bar = bar
+        return self._process(bar, commit=False)
+
+    def warm_up(self, df):
+        """用历史K线初始化状态
+
+        Args:
+            df: 按日期升序排列、以日期为索引的K线数据
+
+        Returns:
+            dict: 最后一根K线的指标值，没有数据时返回None
+        """
+        values = None
+        records = df[['open', 'high', 'low', 'close']].to_dict('records')
+        for key, bar in zip(df.index, records):
+            values = self.update(bar, key)
+        return values
+
+
+def apply_streaming_update(df, key, bar, values):
+    """把增量计算的结果写入指标表的最后一行
+
+    key与最后一行索引相同时原地更新，否则追加一行。
+
+    Returns:
+        pandas.DataFrame: 更新后的指标表
+    """
+    row = {col: bar[col] for col in ('open', 'high', 'low', 'close', 'vol') if col in bar}
+    row.update(values)
+    if len(df) and df.index[-1] == key:
+        for col, value in row.items():
+            df.loc[key, col] = value
+        return df
+    new_row = pd.DataFrame([row], index=pd.Index([key], name=df.index.name))
+    return pd.concat([df, new_row])
@@ -0,0 +1,129 @@
+import os
+import json
+import hashlib
+import threading
+from datetime import datetime
+
+# 新闻和论坛条目的追加式存储
+# 每个 类型/股票 一个JSONL文件，只追加新条目；另有一个键文件记录已见过条目的URL或标题哈希，
+# 重复抓取同一页面时只返回新出现的条目，不再整页重复保存
+
+
+def item_key(item):
+    """条目的去重键：优先使用URL，没有URL时使用标题的哈希"""
+    url = (item.get('url') or '').strip()
+    if url and url != '#':
+        return 'url:' + url
+    title = (item.get('title') or '').strip()
+    return 'title:' + hashlib.sha1(title.encode('utf-8')).hexdigest()
+
+
+class ItemStore:
+    def __init__(self, root_dir='finance_data/items'):
+        """初始化条目存储
+
+        Args:
+            root_dir: 存储目录，文件为 root_dir/news_000001.jsonl 和对应的 .keys 索引
+        """
+        self.root_dir = root_dir
+        self._lock = threading.Lock()
+        # (类型, 股票代码) -> 已见过的键集合，首次使用时从键文件加载
+        self._seen = {}
+
+        # 确保存储目录存在
+        if not os.path.exists(self.root_dir):
+            os.makedirs(self.root_dir)
+
+    def _paths(self, kind, symbol):
+        base = os.path.join(self.root_dir, f"{kind}_{symbol}")
+        return base + '.jsonl', base + '.keys'
+
+    def _load_seen(self, kind, symbol):
+        seen = self._seen.get((kind, symbol))
+        if seen is not None:
+            return seen
+
+        data_path, keys_path = self._paths(kind, symbol)
+        seen = set()
+        if os.path.exists(keys_path):
+            with open(keys_path, 'r', encoding='utf-8') as f:
+                seen.update(line.rstrip('\n') for line in f if line.strip())
+        elif os.path.exists(data_path):
+            # 键文件丢失时从数据文件重建
+            for item in self._iter_items(data_path):
+                seen.add(item.get('_key') or item_key(item))
+            with open(keys_path, 'w', encoding='utf-8') as f:
+                f.writelines(key + '\n' for key in seen)
+        self._seen[(kind, symbol)] = seen
+        return seen
+
+    @staticmethod
+    def _iter_items(data_path):
+        with open(data_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    # 写入中断留下的半行
+                    continue
+
+    def add(self, kind, symbol, items):
+        """追加条目，已存在的条目会被跳过
+
+        Args:
+            kind: 条目类型，如news、posts
+            symbol: 股票代码，财经首页等无代码的页面可用finance
+            items: 条目列表
+
+        Returns:
+            list: 新增的条目（带_key和crawled_at字段）
+        """
+        if not items:
+            return []
+
+        crawled_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        with self._lock:
+            seen = self._load_seen(kind, symbol)
+            new_items = []
+            for item in items:
+                key = item_key(item)
+                if key in seen:
+                    continue
+                seen.add(key)
+                new_items.append({**item, '_key': key, 'crawled_at': crawled_at})
+
+            if new_items:
+                data_path, keys_path = self._paths(kind, symbol)
+                # 先写数据再写键，中断时最多重复保存，不会丢条目
+                with open(data_path, 'a', encoding='utf-8') as f:
+                    f.writelines(json.dumps(item, ensure_ascii=False) + '\n' for item in new_items)
+                with open(keys_path, 'a', encoding='utf-8') as f:
+                    f.writelines(item['_key'] + '\n' for item in new_items)
+        return new_items
+
+    def read(self, kind, symbol, since=None):
+        """读取已保存的条目
+
+        Args:
+            kind: 条目类型
+            symbol: 股票代码
+            since: 只返回此时间之后抓取的条目，格式YYYY-MM-DD HH:MM:SS
+
+        Returns:
+            list: 按抓取顺序排列的条目
+        """
+        data_path, _ = self._paths(kind, symbol)
+        if not os.path.exists(data_path):
+            return []
+        items = list(self._iter_items(data_path))
+        if since:
+            items = [item for item in items if item.get('crawled_at', '') > since]
+        return items
+
+    def count(self, kind, symbol):
+        """返回已保存的条目数量"""
+        with self._lock:
+            return len(self._load_seen(kind, symbol))
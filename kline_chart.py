@@ -0,0 +1,208 @@
+import time
+import numpy as np
+import pandas as pd
+import tkinter as tk
+from lazy_imports import lazy_import, load_pyplot
+
+# 可复用的K线图组件
+# 图表和画布只创建一次，K线实体、影线和成交量分别用一个PolyCollection/LineCollection绘制，
+# 更新时只替换这些集合的顶点数据。坐标范围不变时（如盘中刷新当日K线）用blitting只重绘数据层，
+# 范围变化或切换股票时才完整重绘一次
+
+mpl_figure = lazy_import('matplotlib.figure')
+mpl_collections = lazy_import('matplotlib.collections')
+mpl_ticker = lazy_import('matplotlib.ticker')
+backend_tkagg = lazy_import('matplotlib.backends.backend_tkagg')
+
+DATE_COLUMNS = ('trade_date', 'date', '日期')
+VOLUME_COLUMNS = ('vol', 'volume')
+
+
+class KLineChart:
+    def __init__(self, parent, bars=60, show_volume=True, ma_windows=(5, 10, 20), column_map=None,
+                 up_color='#FF4444', down_color='#00AA00', figsize=(14, 10), facecolor='#FAFAFA',
+                 xlabel=None, ylabel=None):
+        """创建K线图并嵌入到Tkinter容器中
+
+        Args:
+            parent: Tkinter容器
+            bars: 显示最近多少根K线
+            show_volume: 是否显示成交量副图
+            ma_windows: 均线周期，数据中有MA{n}列时直接使用，否则按收盘价计算
+            column_map: 列名映射，如indicators.CHINESE_COLUMNS
+            up_color: 阳线颜色
+            down_color: 阴线颜色
+            figsize: 图表尺寸
+            facecolor: 背景色
+            xlabel: X轴标题
+            ylabel: 价格轴标题
+        """
+        self.bars = bars
+        self.ma_windows = tuple(ma_windows or ())
+        self.column_map = column_map or {}
+        self.up_color = up_color
+        self.down_color = down_color
+        self.dates = []
+        self.last_update_ms = 0.0
+
+        # 设置中文字体
+        load_pyplot()
+        self.figure = mpl_figure.Figure(figsize=figsize, dpi=100, facecolor=facecolor)
+        if show_volume:
+            grid = self.figure.add_gridspec(2, 1, height_ratios=[3, 1], hspace=0.05)
+            self.price_ax = self.figure.add_subplot(grid[0])
+            self.volume_ax = self.figure.add_subplot(grid[1], sharex=self.price_ax)
+            self.price_ax.tick_params(labelbottom=False)
+            axes = (self.price_ax, self.volume_ax)
+        else:
+            self.price_ax = self.figure.add_subplot(111)
+            self.volume_ax = None
+            axes = (self.price_ax,)
+
+        for ax in axes:
+            ax.set_facecolor('#FFFFFF')
+            ax.grid(True, alpha=0.3)
+        if xlabel:
+            axes[-1].set_xlabel(xlabel)
+        if ylabel:
+            self.price_ax.set_ylabel(ylabel)
+        axes[-1].xaxis.set_major_formatter(mpl_ticker.FuncFormatter(self._format_date))
+        axes[-1].xaxis.set_major_locator(mpl_ticker.MaxNLocator(8, integer=True))
+
+        # 数据层设为animated，完整重绘时不画，由_on_draw和_blit单独绘制
+        self.wicks = mpl_collections.LineCollection([], linewidths=0.8, animated=True)
+        self.bodies = mpl_collections.PolyCollection([], linewidths=0.8, animated=True)
+        self.price_ax.add_collection(self.wicks)
+        self.price_ax.add_collection(self.bodies)
+        self.ma_lines = {}
+        for window in self.ma_windows:
+            line, = self.price_ax.plot([], [], linewidth=1, label=f'MA{window}', animated=True)
+            self.ma_lines[window] = line
+        if self.ma_lines:
+            self.price_ax.legend(loc='upper left')
+
+        self.volume_bars = None
+        if self.volume_ax is not None:
+            self.volume_bars = mpl_collections.PolyCollection([], linewidths=0, animated=True)
+            self.volume_ax.add_collection(self.volume_bars)
+
+        self.canvas = backend_tkagg.FigureCanvasTkAgg(self.figure, parent)
+        self.canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        self._background = None
+        self._view = None
+        self.canvas.mpl_connect('draw_event', self._on_draw)
+
+    def _format_date(self, x, pos=None):
+        i = int(round(x))
+        if 0 <= i < len(self.dates):
+            return self.dates[i]
+        return ''
+
+    def _artists(self):
+        artists = [self.wicks, self.bodies] + list(self.ma_lines.values())
+        if self.volume_bars is not None:
+            artists.append(self.volume_bars)
+        return artists
+
+    def _on_draw(self, event):
+        """完整重绘后保存不含数据层的背景，再画上数据层"""
+        self._background = self.canvas.copy_from_bbox(self.figure.bbox)
+        for artist in self._artists():
+            artist.axes.draw_artist(artist)
+
+    def _blit(self):
+        """只重绘数据层"""
+        self.canvas.restore_region(self._background)
+        for artist in self._artists():
+            artist.axes.draw_artist(artist)
+        self.canvas.blit(self.figure.bbox)
+        self.canvas.flush_events()
+
+    def _prepare(self, df):
+        """取最近bars根K线，统一列名并得到日期标签"""
+        data = df.rename(columns=self.column_map).tail(self.bars)
+        if isinstance(data.index, pd.DatetimeIndex):
+            dates = data.index
+        else:
+            date_col = next((col for col in DATE_COLUMNS if col in data.columns), None)
+            dates = pd.to_datetime(data[date_col]) if date_col else pd.RangeIndex(len(data))
+        if isinstance(dates, pd.RangeIndex):
+            labels = [str(d) for d in dates]
+        else:
+            labels = list(pd.DatetimeIndex(dates).strftime('%m-%d'))
+        return data, labels
+
+    def update(self, df, title=None):
+        """用新数据更新图表
+
+        Args:
+            df: K线数据，包含open、high、low、close列（或通过column_map映射），可选vol/volume和MA{n}列
+            title: 图表标题
+        """
+        start_time = time.perf_counter()
+        data, self.dates = self._prepare(df)
+        n = len(data)
+        o = data['open'].to_numpy(dtype=float)
+        h = data['high'].to_numpy(dtype=float)
+        l = data['low'].to_numpy(dtype=float)
+        c = data['close'].to_numpy(dtype=float)
+        x = np.arange(n, dtype=float)
+        half = 0.3
+
+        # K线实体和影线
+        top = np.maximum(o, c)
+        bottom = np.minimum(o, c)
+        bodies = np.empty((n, 4, 2))
+        bodies[:, :, 0] = x[:, None] + [-half, -half, half, half]
+        bodies[:, :, 1] = np.column_stack([bottom, top, top, bottom])
+        colors = np.where(c >= o, self.up_color, self.down_color)
+        self.bodies.set_verts(bodies)
+        self.bodies.set_facecolors(colors)
+        self.bodies.set_edgecolors(colors)
+        self.wicks.set_segments(np.stack([np.column_stack([x, l]), np.column_stack([x, h])], axis=1))
+        self.wicks.set_colors(colors)
+
+        # 均线
+        close_series = pd.Series(c)
+        for window, line in self.ma_lines.items():
+            column = f'MA{window}'
+            if column in data.columns:
+                ma = data[column].to_numpy(dtype=float)
+            else:
+                ma = close_series.rolling(window).mean().to_numpy()
+            line.set_data(x, ma)
+
+        # 成交量
+        volume_max = 0.0
+        if self.volume_bars is not None:
+            volume_col = next((col for col in VOLUME_COLUMNS if col in data.columns), None)
+            v = data[volume_col].to_numpy(dtype=float) if volume_col else np.zeros(n)
+            volume = np.empty((n, 4, 2))
+            volume[:, :, 0] = bodies[:, :, 0]
+            volume[:, :, 1] = np.column_stack([np.zeros(n), v, v, np.zeros(n)])
+            self.volume_bars.set_verts(volume)
+            self.volume_bars.set_facecolors(colors)
+            volume_max = float(np.nanmax(v)) if n else 0.0
+
+        # 坐标范围不变时只重绘数据层
+        low = float(np.nanmin(l)) if n else 0.0
+        high = float(np.nanmax(h)) if n else 1.0
+        view = (n, self.dates[0] if n else None, self.dates[-1] if n else None, title)
+        fits = (self._view is not None and self._view[0] == view
+                and self._view[1] <= low and high <= self._view[2] and volume_max <= self._view[3])
+        if fits and self._background is not None:
+            self._blit()
+        else:
+            padding = (high - low) * 0.05 or max(abs(high) * 0.01, 0.01)
+            y_range = (low - padding, high + padding)
+            self.price_ax.set_xlim(-1, max(n, 1))
+            self.price_ax.set_ylim(*y_range)
+            if self.volume_ax is not None:
+                self.volume_ax.set_ylim(0, volume_max * 1.15 or 1)
+            if title is not None:
+                self.price_ax.set_title(title)
+            self._view = (view, y_range[0], y_range[1], volume_max * 1.15)
+            self.canvas.draw()
+
+        self.last_update_ms = (time.perf_counter() - start_time) * 1000
+        return self.last_update_ms
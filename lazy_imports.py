@@ -0,0 +1,139 @@
+import os
+import sys
+import time
+import threading
+import importlib
+import importlib.util
+
+# 延迟导入工具
+# 可视化工具启动时只需要tkinter，pandas、matplotlib和akshare等数据源要等到第一次取数或画图才用到。
+# 用find_spec检查库是否安装，不执行库本身的导入；模块在第一次访问属性时才真正导入
+
+_start_time = time.perf_counter()
+
+
+def is_available(name):
+    """检查模块是否已安装，不导入模块本身"""
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+class LazyModule:
+    """模块代理，第一次访问属性时导入真正的模块"""
+
+    def __init__(self, name):
+        self.__dict__['_name'] = name
+        self.__dict__['_module'] = None
+        self.__dict__['_lock'] = threading.Lock()
+
+    def _load(self):
+        module = self.__dict__['_module']
+        if module is None:
+            with self.__dict__['_lock']:
+                module = self.__dict__['_module']
+                if module is None:
+                    start_time = time.perf_counter()
+                    module = importlib.import_module(self.__dict__['_name'])
+                    startup_timer.record_import(self.__dict__['_name'], time.perf_counter() - start_time)
+                    self.__dict__['_module'] = module
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self._load(), attr, value)
+
+    def __repr__(self):
+        state = '已导入' if self.__dict__['_module'] is not None else '未导入'
+        return f"<LazyModule {self.__dict__['_name']} ({state})>"
+
+
+def lazy_import(name):
+    """返回延迟导入的模块代理，已导入过的模块直接返回"""
+    if name in sys.modules:
+        return sys.modules[name]
+    return LazyModule(name)
+
+
+def preload(*modules):
+    """在后台线程中提前导入模块，界面显示后调用，使第一次取数或画图不用等待导入
+
+    Args:
+        modules: LazyModule、模块名或无参数的加载函数（如load_pyplot）
+    """
+    def run():
+        for module in modules:
+            try:
+                if isinstance(module, LazyModule):
+                    module._load()
+                elif callable(module):
+                    module()
+                else:
+                    importlib.import_module(module)
+            except Exception as e:
+                print(f"预加载 {module} 失败: {e}")
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread
+
+
+class StartupTimer:
+    """记录启动各阶段耗时，设置环境变量STARTUP_TIMING=1时打印报告"""
+
+    def __init__(self):
+        self.marks = []
+        self.imports = []
+        self.enabled = os.environ.get('STARTUP_TIMING', '') not in ('', '0')
+
+    def mark(self, label):
+        """记录从进程启动到当前的耗时"""
+        self.marks.append((label, time.perf_counter() - _start_time))
+
+    def record_import(self, name, elapsed):
+        self.imports.append((name, elapsed))
+
+    def report(self, force=False):
+        """打印启动耗时报告"""
+        if not (self.enabled or force):
+            return
+        print("\n启动耗时报告")
+        print("==================")
+        for label, elapsed in self.marks:
+            print(f"{label}: {elapsed * 1000:.0f} ms")
+        if self.imports:
+            print("延迟导入:")
+            for name, elapsed in self.imports:
+                print(f"  {name}: {elapsed * 1000:.0f} ms")
+
+    def report_when_shown(self, root, label="窗口显示"):
+        """窗口第一次绘制完成后记录时间并打印报告"""
+        def on_shown():
+            self.mark(label)
+            self.report()
+        root.after_idle(on_shown)
+
+
+startup_timer = StartupTimer()
+
+
+_pyplot_lock = threading.Lock()
+_pyplot_ready = False
+
+
+def load_pyplot(backend='TkAgg'):
+    """第一次画图时导入pyplot：先选择后端，再设置中文字体，返回pyplot模块"""
+    global _pyplot_ready
+    with _pyplot_lock:
+        if not _pyplot_ready:
+            start_time = time.perf_counter()
+            import matplotlib
+            matplotlib.use(backend)
+            import matplotlib.pyplot as plt
+            plt.rcParams['font.sans-serif'] = ['SimHei', 'Microsoft YaHei']
+            plt.rcParams['axes.unicode_minus'] = False
+            startup_timer.record_import('matplotlib.pyplot', time.perf_counter() - start_time)
+            _pyplot_ready = True
+    return sys.modules['matplotlib.pyplot']
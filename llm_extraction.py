@@ -1,11 +1,20 @@
 import asyncio
 import os
+import re
 import json
+import time
+import hashlib
 from crawl4ai import AsyncWebCrawler
 from crawl4ai.async_configs import CrawlerRunConfig
 from crawl4ai.extraction_strategy import LLMExtractionStrategy
 from pydantic import BaseModel, Field
 
+try:
+    import litellm
+    LITELLM_AVAILABLE = True
+except ImportError:
+    LITELLM_AVAILABLE = False
+
 # 定义产品数据模型
 class Product(BaseModel):
     name: str = Field(..., description="产品名称")
@@ -131,6 +140,298 @@ async def natural_language_extraction():
         
         print("\n自然语言提取结果已保存到 output/natural_language_extraction.txt")
 
+# ---------------- 批量LLM提取 ----------------
+# 每个页面单独调用一次模型既慢又贵。下面的流水线把页面切块，多个块打包进同一个请求，
+# 按内容哈希把每个块的结果缓存到磁盘，并发请求受数量上限约束。
+# 语料未变化时重新运行不会产生任何模型调用
+
+def chunk_text(text, max_chars=4000):
+    """按段落把文本切成不超过max_chars的块，超长段落按字符硬切"""
+    chunks = []
+    current = ""
+    for paragraph in re.split(r'\n\s*\n', text or ""):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        while len(paragraph) > max_chars:
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.append(paragraph[:max_chars])
+            paragraph = paragraph[max_chars:]
+        if current and len(current) + len(paragraph) + 2 > max_chars:
+            chunks.append(current)
+            current = ""
+        current = f"{current}\n\n{paragraph}" if current else paragraph
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def build_batch_prompt(instruction, chunks, schema=None):
+    """把多个内容块打包成一个提示词，要求模型按编号返回JSON对象"""
+    lines = [instruction.strip()]
+    if schema:
+        lines.append("每条提取结果需符合以下JSON Schema:")
+        lines.append(json.dumps(schema, ensure_ascii=False))
+    lines.append("下面有多段编号的内容，请分别提取。只返回一个JSON对象，键为内容编号，值为该段的提取结果列表，"
+                 "没有结果时值为空列表。")
+    for i, chunk in enumerate(chunks):
+        lines.append(f"### [{i}]\n{chunk}")
+    return "\n\n".join(lines)
+
+
+def parse_batch_response(text, count):
+    """解析模型返回的JSON对象，返回长度为count的列表，缺失的编号为None"""
+    match = re.search(r'\{.*\}', text or "", re.S)
+    if not match:
+        return [None] * count
+    try:
+        data = json.loads(match.group(0))
+    except ValueError:
+        return [None] * count
+    results = []
+    for i in range(count):
+        value = data.get(str(i))
+        results.append(value if isinstance(value, list) else None)
+    return results
+
+
+class LiteLLMProvider:
+    """通过litellm调用模型，provider格式与LLMExtractionStrategy相同，如openai/gpt-4o、ollama/llama3"""
+
+    def __init__(self, provider="openai/gpt-4o", api_token=None, temperature=0):
+        if not LITELLM_AVAILABLE:
+            raise ImportError("litellm未安装，请运行: pip install litellm")
+        self.name = provider
+        self.api_token = api_token
+        self.temperature = temperature
+
+    async def complete(self, prompt):
+        response = await litellm.acompletion(
+            model=self.name,
+            api_key=self.api_token,
+            temperature=self.temperature,
+            messages=[{"role": "user", "content": prompt}]
+        )
+        return response.choices[0].message.content
+
+
+class LocalProductProvider:
+    """离线替身：用正则从每段内容中找出“名称 ¥价格”形式的商品，模拟模型的延迟和返回格式，用于基准测试"""
+
+    def __init__(self, latency=0.2, per_char_latency=0.00001):
+        self.name = "local/product-regex"
+        self.latency = latency
+        self.per_char_latency = per_char_latency
+        self.calls = 0
+
+    async def complete(self, prompt):
+        self.calls += 1
+        await asyncio.sleep(self.latency + len(prompt) * self.per_char_latency)
+        result = {}
+        for match in re.finditer(r'### \[(\d+)\]\n(.*?)(?=\n\n### \[|\Z)', prompt, re.S):
+            products = []
+            for line in match.group(2).splitlines():
+                found = re.match(r'\s*(.+?)\s+(¥[\d.,]+)\s*(.*)', line)
+                if found:
+                    products.append({"name": found.group(1), "price": found.group(2),
+                                     "description": found.group(3) or None})
+            result[match.group(1)] = products
+        return json.dumps(result, ensure_ascii=False)
+
+
+class BatchLLMExtractor:
+    def __init__(self, provider, instruction, schema=None, chunk_chars=4000,
+                 max_chars_per_request=12000, max_concurrency=4, cache_dir="output/llm_cache"):
+        """初始化批量提取器
+
+        Args:
+            provider: 模型提供者，需要name属性和async complete(prompt)方法，如LiteLLMProvider、LocalProductProvider
+            instruction: 提取指令
+            schema: 结果的JSON Schema，可为空
+            chunk_chars: 每个内容块的最大字符数
+            max_chars_per_request: 每个请求打包的内容总字符数上限
+            max_concurrency: 同时进行的请求数量上限
+            cache_dir: 响应缓存目录
+        """
+        self.provider = provider
+        self.instruction = instruction
+        self.schema = schema
+        self.chunk_chars = chunk_chars
+        self.max_chars_per_request = max_chars_per_request
+        self.max_concurrency = max_concurrency
+        self.cache_dir = cache_dir
+        self.stats = {"chunks": 0, "cache_hits": 0, "model_calls": 0, "failed_chunks": 0}
+
+        # 确保缓存目录存在
+        if not os.path.exists(self.cache_dir):
+            os.makedirs(self.cache_dir)
+
+    def _chunk_key(self, chunk):
+        # 模型、指令、Schema或内容任一变化都会得到不同的键
+        payload = json.dumps([self.provider.name, self.instruction, self.schema, chunk], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _cache_path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def _read_cache(self, key):
+        path = self._cache_path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_cache(self, key, value):
+        path = self._cache_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(value, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def _pack(self, pending):
+        """把待提取的块按字符数贪心打包成多个请求"""
+        batches, current, size = [], [], 0
+        for key, chunk in pending:
+            if current and size + len(chunk) > self.max_chars_per_request:
+                batches.append(current)
+                current, size = [], 0
+            current.append((key, chunk))
+            size += len(chunk)
+        if current:
+            batches.append(current)
+        return batches
+
+    async def _run_batch(self, semaphore, batch, results):
+        prompt = build_batch_prompt(self.instruction, [chunk for _, chunk in batch], self.schema)
+        async with semaphore:
+            self.stats["model_calls"] += 1
+            try:
+                response = await self.provider.complete(prompt)
+            except Exception as e:
+                print(f"模型请求失败: {e}")
+                self.stats["failed_chunks"] += len(batch)
+                return
+        for (key, _), value in zip(batch, parse_batch_response(response, len(batch))):
+            if value is None:
+                # 解析失败的块不写缓存，下次重试
+                self.stats["failed_chunks"] += 1
+                continue
+            results[key] = value
+            self._write_cache(key, value)
+
+    async def extract(self, documents):
+        """批量提取
+
+        Args:
+            documents: 文档编号（如URL） -> 文本内容
+
+        Returns:
+            dict: 文档编号 -> 提取结果列表（各块结果按顺序合并并去重）
+        """
+        doc_keys = {}
+        results = {}
+        pending = []
+        pending_keys = set()
+        for doc_id, text in documents.items():
+            keys = []
+            for chunk in chunk_text(text, self.chunk_chars):
+                key = self._chunk_key(chunk)
+                keys.append(key)
+                self.stats["chunks"] += 1
+                if key in results:
+                    continue
+                cached = self._read_cache(key)
+                if cached is not None:
+                    results[key] = cached
+                    self.stats["cache_hits"] += 1
+                elif key not in pending_keys:
+                    pending_keys.add(key)
+                    pending.append((key, chunk))
+            doc_keys[doc_id] = keys
+
+        if pending:
+            semaphore = asyncio.Semaphore(self.max_concurrency)
+            batches = self._pack(pending)
+            await asyncio.gather(*(self._run_batch(semaphore, batch, results) for batch in batches))
+
+        merged = {}
+        for doc_id, keys in doc_keys.items():
+            items, seen = [], set()
+            for key in keys:
+                for item in results.get(key) or []:
+                    marker = json.dumps(item, ensure_ascii=False, sort_keys=True)
+                    if marker not in seen:
+                        seen.add(marker)
+                        items.append(item)
+            merged[doc_id] = items
+        return merged
+
+
+async def batch_extraction_example(urls):
+    """批量爬取多个页面后统一用BatchLLMExtractor提取产品信息"""
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        print("警告: 未设置OPENAI_API_KEY环境变量。请设置后再运行此示例。")
+        return
+
+    # 只抓取页面内容，提取交给批量流水线
+    documents = {}
+    async with AsyncWebCrawler() as crawler:
+        for url in urls:
+            result = await crawler.arun(url=url, config=CrawlerRunConfig())
+            documents[url] = str(result.markdown or "")
+
+    extractor = BatchLLMExtractor(
+        LiteLLMProvider("openai/gpt-4o", api_key),
+        instruction="从内容中提取所有提到的产品信息，包括名称、价格和描述。",
+        schema=Product.schema()
+    )
+    extracted = await extractor.extract(documents)
+    print(f"提取统计: {extractor.stats}")
+
+    with open("output/batch_llm_products.json", "w", encoding="utf-8") as f:
+        json.dump(extracted, f, indent=2, ensure_ascii=False)
+    print("\n批量提取的产品数据已保存到 output/batch_llm_products.json")
+
+
+async def benchmark_batch_extraction(pages=200, products_per_page=30):
+    """用离线替身对比逐页提取和批量提取的请求数与耗时，并验证重跑时不再调用模型"""
+    documents = {}
+    for p in range(pages):
+        lines = [f"商品目录第{p}页"]
+        for i in range(products_per_page):
+            lines.append(f"商品{p}-{i} ¥{(p * products_per_page + i) % 997 + 0.99:.2f} 第{i}号商品的说明")
+            if i % 10 == 9:
+                lines.append("")
+        documents[f"page-{p}"] = "\n".join(lines)
+
+    instruction = "从内容中提取所有提到的产品信息，包括名称、价格和描述。"
+    cache_dir = os.path.join("output", "llm_cache_benchmark")
+
+    # 逐页请求，串行，无缓存
+    provider = LocalProductProvider()
+    start_time = time.perf_counter()
+    for text in list(documents.values())[:20]:
+        await provider.complete(build_batch_prompt(instruction, [text]))
+    per_page = (time.perf_counter() - start_time) / 20 * pages
+    print(f"逐页提取(按20页估算): {pages} 次调用，约 {per_page:.1f} 秒")
+
+    for run in ("首次", "重跑"):
+        provider = LocalProductProvider()
+        extractor = BatchLLMExtractor(provider, instruction, cache_dir=cache_dir)
+        start_time = time.perf_counter()
+        extracted = await extractor.extract(documents)
+        elapsed = time.perf_counter() - start_time
+        total = sum(len(items) for items in extracted.values())
+        print(f"批量提取({run}): {provider.calls} 次调用，{elapsed:.2f} 秒，提取 {total} 条，统计 {extractor.stats}")
+
+
 if __name__ == "__main__":
     # 创建输出目录
     os.makedirs("output", exist_ok=True)
@@ -140,4 +441,5 @@ if __name__ == "__main__":
     
     # 如果需要运行其他示例，取消下面的注释
     # asyncio.run(open_source_llm_example())
+    # asyncio.run(benchmark_batch_extraction())
     # asyncio.run(natural_language_extraction())
\ No newline at end of file
@@ -0,0 +1,186 @@
+import time
+import threading
+from datetime import date
+
+# 全市场行情快照缓存
+# ak.stock_zh_a_spot()每次都会下载全市场约5000只股票的行情，
+# 这里在TTL内复用同一份快照，并按股票代码建立索引，单只股票查询直接命中字典。
+# 快照本身不带交易日期，休市日（包括工作日的节假日）返回的是上一交易日的行情，要用交易日历判断
+
+
+def normalize_code(code):
+    """统一股票代码格式：Treeview等控件会把'000001'转成整数1，这里补齐6位"""
+    code = str(code).strip()
+    if code.isdigit():
+        code = code.zfill(6)
+    return code
+
+
+class MarketSnapshotCache:
+    def __init__(self, fetch_func, ttl=30, code_column='代码', retries=3, retry_delay=1):
+        """初始化行情快照缓存
+
+        Args:
+            fetch_func: 获取全市场行情的函数，返回pandas.DataFrame，例如ak.stock_zh_a_spot
+            ttl: 快照有效期（秒）
+            code_column: 股票代码所在的列名
+            retries: 获取失败时的重试次数
+            retry_delay: 重试间隔（秒）
+        """
+        self.fetch_func = fetch_func
+        self.ttl = ttl
+        self.code_column = code_column
+        self.retries = retries
+        self.retry_delay = retry_delay
+
+        self._lock = threading.Lock()
+        self._frame = None
+        self._index = {}
+        self._fetched_at = 0
+        self._inflight = None
+        self._last_error = None
+
+    def _is_fresh(self):
+        return self._frame is not None and time.time() - self._fetched_at < self.ttl
+
+    def _fetch(self):
+        for attempt in range(self.retries):
+            try:
+                return self.fetch_func()
+            except Exception:
+                if attempt < self.retries - 1:
+                    time.sleep(self.retry_delay)
+                    continue
+                raise
+
+    def _build_index(self, frame):
+        """按股票代码建立索引，带交易所前缀的代码（如sh600000）同时用6位代码索引"""
+        index = {}
+        if frame is None or frame.empty or self.code_column not in frame.columns:
+            return index
+        for record in frame.to_dict('records'):
+            code = str(record[self.code_column])
+            index[code] = record
+            if len(code) > 6 and code[-6:].isdigit():
+                index.setdefault(code[-6:], record)
+        return index
+
+    def refresh(self, force=False):
+        """确保快照在有效期内，过期时重新获取
+
+        多个线程同时发现快照过期时，只有一个线程真正发起请求，其余线程等待同一次刷新的结果。
+
+        Returns:
+            pandas.DataFrame: 全市场行情快照（共享对象，请勿原地修改）
+        """
+        with self._lock:
+            if not force and self._is_fresh():
+                return self._frame
+            if self._inflight is None:
+                self._inflight = threading.Event()
+                is_leader = True
+            else:
+                is_leader = False
+            event = self._inflight
+
+        if is_leader:
+            try:
+                frame = self._fetch()
+                index = self._build_index(frame)
+                with self._lock:
+                    self._frame = frame
+                    self._index = index
+                    self._fetched_at = time.time()
+                    self._last_error = None
+            except Exception as e:
+                with self._lock:
+                    self._last_error = e
+            finally:
+                with self._lock:
+                    self._inflight = None
+                event.set()
+        else:
+            event.wait()
+
+        with self._lock:
+            if self._last_error is not None and not self._is_fresh():
+                raise self._last_error
+            return self._frame
+
+    def get_frame(self, force=False):
+        """获取全市场行情快照"""
+        return self.refresh(force)
+
+    def get_row(self, code):
+        """获取单只股票的行情
+
+        Returns:
+            dict: 该股票的行情记录，找不到时返回None
+        """
+        self.refresh()
+        with self._lock:
+            return self._index.get(normalize_code(code))
+
+    def get_rows(self, codes):
+        """批量获取多只股票的行情，整批只检查一次快照
+
+        Returns:
+            dict: 股票代码到行情记录的映射，找不到的股票对应None
+        """
+        self.refresh()
+        with self._lock:
+            index = self._index
+        return {code: index.get(normalize_code(code)) for code in codes}
+
+    def top(self, n=20, by='涨跌幅', ascending=False):
+        """按指定列排序返回前n只股票"""
+        frame = self.refresh()
+        if frame is None or frame.empty:
+            return frame
+        return frame.sort_values(by, ascending=ascending).head(n)
+
+    def invalidate(self):
+        """使当前快照失效，下次访问时重新获取"""
+        with self._lock:
+            self._fetched_at = 0
+
+
+class TradeCalendar:
+    def __init__(self, fetch_func, date_column='trade_date'):
+        """交易日历，每天只下载一次
+
+        Args:
+            fetch_func: 获取交易日列表的函数，返回pandas.DataFrame，例如ak.tool_trade_date_hist_sina
+            date_column: 交易日所在的列名
+        """
+        self.fetch_func = fetch_func
+        self.date_column = date_column
+
+        self._lock = threading.Lock()
+        self._dates = None
+        self._loaded_on = None
+
+    def _load(self, today):
+        try:
+            frame = self.fetch_func()
+            dates = {str(d)[:10].replace('-', '') for d in frame[self.date_column]}
+        except Exception as e:
+            print(f"获取交易日历失败: {e}")
+            dates = None
+        self._dates = dates
+        self._loaded_on = today
+
+    def is_trading_day(self, day=None):
+        """判断某天是否为交易日，日历获取失败时只排除周末
+
+        Args:
+            day: datetime.date，默认为今天
+        """
+        day = day or date.today()
+        with self._lock:
+            if self._loaded_on != date.today():
+                self._load(date.today())
+            dates = self._dates
+        if not dates:
+            return day.weekday() < 5
+        return day.strftime('%Y%m%d') in dates
@@ -0,0 +1,277 @@
+import os
+import json
+import time
+import hashlib
+import threading
+import urllib.request
+import urllib.error
+
+# 网页抓取结果的磁盘缓存
+# 以URL为键，同时保存原始HTML和CSS提取得到的JSON。
+# 过期后先用ETag/Last-Modified发条件请求，服务器没有这两个头时比较页面内容哈希，
+# 页面未变化就直接复用上次的提取结果，既不启动浏览器也不重新提取。
+# 总大小超过上限时按最近访问时间淘汰
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36'
+
+
+def content_hash(text):
+    """计算页面内容的SHA-256哈希"""
+    if isinstance(text, str):
+        text = text.encode('utf-8', errors='ignore')
+    return hashlib.sha256(text or b'').hexdigest()
+
+
+def _header(headers, name):
+    """不区分大小写地读取响应头，headers可以是dict或HTTPMessage"""
+    if not headers:
+        return None
+    for key, value in headers.items():
+        if key.lower() == name.lower():
+            return value
+    return None
+
+
+class PageCache:
+    def __init__(self, cache_dir='finance_data/page_cache', ttl=3600, max_bytes=200 * 1024 * 1024,
+                 request_timeout=10):
+        """初始化网页缓存
+
+        Args:
+            cache_dir: 缓存目录
+            ttl: 有效期（秒），有效期内直接使用缓存，不发任何请求
+            max_bytes: 缓存文件总大小上限（字节），超出时淘汰最久未访问的页面
+            request_timeout: 条件请求的超时时间（秒）
+        """
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.request_timeout = request_timeout
+        self.index_path = os.path.join(self.cache_dir, 'index.json')
+
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        # 命中只更新内存中的访问时间，下次保存索引或close()时写入磁盘
+        self._dirty = False
+        # 条件请求发现页面已变化时，记下这次响应的校验信息，随后put()直接使用，不再另发请求
+        self._fresh_validators = {}
+
+        # 确保缓存目录存在
+        if not os.path.exists(self.cache_dir):
+            os.makedirs(self.cache_dir)
+
+        self._index = self._load_index()
+
+    def _load_index(self):
+        if not os.path.exists(self.index_path):
+            return {}
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"网页缓存索引损坏，将重新建立: {e}")
+            return {}
+
+    def _save_index(self):
+        tmp_path = self.index_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._index, f, ensure_ascii=False)
+        os.replace(tmp_path, self.index_path)
+        self._dirty = False
+
+    def _paths(self, key):
+        base = os.path.join(self.cache_dir, key)
+        return base + '.html', base + '.json'
+
+    @staticmethod
+    def _key(url):
+        return hashlib.sha1(url.encode('utf-8')).hexdigest()
+
+    def _request(self, url, headers=None):
+        """发送普通HTTP请求，返回(状态码, 响应头, 内容)；304不视为错误"""
+        request = urllib.request.Request(url, headers={'User-Agent': USER_AGENT, **(headers or {})})
+        try:
+            with urllib.request.urlopen(request, timeout=self.request_timeout) as response:
+                return response.status, response.headers, response.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.headers, b''
+
+    def _read_extracted(self, entry):
+        _, json_path = self._paths(entry['key'])
+        try:
+            with open(json_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def get(self, url, allow_stale=False):
+        """读取缓存的提取结果
+
+        Args:
+            url: 页面地址
+            allow_stale: 是否返回已过期的缓存
+
+        Returns:
+            缓存的提取结果，没有缓存或已过期时返回None
+        """
+        with self._lock:
+            entry = self._index.get(url)
+            if entry is None:
+                return None
+            if not allow_stale and time.time() - entry['checked_at'] >= self.ttl:
+                return None
+            entry['accessed_at'] = time.time()
+            self._dirty = True
+        extracted = self._read_extracted(entry)
+        if extracted is not None:
+            self.hits += 1
+        return extracted
+
+    def revalidate(self, url):
+        """对过期的缓存发条件请求，页面未变化时刷新有效期并返回缓存的提取结果
+
+        先带If-None-Match/If-Modified-Since请求，返回304即未变化；
+        返回200时比较页面内容哈希，与上次一致同样视为未变化
+
+        Returns:
+            缓存的提取结果，页面已变化或无法判断时返回None
+        """
+        with self._lock:
+            entry = self._index.get(url)
+        if entry is None:
+            return None
+
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+
+        try:
+            status, response_headers, body = self._request(url, headers)
+        except Exception as e:
+            print(f"条件请求 {url} 失败: {e}")
+            return None
+
+        if status == 304:
+            unchanged = True
+        elif status == 200:
+            unchanged = content_hash(body) == entry.get('source_hash')
+        else:
+            return None
+        if not unchanged:
+            with self._lock:
+                self._fresh_validators[url] = {
+                    'etag': _header(response_headers, 'ETag'),
+                    'last_modified': _header(response_headers, 'Last-Modified'),
+                    'source_hash': content_hash(body),
+                }
+            return None
+
+        extracted = self._read_extracted(entry)
+        if extracted is None:
+            return None
+        with self._lock:
+            entry['checked_at'] = entry['accessed_at'] = time.time()
+            entry['etag'] = response_headers.get('ETag', entry.get('etag'))
+            entry['last_modified'] = response_headers.get('Last-Modified', entry.get('last_modified'))
+            self._save_index()
+        self.revalidated += 1
+        return extracted
+
+    def _validators(self, url, html, response_headers):
+        """抓取新页面后记录校验信息，只使用手头已有的数据，不另发请求
+
+        优先使用刚才条件请求得到的原始内容哈希；没有时用渲染后HTML的哈希，
+        它与原始内容不一致，下次条件请求会视为已变化并重新抓取，之后即改用原始内容哈希
+        """
+        with self._lock:
+            validators = self._fresh_validators.pop(url, None)
+        if validators is None:
+            validators = {'source_hash': content_hash(html)}
+        for field, name in (('etag', 'ETag'), ('last_modified', 'Last-Modified')):
+            value = _header(response_headers, name)
+            if value:
+                validators[field] = value
+        return validators
+
+    def put(self, url, html, extracted, validators=None, response_headers=None):
+        """保存页面HTML和提取结果
+
+        Args:
+            url: 页面地址
+            html: 浏览器渲染后的HTML
+            extracted: 提取结果，需可JSON序列化
+            validators: 条件请求使用的校验信息，为空时从response_headers和已有内容生成
+            response_headers: 抓取页面时的响应头，用于读取ETag/Last-Modified
+        """
+        if validators is None:
+            validators = self._validators(url, html, response_headers)
+        key = self._key(url)
+        html_path, json_path = self._paths(key)
+
+        for path, content in ((html_path, html or ''),
+                              (json_path, json.dumps(extracted, ensure_ascii=False))):
+            tmp_path = path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+
+        now = time.time()
+        with self._lock:
+            self.misses += 1
+            self._index[url] = {
+                'key': key,
+                'etag': validators.get('etag'),
+                'last_modified': validators.get('last_modified'),
+                'source_hash': validators.get('source_hash'),
+                'size': os.path.getsize(html_path) + os.path.getsize(json_path),
+                'checked_at': now,
+                'accessed_at': now,
+            }
+            self._evict()
+            self._save_index()
+
+    def _evict(self):
+        """总大小超过上限时，按最近访问时间从旧到新删除"""
+        total = sum(entry['size'] for entry in self._index.values())
+        if total <= self.max_bytes:
+            return
+        for url, entry in sorted(self._index.items(), key=lambda item: item[1]['accessed_at']):
+            if total <= self.max_bytes:
+                break
+            for path in self._paths(entry['key']):
+                if os.path.exists(path):
+                    os.remove(path)
+            total -= entry['size']
+            del self._index[url]
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            for entry in self._index.values():
+                for path in self._paths(entry['key']):
+                    if os.path.exists(path):
+                        os.remove(path)
+            self._index = {}
+            self._save_index()
+
+    def close(self):
+        """把命中时更新的访问时间写入索引，保证下次运行按真实的访问顺序淘汰"""
+        with self._lock:
+            if self._dirty:
+                self._save_index()
+
+    def stats(self):
+        """返回缓存命中统计"""
+        with self._lock:
+            total_size = sum(entry['size'] for entry in self._index.values())
+            return {
+                'entries': len(self._index),
+                'size': total_size,
+                'hits': self.hits,
+                'revalidated': self.revalidated,
+                'misses': self.misses,
+            }
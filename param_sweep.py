@@ -0,0 +1,215 @@
+import os
+import time
+import json
+import random
+import itertools
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+import pandas as pd
+from bar_store import BarStore
+from backtest import MovingAverageBacktester
+from indicators import pivot_panel
+
+# 移动平均策略的并行参数扫描
+# 价格数据只在主进程整理一次，保存为.npy文件，工作进程用np.load(mmap_mode='r')映射同一份文件，
+# 由操作系统页缓存共享，不会把整段行情pickle给每个进程。
+# 同一组均线参数的信号只计算一次，再对多组止损止盈参数复用
+
+FIELDS = ('open', 'high', 'low', 'close', 'vol', 'mark')
+
+# 默认扫描范围
+DEFAULT_GRID = {
+    'short_window': [3, 5, 8, 10, 13],
+    'long_window': [20, 30, 40, 60],
+    'stop_loss': [0.03, 0.05, 0.08, 0.10],
+    'take_profit': [0.05, 0.10, 0.15, 0.20, 0.30],
+}
+
+RESULT_COLUMNS = ['short_window', 'long_window', 'stop_loss', 'take_profit',
+                  'sharpe', 'max_drawdown', 'total_return', 'annual_return',
+                  'trade_count', 'win_rate', 'avg_return']
+
+# 工作进程中的内存映射数据
+_worker_arrays = None
+_worker_dates = None
+_worker_codes = None
+
+
+def _init_worker(data_dir):
+    """工作进程初始化：映射共享的价格数组"""
+    global _worker_arrays, _worker_dates, _worker_codes
+    _worker_arrays = {field: np.load(os.path.join(data_dir, f"{field}.npy"), mmap_mode='r')
+                      for field in FIELDS}
+    with open(os.path.join(data_dir, 'axes.json'), 'r', encoding='utf-8') as f:
+        axes = json.load(f)
+    _worker_dates = axes['dates']
+    _worker_codes = axes['codes']
+
+
+def _evaluate_group(short_window, long_window, risk_params, backtest_kwargs):
+    """评估一组均线参数下的多组止损止盈参数
+
+    Returns:
+        list: 每组参数的统计结果
+    """
+    base = MovingAverageBacktester(short_window=short_window, long_window=long_window, **backtest_kwargs)
+    signals = base.compute_signals(_worker_arrays['close'], _worker_arrays['vol'])
+
+    results = []
+    for stop_loss, take_profit in risk_params:
+        base.stop_loss = stop_loss
+        base.take_profit = take_profit
+        stats = base.run_arrays(_worker_arrays, _worker_dates, _worker_codes, signals=signals)['stats']
+        row = {'short_window': short_window, 'long_window': long_window,
+               'stop_loss': stop_loss, 'take_profit': take_profit}
+        row.update({key: stats[key] for key in RESULT_COLUMNS if key in stats})
+        results.append(row)
+    return results
+
+
+def grid_params(grid=None):
+    """生成网格搜索的全部参数组合，短均线周期不小于长均线周期的组合会被跳过"""
+    grid = grid or DEFAULT_GRID
+    combos = []
+    for short_window, long_window, stop_loss, take_profit in itertools.product(
+            grid['short_window'], grid['long_window'], grid['stop_loss'], grid['take_profit']):
+        if short_window < long_window:
+            combos.append((short_window, long_window, stop_loss, take_profit))
+    return combos
+
+
+def random_params(n, grid=None, seed=None):
+    """从网格中随机抽取n组参数"""
+    combos = grid_params(grid)
+    rng = random.Random(seed)
+    if n >= len(combos):
+        return combos
+    return rng.sample(combos, n)
+
+
+class ParameterSweep:
+    def __init__(self, max_workers=None, data_dir='sweep_results/shared', backtest_kwargs=None):
+        """初始化参数扫描器
+
+        Args:
+            max_workers: 进程数，默认为CPU核数
+            data_dir: 共享价格数组的存放目录
+            backtest_kwargs: 传给MovingAverageBacktester的其他参数，如fee_rate、intraday_stops
+        """
+        self.max_workers = max_workers or os.cpu_count()
+        self.data_dir = data_dir
+        self.backtest_kwargs = backtest_kwargs or {}
+        self.output_dir = 'sweep_results'
+
+        # 确保输出目录存在
+        for path in (self.output_dir, self.data_dir):
+            if not os.path.exists(path):
+                os.makedirs(path)
+
+    def prepare_data(self, panel):
+        """把价格面板写入.npy文件，供工作进程内存映射
+
+        Args:
+            panel: 字段名 -> DataFrame（日期 × 股票），需要open、high、low、close、vol
+        """
+        close_frame = panel['close']
+        arrays = {'close': close_frame, 'mark': close_frame.ffill()}
+        for field in ('open', 'high', 'low', 'vol'):
+            arrays[field] = panel[field].reindex_like(close_frame)
+
+        for field, frame in arrays.items():
+            path = os.path.join(self.data_dir, f"{field}.npy")
+            np.save(path, np.ascontiguousarray(frame.to_numpy(dtype=float)))
+
+        axes = {'dates': [str(d) for d in close_frame.index], 'codes': [str(c) for c in close_frame.columns]}
+        with open(os.path.join(self.data_dir, 'axes.json'), 'w', encoding='utf-8') as f:
+            json.dump(axes, f)
+        print(f"价格数据已写入 {self.data_dir}: {close_frame.shape[0]} 个交易日 × {close_frame.shape[1]} 只股票")
+
+    def prepare_from_store(self, store, start_date=None, end_date=None, ts_codes=None):
+        """从本地K线库读取数据并写入共享数组"""
+        df = store.read_many(ts_codes, start_date, end_date, columns=['open', 'high', 'low', 'close', 'vol'])
+        if df.empty:
+            return False
+        self.prepare_data(pivot_panel(df, fields=('open', 'high', 'low', 'close', 'vol')))
+        return True
+
+    def run(self, params):
+        """并行评估参数组合
+
+        Args:
+            params: [(short_window, long_window, stop_loss, take_profit), ...]，可由grid_params或random_params生成
+
+        Returns:
+            pandas.DataFrame: 按夏普比率从高到低、最大回撤从低到高排序的结果表
+        """
+        # 按均线参数分组，同一组的信号只计算一次
+        groups = {}
+        for short_window, long_window, stop_loss, take_profit in params:
+            groups.setdefault((short_window, long_window), []).append((stop_loss, take_profit))
+
+        start_time = time.perf_counter()
+        rows = []
+        with ProcessPoolExecutor(max_workers=self.max_workers, initializer=_init_worker,
+                                 initargs=(self.data_dir,)) as executor:
+            futures = {executor.submit(_evaluate_group, short_window, long_window, risk_params,
+                                       self.backtest_kwargs): (short_window, long_window)
+                       for (short_window, long_window), risk_params in groups.items()}
+            for done, future in enumerate(as_completed(futures), 1):
+                short_window, long_window = futures[future]
+                try:
+                    rows.extend(future.result())
+                except Exception as e:
+                    print(f"参数 short_window={short_window}, long_window={long_window} 评估失败: {e}")
+                print(f"进度: {done}/{len(futures)} 组均线参数")
+
+        print(f"共评估 {len(rows)} 组参数，耗时 {time.perf_counter() - start_time:.1f} 秒")
+        return self.rank(pd.DataFrame(rows, columns=RESULT_COLUMNS))
+
+    def rank(self, results):
+        """按夏普比率从高到低、最大回撤从低到高排序，并压缩为紧凑的数据类型"""
+        if results.empty:
+            return results
+        results = results.astype({'short_window': 'int16', 'long_window': 'int16', 'trade_count': 'int32'})
+        float_columns = [col for col in RESULT_COLUMNS if results[col].dtype == float]
+        results[float_columns] = results[float_columns].astype('float32')
+        results = results.sort_values(['sharpe', 'max_drawdown'], ascending=[False, True])
+        return results.reset_index(drop=True)
+
+    def save_results(self, results, name=None):
+        """保存扫描结果"""
+        name = name or datetime.now().strftime('%Y%m%d_%H%M%S')
+        file_path = os.path.join(self.output_dir, f"sweep_{name}.csv")
+        results.to_csv(file_path, index=False, encoding='utf-8-sig', float_format='%.6g')
+        print(f"扫描结果已保存至 {file_path}")
+        return file_path
+
+
+def main():
+    """用本地K线库数据扫描移动平均策略参数"""
+    print("移动平均策略参数扫描")
+    print("==================")
+
+    start_date = input("请输入开始日期(YYYYMMDD，可留空): ") or None
+    end_date = input("请输入结束日期(YYYYMMDD，可留空): ") or None
+    mode = input("请选择搜索方式(1: 网格搜索, 2: 随机搜索): ")
+
+    sweep = ParameterSweep()
+    if not sweep.prepare_from_store(BarStore('tushare_data/bars'), start_date, end_date):
+        print("本地K线库为空，请先通过TushareCrawler下载数据")
+        return
+
+    if mode == '2':
+        n = int(input("请输入随机抽取的组合数量: ") or 100)
+        params = random_params(n)
+    else:
+        params = grid_params()
+
+    results = sweep.run(params)
+    print(results.head(20).to_string())
+    sweep.save_results(results)
+
+
+if __name__ == "__main__":
+    main()
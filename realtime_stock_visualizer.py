@@ -1,8 +1,10 @@
-import tushare as ts
+# 最先导入，启动耗时从这里开始计
+from lazy_imports import lazy_import, startup_timer
+from tushare_client import TushareClient
+from indicators import calculate_indicators, StreamingIndicators, apply_streaming_update
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
-import mplfinance as mpf
 import os
 import time
 import threading
@@ -13,6 +15,11 @@ from datetime import datetime, timedelta
 import matplotlib
 matplotlib.use('TkAgg')
 
+# tushare和mplfinance在登录、画K线时才导入
+ts = lazy_import('tushare')
+mpf = lazy_import('mplfinance')
+startup_timer.mark("模块导入")
+
 class RealTimeStockVisualizer:
     def __init__(self, token=None):
         """初始化实时股票可视化工具
@@ -26,6 +33,8 @@ class RealTimeStockVisualizer:
         self.stock_list = None
         self.current_stock = None
         self.current_data = None
+        self.streaming = None  # 当前股票的增量指标状态
+        self.streaming_stock = None
         self.update_thread = None
         self.is_updating = False
         self.update_interval = 60  # 数据更新间隔（秒）
@@ -43,7 +52,7 @@ class RealTimeStockVisualizer:
         if self.token:
             try:
                 ts.set_token(self.token)
-                self.pro = ts.pro_api(timeout=60)
+                self.pro = TushareClient(ts.pro_api(timeout=60), token=self.token)
                 print("成功登录Tushare Pro API")
                 return True
             except Exception as e:
@@ -121,48 +130,17 @@ class RealTimeStockVisualizer:
             print(f"获取日线数据失败: {e}")
             return None
     
-    def calculate_indicators(self, df):
+    def calculate_indicators(self, df, ts_code=None):
         """计算技术指标
         
         Args:
             df: 股票历史数据DataFrame
+            ts_code: 股票代码，提供时同一股票同一段数据只计算一次
             
         Returns:
             pandas.DataFrame: 添加了技术指标的DataFrame
         """
-        if df is None or df.empty:
-            return None
-        
-        # 复制DataFrame以避免修改原始数据
-        result = df.copy()
-        
-        # 计算移动平均线
-        result['MA5'] = result['close'].rolling(window=5).mean()
-        result['MA10'] = result['close'].rolling(window=10).mean()
-        result['MA20'] = result['close'].rolling(window=20).mean()
-        
-        # 计算MACD
-        result['EMA12'] = result['close'].ewm(span=12, adjust=False).mean()
-        result['EMA26'] = result['close'].ewm(span=26, adjust=False).mean()
-        result['DIF'] = result['EMA12'] - result['EMA26']
-        result['DEA'] = result['DIF'].ewm(span=9, adjust=False).mean()
-        result['MACD'] = 2 * (result['DIF'] - result['DEA'])
-        
-        # 计算KDJ
-        low_min = result['low'].rolling(window=9).min()
-        high_max = result['high'].rolling(window=9).max()
-        result['RSV'] = (result['close'] - low_min) / (high_max - low_min) * 100
-        result['K'] = result['RSV'].ewm(com=2).mean()
-        result['D'] = result['K'].ewm(com=2).mean()
-        result['J'] = 3 * result['K'] - 2 * result['D']
-        
-        # 计算BOLL指标
-        result['BOLL_MIDDLE'] = result['close'].rolling(window=20).mean()
-        result['BOLL_STD'] = result['close'].rolling(window=20).std()
-        result['BOLL_UPPER'] = result['BOLL_MIDDLE'] + 2 * result['BOLL_STD']
-        result['BOLL_LOWER'] = result['BOLL_MIDDLE'] - 2 * result['BOLL_STD']
-        
-        return result
+        return calculate_indicators(df, symbol=ts_code, ma_windows=(5, 10, 20))
     
     def get_stock_news(self, ts_code):
         """获取股票相关新闻
@@ -496,7 +474,12 @@ class RealTimeStockVisualizer:
             return
         
         # 计算技术指标
-        self.current_data = self.calculate_indicators(daily_data)
+        self.current_data = self.calculate_indicators(daily_data, self.current_stock)
+        
+        # 用历史K线初始化增量指标，之后的自动刷新只更新最新一根K线
+        self.streaming = StreamingIndicators(ma_windows=(5, 10, 20))
+        self.streaming.warm_up(daily_data)
+        self.streaming_stock = self.current_stock
         
         # 获取实时行情
         realtime_data = self.get_realtime_quotes(self.current_stock)
@@ -514,6 +497,48 @@ class RealTimeStockVisualizer:
         self.update_time_label.config(text=f"最后更新: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
         self.status_label.config(text="数据加载完成")
     
+    def refresh_realtime_data(self):
+        """用实时行情增量更新当日K线和技术指标，不再重新拉取历史数据"""
+        if not self.current_stock:
+            return
+        
+        # 切换了股票或尚未加载历史数据时完整加载一次
+        if self.streaming is None or self.current_data is None or self.streaming_stock != self.current_stock:
+            self.update_stock_data()
+            return
+        
+        realtime_data = self.get_realtime_quotes(self.current_stock)
+        if realtime_data is None or realtime_data.empty:
+            return
+        
+        quote = realtime_data.iloc[0]
+        try:
+            bar = {
+                'open': float(quote['open']),
+                'high': float(quote['high']),
+                'low': float(quote['low']),
+                'close': float(quote['price']),
+                'vol': float(quote['volume']) / 100  # 实时行情单位为股，日线为手
+            }
+        except (KeyError, ValueError) as e:
+            print(f"解析实时行情失败: {e}")
+            return
+        
+        # 未开盘时价格为0，不更新K线
+        if bar['open'] <= 0 or bar['close'] <= 0:
+            self.update_quote_panel(realtime_data)
+            return
+        
+        trade_date = pd.Timestamp(quote['date'])
+        values = self.streaming.update(bar, trade_date)
+        self.current_data = apply_streaming_update(self.current_data, trade_date, bar, values)
+        
+        # 更新界面
+        self.update_quote_panel(realtime_data)
+        self.update_charts()
+        self.update_analysis()
+        self.update_time_label.config(text=f"最后更新: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    
     def update_info_panel(self, info):
         """更新股票基本信息面板"""
         if info is None:
@@ -698,8 +723,8 @@ class RealTimeStockVisualizer:
         """自动更新线程"""
         while self.is_updating:
             if self.current_stock:
-                # 在主线程中更新UI
-                self.root.after(0, self.update_stock_data)
+                # 在主线程中更新UI，只增量更新最新一根K线
+                self.root.after(0, self.refresh_realtime_data)
             
             # 等待指定时间
             time.sleep(self.update_interval)
@@ -715,6 +740,8 @@ class RealTimeStockVisualizer:
         """运行应用程序"""
         # 创建GUI
         self.create_gui()
+        startup_timer.mark("界面创建")
+        startup_timer.report_when_shown(self.root)
         
         # 登录Tushare
         if not self.token:
@@ -155,18 +155,20 @@ def run_finance_crawler(args):
         
         # 定义异步主函数
         async def run():
-            print(f"\n爬取 {args.stock} 相关新闻...")
-            await crawler.crawl_stock_news(args.stock)
-            
-            print(f"\n爬取 {args.stock} 论坛讨论...")
-            await crawler.crawl_stock_forum(args.stock)
-            
-            if crawler.pro:
-                print(f"\n获取 {args.stock} 的历史数据...")
-                crawler.get_stock_data(args.stock, args.start, args.end)
-            
-            print(f"\n分析 {args.stock} 的情感...")
-            await crawler.analyze_stock_sentiment(args.stock)
+            # 退出时（包括出错时）关闭共用的浏览器会话池，并保存网页缓存索引
+            async with crawler:
+                print(f"\n爬取 {args.stock} 相关新闻...")
+                await crawler.crawl_stock_news(args.stock)
+                
+                print(f"\n爬取 {args.stock} 论坛讨论...")
+                await crawler.crawl_stock_forum(args.stock)
+                
+                if crawler.pro:
+                    print(f"\n获取 {args.stock} 的历史数据...")
+                    crawler.get_stock_data(args.stock, args.start, args.end)
+                
+                print(f"\n分析 {args.stock} 的情感...")
+                await crawler.analyze_stock_sentiment(args.stock)
         
         # 运行异步函数
         asyncio.run(run())
@@ -204,15 +206,11 @@ def run_stock_analysis(args):
         print(f"\n获取 {args.stock} 的历史数据并计算技术指标...")
         df = analyzer.get_stock_data(args.stock, args.start, args.end)
         if df is not None:
-            df_with_indicators = analyzer.calculate_technical_indicators(df)
+            df_with_indicators = analyzer.calculate_technical_indicators(df, args.stock)
             
-            # 绘制图表
+            # 保存图表（五张图共用模板，不弹出窗口）
             print("\n绘制技术分析图表...")
-            analyzer.plot_stock_price(df_with_indicators, args.stock)
-            analyzer.plot_volume(df_with_indicators, args.stock)
-            analyzer.plot_macd(df_with_indicators, args.stock)
-            analyzer.plot_kdj(df_with_indicators, args.stock)
-            analyzer.plot_boll(df_with_indicators, args.stock)
+            analyzer.plot_all(df_with_indicators, args.stock)
             
             # 生成分析报告
             print("\n生成分析报告...")
@@ -0,0 +1,138 @@
+import time
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+from bar_store import BarStore
+from indicators import pivot_panel, calculate_panel_indicators, latest_cross_section
+
+# 全市场选股器
+# 把analyze_stock中的趋势、MACD、KDJ、BOLL规则改写为布尔数组，
+# 对全市场最新截面一次性求值，直接得到每只股票的信号和评分
+
+# 趋势规则，与analyze_stock的判断顺序相同
+TREND_LABELS = ["强势上涨趋势", "强势下跌趋势", "短期上涨趋势", "短期下跌趋势"]
+TREND_SIGNALS = [1, -1, 1, -1]
+
+MACD_LABELS = ["MACD金叉且柱线为正", "MACD死叉且柱线为负", "MACD金叉", "MACD死叉"]
+# 只有金叉且柱线为正、死叉且柱线为负分别计为买入、卖出信号
+MACD_SIGNALS = [1, -1, 0, 0]
+
+KDJ_LABELS = ["KDJ金叉", "KDJ死叉"]
+KDJ_SIGNALS = [1, -1]
+
+BOLL_LABELS = ["价格突破布林上轨", "价格跌破布林下轨", "价格在布林中轨和上轨之间"]
+
+REQUIRED_COLUMNS = ['close', 'MA5', 'MA10', 'MA20', 'DIF', 'DEA', 'MACD',
+                    'K', 'D', 'J', 'BOLL_UPPER', 'BOLL_MIDDLE', 'BOLL_LOWER']
+
+
+def screen_cross_section(latest):
+    """对全市场最新截面应用analyze_stock的规则并按评分排序
+
+    Args:
+        latest: 每行一只股票的DataFrame，需包含close、MA5、MA10、MA20、DIF、DEA、MACD、
+                K、D、J、BOLL_UPPER、BOLL_MIDDLE、BOLL_LOWER列
+
+    Returns:
+        pandas.DataFrame: 每只股票的各项判断、信号、综合信号和0-100评分，按评分从高到低排列
+    """
+    missing = [col for col in REQUIRED_COLUMNS if col not in latest.columns]
+    if missing:
+        raise ValueError(f"截面数据缺少列: {missing}")
+
+    col = {name: latest[name].to_numpy(dtype=float) for name in REQUIRED_COLUMNS}
+    close, ma5, ma10, ma20 = col['close'], col['MA5'], col['MA10'], col['MA20']
+    dif, dea, macd = col['DIF'], col['DEA'], col['MACD']
+    k, d, j = col['K'], col['D'], col['J']
+
+    # 与NaN比较结果为False，指标不足的股票与analyze_stock一样落到默认分支
+    with np.errstate(invalid='ignore'):
+        trend_conditions = [
+            (close > ma5) & (ma5 > ma10) & (ma10 > ma20),
+            (close < ma5) & (ma5 < ma10) & (ma10 < ma20),
+            (close > ma5) & (ma5 > ma10),
+            (close < ma5) & (ma5 < ma10),
+        ]
+        macd_conditions = [
+            (dif > dea) & (macd > 0),
+            (dif < dea) & (macd < 0),
+            dif > dea,
+            dif < dea,
+        ]
+        kdj_conditions = [
+            (k > d) & (j > d),
+            (k < d) & (j < d),
+        ]
+        boll_conditions = [
+            close > col['BOLL_UPPER'],
+            close < col['BOLL_LOWER'],
+            close > col['BOLL_MIDDLE'],
+        ]
+
+    trend_signal = np.select(trend_conditions, TREND_SIGNALS, default=0)
+    macd_signal = np.select(macd_conditions, MACD_SIGNALS, default=0)
+    kdj_signal = np.select(kdj_conditions, KDJ_SIGNALS, default=0)
+    signal_sum = trend_signal + macd_signal + kdj_signal
+
+    result = pd.DataFrame({
+        'close': close,
+        'trend': np.select(trend_conditions, TREND_LABELS, default="震荡整理"),
+        'macd': np.select(macd_conditions, MACD_LABELS, default="MACD中性"),
+        'kdj': np.select(kdj_conditions, KDJ_LABELS, default="KDJ中性"),
+        'boll': np.select(boll_conditions, BOLL_LABELS, default="价格在布林中轨和下轨之间"),
+        'trend_signal': trend_signal,
+        'macd_signal': macd_signal,
+        'kdj_signal': kdj_signal,
+        'signal_sum': signal_sum,
+        'overall': np.select(
+            [signal_sum >= 2, signal_sum <= -2, signal_sum > 0, signal_sum < 0],
+            ["买入信号", "卖出信号", "偏多信号", "偏空信号"],
+            default="中性信号"),
+        # 三项信号的平均值转换为0-100分
+        'score': ((signal_sum / 3 + 1) * 50).astype(int),
+    }, index=latest.index)
+
+    return result.sort_values(['score', 'trend_signal'], ascending=False, kind='stable')
+
+
+def screen_market(df, top_n=None):
+    """对多只股票的日线长表计算指标并筛选
+
+    Args:
+        df: 包含ts_code、trade_date、high、low、close列的长表，例如BarStore.read_many的结果
+        top_n: 只返回评分最高的前n只股票，为空则返回全部
+
+    Returns:
+        pandas.DataFrame: 按评分排序的选股结果
+    """
+    if df is None or df.empty:
+        return pd.DataFrame()
+
+    start_time = time.perf_counter()
+    prices = pivot_panel(df, fields=('high', 'low', 'close'))
+    panel = calculate_panel_indicators(prices['close'], prices['high'], prices['low'], ma_windows=(5, 10, 20))
+    panel['close'] = prices['close']
+    result = screen_cross_section(latest_cross_section(panel))
+    print(f"完成 {len(result)} 只股票的信号扫描，耗时 {time.perf_counter() - start_time:.3f} 秒")
+
+    if top_n:
+        return result.head(top_n)
+    return result
+
+
+def main():
+    """从本地K线库读取全市场数据并输出评分最高的股票"""
+    store = BarStore('tushare_data/bars')
+    # 指标最长需要约60个交易日的数据预热
+    start_date = (datetime.now() - timedelta(days=120)).strftime('%Y%m%d')
+    df = store.read_many(start_date=start_date, columns=['high', 'low', 'close'])
+    if df.empty:
+        print("本地K线库为空，请先通过TushareCrawler下载数据")
+        return
+
+    result = screen_market(df, top_n=20)
+    print(result[['close', 'trend', 'macd', 'kdj', 'boll', 'overall', 'score']].to_string())
+
+
+if __name__ == "__main__":
+    main()
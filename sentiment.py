@@ -0,0 +1,133 @@
+import re
+import json
+import time
+import numpy as np
+import pandas as pd
+
+# 基于关键词的标题情感打分
+# 正面、负面词表各编译成一个正则表达式，一次调用对整批标题打分，
+# 判断规则与原来逐个关键词检查相同：只含正面词为积极，只含负面词为消极，其余为中性
+
+DEFAULT_POSITIVE_KEYWORDS = ['涨', '利好', '增长', '突破', '机会', '看好']
+DEFAULT_NEGATIVE_KEYWORDS = ['跌', '利空', '下跌', '风险', '警惕', '担忧']
+
+LABELS = np.array(['neutral', 'positive', 'negative'])
+
+
+def compile_keywords(keywords):
+    """把关键词列表编译为一个正则表达式，长词优先匹配"""
+    keywords = sorted({k for k in keywords if k}, key=len, reverse=True)
+    if not keywords:
+        # 不匹配任何内容
+        return re.compile(r'(?!)')
+    return re.compile('|'.join(re.escape(k) for k in keywords))
+
+
+def load_lexicon(path):
+    """从JSON文件读取词表，格式为 {"positive": [...], "negative": [...]}"""
+    with open(path, 'r', encoding='utf-8') as f:
+        lexicon = json.load(f)
+    return lexicon.get('positive', []), lexicon.get('negative', [])
+
+
+class KeywordSentimentScorer:
+    def __init__(self, positive_keywords=None, negative_keywords=None):
+        """初始化情感打分器
+
+        Args:
+            positive_keywords: 正面关键词列表，默认使用DEFAULT_POSITIVE_KEYWORDS
+            negative_keywords: 负面关键词列表，默认使用DEFAULT_NEGATIVE_KEYWORDS
+        """
+        self.positive_keywords = list(positive_keywords or DEFAULT_POSITIVE_KEYWORDS)
+        self.negative_keywords = list(negative_keywords or DEFAULT_NEGATIVE_KEYWORDS)
+        self.positive_pattern = compile_keywords(self.positive_keywords)
+        self.negative_pattern = compile_keywords(self.negative_keywords)
+
+    @classmethod
+    def from_file(cls, path):
+        """从JSON词表文件创建打分器"""
+        positive, negative = load_lexicon(path)
+        return cls(positive, negative)
+
+    def score_titles(self, titles):
+        """对一批标题打分
+
+        Args:
+            titles: 标题列表或pandas.Series
+
+        Returns:
+            pandas.DataFrame: 每个标题一行，包含title、positive_hits、negative_hits、
+                              label（positive/negative/neutral）和score（1/-1/0）
+        """
+        titles = pd.Series(titles, dtype=object).fillna('').astype(str)
+        values = titles.tolist()
+        positive_hits = np.fromiter(map(len, map(self.positive_pattern.findall, values)), np.int32, len(values))
+        negative_hits = np.fromiter(map(len, map(self.negative_pattern.findall, values)), np.int32, len(values))
+
+        is_positive = (positive_hits > 0) & (negative_hits == 0)
+        is_negative = (negative_hits > 0) & (positive_hits == 0)
+        score = is_positive.astype(np.int8) - is_negative.astype(np.int8)
+
+        return pd.DataFrame({
+            'title': titles.to_numpy(),
+            'positive_hits': positive_hits,
+            'negative_hits': negative_hits,
+            'label': LABELS[np.where(is_positive, 1, np.where(is_negative, 2, 0))],
+            'score': score,
+        }, index=titles.index)
+
+    def score_items(self, items, field='title'):
+        """对新闻或帖子条目打分，条目为包含title字段的字典"""
+        return self.score_titles([item.get(field, '') for item in items or []])
+
+    @staticmethod
+    def summarize(scored):
+        """汇总打分结果
+
+        Returns:
+            dict: positive_count、negative_count、neutral_count、total_count和平均分
+        """
+        score = scored['score'].to_numpy() if len(scored) else np.zeros(0)
+        return {
+            'positive_count': int((score > 0).sum()),
+            'negative_count': int((score < 0).sum()),
+            'neutral_count': int((score == 0).sum()),
+            'total_count': int(len(score)),
+            'mean_score': float(score.mean()) if len(score) else 0.0,
+        }
+
+    def score_file(self, path, field='title', chunksize=200000):
+        """分块对历史数据文件（CSV或JSONL）中的标题打分并汇总，不把整个文件读入内存
+
+        Args:
+            path: CSV文件或每行一个JSON对象的JSONL文件
+            field: 标题所在的列
+            chunksize: 每块行数
+
+        Returns:
+            dict: 与summarize相同的汇总结果
+        """
+        start_time = time.perf_counter()
+        if path.endswith('.csv'):
+            reader = pd.read_csv(path, usecols=[field], chunksize=chunksize)
+        else:
+            reader = pd.read_json(path, lines=True, chunksize=chunksize)
+
+        counts = np.zeros(3, dtype=np.int64)
+        total_score = 0
+        for chunk in reader:
+            if field not in chunk.columns:
+                continue
+            score = self.score_titles(chunk[field])['score'].to_numpy()
+            counts += [(score > 0).sum(), (score < 0).sum(), (score == 0).sum()]
+            total_score += int(score.sum())
+
+        total = int(counts.sum())
+        print(f"完成 {total} 条标题的情感打分，耗时 {time.perf_counter() - start_time:.1f} 秒")
+        return {
+            'positive_count': int(counts[0]),
+            'negative_count': int(counts[1]),
+            'neutral_count': int(counts[2]),
+            'total_count': total,
+            'mean_score': total_score / total if total else 0.0,
+        }
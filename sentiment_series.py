@@ -0,0 +1,238 @@
+import os
+import re
+import threading
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+from bar_store import read_frame, write_frame, PARQUET_AVAILABLE
+
+# 按股票保存的情感时间序列
+# 每只股票一个目录、按月分区，按小时记录积极、消极、中性条目数和分数之和，新条目到达时只重写受影响的月份。
+# 条目按发布时间归入小时，补抓的旧帖子计入它们实际发布的时间，而不是抓取的时间。
+# 读取时可汇总为日频，并按交易日与日线数据对齐，作为指标计算的特征
+
+COUNT_COLUMNS = ['positive_count', 'negative_count', 'neutral_count', 'total_count', 'score_sum']
+
+# 页面上常见的发布时间写法：完整日期、省略年份的月-日、只有时刻、若干分钟/小时/天前
+FULL_DATE = re.compile(r'(\d{4})[-/年.](\d{1,2})[-/月.](\d{1,2})日?(?:\s*(\d{1,2}):(\d{2}))?')
+MONTH_DAY = re.compile(r'(\d{1,2})[-/月](\d{1,2})日?(?:\s*(\d{1,2}):(\d{2}))?')
+CLOCK = re.compile(r'(\d{1,2}):(\d{2})')
+RELATIVE = re.compile(r'(\d+)\s*(分钟|小时|天)前')
+RELATIVE_UNITS = {'分钟': 'minutes', '小时': 'hours', '天': 'days'}
+
+
+def item_time(item):
+    """条目的发布时间，页面上的时间解析不出时退回到抓取时间
+
+    Args:
+        item: ItemStore返回的条目，time为页面上的发布时间，crawled_at为抓取时间
+
+    Returns:
+        datetime: 发布时间
+    """
+    crawled = pd.to_datetime(item.get('crawled_at'), errors='coerce')
+    crawled = datetime.now() if pd.isna(crawled) else crawled.to_pydatetime()
+    text = str(item.get('time') or '').strip()
+
+    try:
+        match = FULL_DATE.search(text)
+        if match:
+            year, month, day, hour, minute = match.groups()
+            published = datetime(int(year), int(month), int(day), int(hour or 0), int(minute or 0))
+            return min(published, crawled)
+
+        match = RELATIVE.search(text)
+        if match:
+            return crawled - timedelta(**{RELATIVE_UNITS[match.group(2)]: int(match.group(1))})
+
+        match = MONTH_DAY.match(text)
+        if match:
+            month, day, hour, minute = match.groups()
+            published = datetime(crawled.year, int(month), int(day), int(hour or 0), int(minute or 0))
+            # 省略年份的时间不会晚于抓取时间，晚于说明是去年的条目
+            if published > crawled:
+                published = published.replace(year=crawled.year - 1)
+            return published
+
+        match = CLOCK.match(text)
+        if match:
+            published = crawled.replace(hour=int(match.group(1)), minute=int(match.group(2)), second=0)
+            return published if published <= crawled else published - timedelta(days=1)
+    except ValueError:
+        pass
+    return crawled
+
+
+def add_ratios(df):
+    """根据条目数计算积极占比、消极占比和净情感（积极减消极再除以总数）"""
+    total = df['total_count'].to_numpy(dtype=float)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        df['positive_ratio'] = np.where(total > 0, df['positive_count'] / total, 0.0)
+        df['negative_ratio'] = np.where(total > 0, df['negative_count'] / total, 0.0)
+        df['net_sentiment'] = np.where(total > 0, df['score_sum'] / total, 0.0)
+    return df
+
+
+class SentimentSeries:
+    def __init__(self, root_dir='finance_data/sentiment'):
+        """初始化情感时间序列存储
+
+        Args:
+            root_dir: 存储目录，每只股票一个子目录，按月分区，如 root_dir/000001/202405.parquet
+        """
+        self.root_dir = root_dir
+        self.file_ext = '.parquet' if PARQUET_AVAILABLE else '.csv'
+        self._lock = threading.Lock()
+
+        # 确保存储目录存在
+        if not os.path.exists(self.root_dir):
+            os.makedirs(self.root_dir)
+
+    def _symbol_dir(self, symbol):
+        return os.path.join(self.root_dir, symbol.replace('.', '_'))
+
+    def _partition_path(self, symbol, month):
+        return os.path.join(self._symbol_dir(symbol), f"{month}{self.file_ext}")
+
+    def _legacy_path(self, symbol):
+        # 旧版本每只股票只有一个文件
+        return os.path.join(self.root_dir, f"{symbol.replace('.', '_')}{self.file_ext}")
+
+    @staticmethod
+    def _read_file(path):
+        df = read_frame(path)
+        df['hour'] = df['hour'].astype(str)
+        return df
+
+    def _migrate_legacy(self, symbol):
+        """把旧版本的单文件拆成按月分区，中断后重新执行的结果相同"""
+        legacy_path = self._legacy_path(symbol)
+        if not os.path.exists(legacy_path):
+            return
+        os.makedirs(self._symbol_dir(symbol), exist_ok=True)
+        df = self._read_file(legacy_path)
+        for month, part in df.groupby(df['hour'].str[:6]):
+            write_frame(part.sort_values('hour'), self._partition_path(symbol, month))
+        os.remove(legacy_path)
+
+    def _read_hourly(self, symbol, start=None, end=None):
+        # 旧版本的单文件还在时，分区可能是迁移到一半的结果，以单文件为准
+        legacy_path = self._legacy_path(symbol)
+        if os.path.exists(legacy_path):
+            paths = [legacy_path]
+        else:
+            symbol_dir = self._symbol_dir(symbol)
+            months = []
+            if os.path.isdir(symbol_dir):
+                months = sorted(name[:-len(self.file_ext)] for name in os.listdir(symbol_dir)
+                                if name.endswith(self.file_ext))
+            # 只读取与日期范围相交的月份
+            if start:
+                months = [month for month in months if month >= start[:6]]
+            if end:
+                months = [month for month in months if month <= end[:6]]
+            paths = [self._partition_path(symbol, month) for month in months]
+
+        frames = [self._read_file(path) for path in paths]
+        if not frames:
+            return pd.DataFrame(columns=['hour'] + COUNT_COLUMNS)
+        return pd.concat(frames, ignore_index=True)
+
+    def update(self, symbol, scored, timestamps=None):
+        """把新打分的条目计入时间序列，只重写新条目所在月份的分区
+
+        Args:
+            symbol: 股票代码
+            scored: KeywordSentimentScorer.score_titles的结果
+            timestamps: 每个条目的发布时间（见item_time），为空时使用当前时间
+
+        Returns:
+            int: 计入的条目数量
+        """
+        if scored is None or len(scored) == 0:
+            return 0
+
+        if timestamps is None:
+            hours = pd.Series(datetime.now().strftime('%Y%m%d%H'), index=range(len(scored)))
+        else:
+            times = pd.to_datetime(pd.Series(list(timestamps)), errors='coerce').fillna(pd.Timestamp.now())
+            hours = times.dt.strftime('%Y%m%d%H')
+
+        score = scored['score'].to_numpy()
+        new_counts = pd.DataFrame({
+            'hour': hours.to_numpy(),
+            'positive_count': (score > 0).astype(int),
+            'negative_count': (score < 0).astype(int),
+            'neutral_count': (score == 0).astype(int),
+            'total_count': 1,
+            'score_sum': score.astype(int),
+        }).groupby('hour', as_index=False).sum()
+
+        with self._lock:
+            self._migrate_legacy(symbol)
+            os.makedirs(self._symbol_dir(symbol), exist_ok=True)
+            for month, part in new_counts.groupby(new_counts['hour'].str[:6]):
+                path = self._partition_path(symbol, month)
+                if os.path.exists(path):
+                    part = pd.concat([self._read_file(path), part], ignore_index=True)
+                part[COUNT_COLUMNS] = part[COUNT_COLUMNS].astype(int)
+                part = part.groupby('hour', as_index=False).sum().sort_values('hour')
+                write_frame(part, path)
+        return len(scored)
+
+    def read(self, symbol, freq='D', start=None, end=None):
+        """读取情感时间序列
+
+        Args:
+            symbol: 股票代码
+            freq: 'H'按小时，'D'按日
+            start: 开始日期（YYYYMMDD），可为空
+            end: 结束日期（YYYYMMDD），可为空
+
+        Returns:
+            pandas.DataFrame: 小时频的列为hour（YYYYMMDDHH），日频的列为date（YYYYMMDD），
+                              另有各类条目数、score_sum、positive_ratio、negative_ratio、net_sentiment
+        """
+        df = self._read_hourly(symbol, start, end)
+        if start:
+            df = df[df['hour'] >= start]
+        if end:
+            df = df[df['hour'].str[:8] <= end]
+
+        if freq == 'D':
+            df = df.assign(date=df['hour'].str[:8]).drop(columns='hour')
+            df = df.groupby('date', as_index=False)[COUNT_COLUMNS].sum()
+        return add_ratios(df.reset_index(drop=True))
+
+    def join_bars(self, bars, symbol, date_col='trade_date'):
+        """把日频情感并入日线数据
+
+        非交易日（周末、节假日）的条目计入之后的第一个交易日，没有条目的交易日计数为0
+
+        Args:
+            bars: 日线数据，包含trade_date列（YYYYMMDD）
+            symbol: 情感序列对应的股票代码
+
+        Returns:
+            pandas.DataFrame: 增加了情感列的日线数据，行顺序与输入相同
+        """
+        daily = self.read(symbol, freq='D')
+        result = bars.copy()
+        trade_dates = np.sort(result[date_col].astype(str).unique())
+
+        if daily.empty or len(trade_dates) == 0:
+            for col in COUNT_COLUMNS:
+                result[col] = 0
+            return add_ratios(result)
+
+        # 每个情感日期对齐到当天或之后的第一个交易日，最后一个交易日之后的条目丢弃
+        position = np.searchsorted(trade_dates, daily['date'].to_numpy(dtype=str))
+        daily = daily[position < len(trade_dates)]
+        daily = daily.assign(**{date_col: trade_dates[position[position < len(trade_dates)]]})
+        daily = daily.groupby(date_col, as_index=False)[COUNT_COLUMNS].sum()
+
+        key = result[date_col].astype(str)
+        aligned = daily.set_index(date_col).reindex(key).fillna(0)
+        for col in COUNT_COLUMNS:
+            result[col] = aligned[col].to_numpy(dtype=int)
+        return add_ratios(result)
@@ -3,6 +3,11 @@ import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 import tushare as ts
+from tushare_client import TushareClient
+from indicators import calculate_indicators, calculate_panel_indicators, calculate_long_indicators
+from batch_charts import ChartRenderer, BatchChartRenderer
+from batch_reports import BatchReportGenerator, render_report, report_path, panel_from_store
+from bar_store import BarStore
 from datetime import datetime, timedelta
 
 
@@ -16,6 +21,7 @@ class StockAnalyzer:
         self.token = token
         self.pro = None
         self.output_dir = 'analysis_results'
+        self.chart_renderer = None  # 第一次批量保存图表时创建
         
         # 确保输出目录存在
         if not os.path.exists(self.output_dir):
@@ -25,7 +31,7 @@ class StockAnalyzer:
         """登录Tushare Pro API"""
         if self.token:
             ts.set_token(self.token)
-            self.pro = ts.pro_api()
+            self.pro = TushareClient(ts.pro_api(), token=self.token)
             print("成功登录Tushare Pro API")
             return True
         else:
@@ -69,58 +75,34 @@ class StockAnalyzer:
             print(f"获取股票数据失败: {e}")
             return None
     
-    def calculate_technical_indicators(self, df):
+    def calculate_technical_indicators(self, df, ts_code=None):
         """计算技术指标
         
         Args:
             df: 股票历史数据DataFrame
+            ts_code: 股票代码，提供时同一股票同一段数据只计算一次
             
         Returns:
             pandas.DataFrame: 添加了技术指标的DataFrame
         """
-        if df is None or df.empty:
+        return calculate_indicators(df, symbol=ts_code)
+    
+    def calculate_panel_indicators(self, data):
+        """一次计算多只股票的技术指标
+        
+        Args:
+            data: 长表（包含ts_code、trade_date、high、low、close列，例如多只股票pro.daily结果拼接），
+                  或 {'close': 收盘价宽表, 'high': 最高价宽表, 'low': 最低价宽表}，宽表为 日期 × 股票
+            
+        Returns:
+            dict: 指标名 -> DataFrame（日期 × 股票），指标名与calculate_technical_indicators的列名相同
+        """
+        if data is None or len(data) == 0:
             return None
         
-        # 复制DataFrame以避免修改原始数据
-        result = df.copy()
-        
-        # 计算移动平均线
-        result['MA5'] = result['close'].rolling(window=5).mean()
-        result['MA10'] = result['close'].rolling(window=10).mean()
-        result['MA20'] = result['close'].rolling(window=20).mean()
-        result['MA30'] = result['close'].rolling(window=30).mean()
-        
-        # 计算MACD
-        result['EMA12'] = result['close'].ewm(span=12, adjust=False).mean()
-        result['EMA26'] = result['close'].ewm(span=26, adjust=False).mean()
-        result['DIF'] = result['EMA12'] - result['EMA26']
-        result['DEA'] = result['DIF'].ewm(span=9, adjust=False).mean()
-        result['MACD'] = 2 * (result['DIF'] - result['DEA'])
-        
-        # 计算KDJ
-        low_min = result['low'].rolling(window=9).min()
-        high_max = result['high'].rolling(window=9).max()
-        result['RSV'] = (result['close'] - low_min) / (high_max - low_min) * 100
-        result['K'] = result['RSV'].ewm(com=2).mean()
-        result['D'] = result['K'].ewm(com=2).mean()
-        result['J'] = 3 * result['K'] - 2 * result['D']
-        
-        # 计算BOLL指标
-        result['BOLL_MIDDLE'] = result['close'].rolling(window=20).mean()
-        result['BOLL_STD'] = result['close'].rolling(window=20).std()
-        result['BOLL_UPPER'] = result['BOLL_MIDDLE'] + 2 * result['BOLL_STD']
-        result['BOLL_LOWER'] = result['BOLL_MIDDLE'] - 2 * result['BOLL_STD']
-        
-        # 计算RSI
-        delta = result['close'].diff()
-        up = delta.clip(lower=0)
-        down = -1 * delta.clip(upper=0)
-        ema_up = up.ewm(com=13, adjust=False).mean()
-        ema_down = down.ewm(com=13, adjust=False).mean()
-        rs = ema_up / ema_down
-        result['RSI'] = 100 - (100 / (1 + rs))
-        
-        return result
+        if isinstance(data, pd.DataFrame):
+            return calculate_long_indicators(data)
+        return calculate_panel_indicators(data['close'], data['high'], data['low'])
     
     def plot_stock_price(self, df, ts_code, save=True):
         """绘制股票价格走势图
@@ -275,6 +257,43 @@ class StockAnalyzer:
         
         plt.show()
     
+    def plot_all(self, df, ts_code, fmt='png'):
+        """不显示窗口，直接保存股价、成交量、MACD、KDJ、布林带五张图
+        
+        图表模板只创建一次，之后每只股票只替换数据
+        
+        Args:
+            df: 包含技术指标的DataFrame
+            ts_code: 股票代码
+            fmt: 图片格式，png或svg
+            
+        Returns:
+            list: 保存的文件路径
+        """
+        if df is None or df.empty:
+            print("没有数据可供绘图")
+            return []
+        
+        if self.chart_renderer is None or self.chart_renderer.fmt != fmt:
+            self.chart_renderer = ChartRenderer(self.output_dir, fmt)
+        paths = self.chart_renderer.render(df, ts_code)
+        print(f"{ts_code} 的 {len(paths)} 张技术分析图表已保存至 {self.output_dir}")
+        return paths
+    
+    def batch_plot(self, frames, fmt='png', max_workers=None):
+        """用多进程为多只股票保存五张技术分析图表
+        
+        Args:
+            frames: 股票代码 -> 包含技术指标的DataFrame
+            fmt: 图片格式，png或svg
+            max_workers: 进程数，默认为CPU核数
+            
+        Returns:
+            dict: 股票代码 -> 保存的文件路径列表
+        """
+        renderer = BatchChartRenderer(self.output_dir, fmt=fmt, max_workers=max_workers)
+        return renderer.render(frames)
+    
     def generate_analysis_report(self, df, ts_code):
         """生成分析报告
         
@@ -286,216 +305,34 @@ class StockAnalyzer:
             print("没有数据可供分析")
             return
         
-        # 获取最新数据
-        latest = df.iloc[-1]
-        prev = df.iloc[-2]
-        
-        # 计算涨跌幅
-        change_pct = (latest['close'] - prev['close']) / prev['close'] * 100
-        
-        # 生成报告
-        report = f"# {ts_code} 股票分析报告\n\n"
-        report += f"## 基本信息\n\n"
-        report += f"- 股票代码: {ts_code}\n"
-        report += f"- 分析日期: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n"
-        report += f"- 数据区间: {df.index[0].strftime('%Y-%m-%d')} 至 {df.index[-1].strftime('%Y-%m-%d')}\n\n"
-        
-        report += f"## 最新交易日数据\n\n"
-        report += f"- 日期: {df.index[-1].strftime('%Y-%m-%d')}\n"
-        report += f"- 开盘价: {latest['open']:.2f}\n"
-        report += f"- 最高价: {latest['high']:.2f}\n"
-        report += f"- 最低价: {latest['low']:.2f}\n"
-        report += f"- 收盘价: {latest['close']:.2f}\n"
-        report += f"- 涨跌幅: {change_pct:.2f}%\n"
-        report += f"- 成交量: {latest['vol']}\n\n"
-        
-        report += f"## 技术指标分析\n\n"
-        
-        # 移动平均线分析
-        report += f"### 移动平均线\n\n"
-        ma5 = latest['MA5']
-        ma10 = latest['MA10']
-        ma20 = latest['MA20']
-        ma30 = latest['MA30']
-        close = latest['close']
-        
-        report += f"- MA5: {ma5:.2f}\n"
-        report += f"- MA10: {ma10:.2f}\n"
-        report += f"- MA20: {ma20:.2f}\n"
-        report += f"- MA30: {ma30:.2f}\n\n"
-        
-        if close > ma5 > ma10 > ma20 > ma30:
-            report += "移动平均线呈多头排列，股价处于上升趋势。\n\n"
-        elif close < ma5 < ma10 < ma20 < ma30:
-            report += "移动平均线呈空头排列，股价处于下降趋势。\n\n"
-        elif close > ma5 and close > ma10 and ma5 > ma10:
-            report += "短期均线向上，可能有上涨动能。\n\n"
-        elif close < ma5 and close < ma10 and ma5 < ma10:
-            report += "短期均线向下，可能有下跌压力。\n\n"
-        else:
-            report += "均线交叉，趋势不明确。\n\n"
-        
-        # MACD分析
-        report += f"### MACD\n\n"
-        dif = latest['DIF']
-        dea = latest['DEA']
-        macd = latest['MACD']
-        
-        report += f"- DIF: {dif:.4f}\n"
-        report += f"- DEA: {dea:.4f}\n"
-        report += f"- MACD: {macd:.4f}\n\n"
-        
-        if dif > dea and macd > 0:
-            report += "MACD金叉且柱线为正，可能是买入信号。\n\n"
-        elif dif < dea and macd < 0:
-            report += "MACD死叉且柱线为负，可能是卖出信号。\n\n"
-        elif dif > dea and macd < 0:
-            report += "MACD金叉但柱线仍为负，趋势可能即将转变。\n\n"
-        elif dif < dea and macd > 0:
-            report += "MACD死叉但柱线仍为正，趋势可能即将转变。\n\n"
-        else:
-            report += "MACD指标显示趋势不明确。\n\n"
-        
-        # KDJ分析
-        report += f"### KDJ\n\n"
-        k = latest['K']
-        d = latest['D']
-        j = latest['J']
-        
-        report += f"- K值: {k:.2f}\n"
-        report += f"- D值: {d:.2f}\n"
-        report += f"- J值: {j:.2f}\n\n"
-        
-        if k > d and j > 0:
-            report += "KDJ金叉，可能是买入信号。\n\n"
-        elif k < d and j < 100:
-            report += "KDJ死叉，可能是卖出信号。\n\n"
-        elif k > 80 and d > 80 and j > 80:
-            report += "KDJ三线都处于超买区域，可能面临回调。\n\n"
-        elif k < 20 and d < 20 and j < 20:
-            report += "KDJ三线都处于超卖区域，可能有反弹机会。\n\n"
-        else:
-            report += "KDJ指标显示趋势不明确。\n\n"
-        
-        # 布林带分析
-        report += f"### 布林带\n\n"
-        upper = latest['BOLL_UPPER']
-        middle = latest['BOLL_MIDDLE']
-        lower = latest['BOLL_LOWER']
-        
-        report += f"- 上轨: {upper:.2f}\n"
-        report += f"- 中轨: {middle:.2f}\n"
-        report += f"- 下轨: {lower:.2f}\n\n"
-        
-        if close > upper:
-            report += "股价突破布林带上轨，可能处于强势，但也有回调风险。\n\n"
-        elif close < lower:
-            report += "股价跌破布林带下轨，可能处于弱势，但也有反弹机会。\n\n"
-        elif close > middle and close < upper:
-            report += "股价位于布林带上半轨，呈现偏强走势。\n\n"
-        elif close < middle and close > lower:
-            report += "股价位于布林带下半轨，呈现偏弱走势。\n\n"
-        else:
-            report += "股价位于布林带中轨附近，趋势不明确。\n\n"
-        
-        # RSI分析
-        report += f"### RSI\n\n"
-        rsi = latest['RSI']
-        
-        report += f"- RSI: {rsi:.2f}\n\n"
-        
-        if rsi > 70:
-            report += "RSI处于超买区域，可能面临回调。\n\n"
-        elif rsi < 30:
-            report += "RSI处于超卖区域，可能有反弹机会。\n\n"
-        elif rsi > 50 and rsi < 70:
-            report += "RSI处于强势区域，但未达超买。\n\n"
-        elif rsi > 30 and rsi < 50:
-            report += "RSI处于弱势区域，但未达超卖。\n\n"
-        else:
-            report += "RSI指标显示趋势中性。\n\n"
-        
-        # 综合分析
-        report += f"## 综合分析\n\n"
-        
-        # 简单的综合分析逻辑
-        bullish_signals = 0
-        bearish_signals = 0
-        
-        # 均线信号
-        if close > ma5 > ma10 > ma20 > ma30:
-            bullish_signals += 2
-        elif close < ma5 < ma10 < ma20 < ma30:
-            bearish_signals += 2
-        elif close > ma5 and close > ma10:
-            bullish_signals += 1
-        elif close < ma5 and close < ma10:
-            bearish_signals += 1
-        
-        # MACD信号
-        if dif > dea and macd > 0:
-            bullish_signals += 2
-        elif dif < dea and macd < 0:
-            bearish_signals += 2
-        elif dif > dea:
-            bullish_signals += 1
-        elif dif < dea:
-            bearish_signals += 1
-        
-        # KDJ信号
-        if k > d and j > 0:
-            bullish_signals += 1
-        elif k < d and j < 100:
-            bearish_signals += 1
-        elif k < 20 and d < 20 and j < 20:
-            bullish_signals += 1
-        elif k > 80 and d > 80 and j > 80:
-            bearish_signals += 1
-        
-        # 布林带信号
-        if close > upper:
-            bullish_signals += 1
-            bearish_signals += 1  # 也有回调风险
-        elif close < lower:
-            bearish_signals += 1
-            bullish_signals += 1  # 也有反弹机会
-        elif close > middle:
-            bullish_signals += 1
-        elif close < middle:
-            bearish_signals += 1
-        
-        # RSI信号
-        if rsi > 70:
-            bearish_signals += 1
-        elif rsi < 30:
-            bullish_signals += 1
-        elif rsi > 50:
-            bullish_signals += 0.5
-        elif rsi < 50:
-            bearish_signals += 0.5
-        
-        # 输出综合分析结果
-        if bullish_signals > bearish_signals + 2:
-            report += "**综合技术指标显示强烈的看涨信号。**\n\n"
-        elif bearish_signals > bullish_signals + 2:
-            report += "**综合技术指标显示强烈的看跌信号。**\n\n"
-        elif bullish_signals > bearish_signals:
-            report += "**综合技术指标偏向看涨，但信号不够强烈。**\n\n"
-        elif bearish_signals > bullish_signals:
-            report += "**综合技术指标偏向看跌，但信号不够强烈。**\n\n"
-        else:
-            report += "**综合技术指标显示趋势不明确，建议观望。**\n\n"
-        
-        report += "*注意：本分析报告仅基于技术指标生成，不构成投资建议。投资决策需结合基本面分析和市场环境等多方面因素。*\n"
+        # 与批量报告共用同一套判断规则和报告模板
+        report = render_report(df, ts_code)
         
         # 保存报告
-        file_path = os.path.join(self.output_dir, f"{ts_code.replace('.', '_')}_analysis_report.md")
+        file_path = report_path(self.output_dir, ts_code)
         with open(file_path, 'w', encoding='utf-8') as f:
             f.write(report)
         print(f"分析报告已保存至 {file_path}")
         
         return report
-
+    
+    def generate_batch_reports(self, panel, max_workers=8):
+        """为多只股票批量生成分析报告和市场汇总
+        
+        Args:
+            panel: 字段名 -> DataFrame（日期 × 股票），需包含open、high、low、close、vol和各项指标，
+                   可由batch_reports.panel_from_store生成
+            max_workers: 写文件的线程数
+            
+        Returns:
+            pandas.DataFrame: 每只股票的涨跌幅、信号数和综合判断
+        """
+        if not panel:
+            print("没有数据可供分析")
+            return None
+        
+        generator = BatchReportGenerator(self.output_dir, max_workers=max_workers)
+        return generator.generate(panel)
 
 def main():
     print("股票技术分析工具")
@@ -514,6 +351,8 @@ def main():
         print("1. 获取股票数据并分析")
         print("2. 绘制技术指标图表")
         print("3. 生成分析报告")
+        print("4. 批量保存多只股票的技术指标图表")
+        print("5. 批量生成本地K线库全部股票的分析报告")
         print("0. 退出")
         
         choice = input("请输入选项编号: ")
@@ -528,7 +367,7 @@ def main():
                 df = analyzer.get_stock_data(ts_code, start_date or None, end_date or None)
                 if df is not None:
                     # 计算技术指标
-                    df_with_indicators = analyzer.calculate_technical_indicators(df)
+                    df_with_indicators = analyzer.calculate_technical_indicators(df, ts_code)
                     print("\n技术指标计算完成，最新数据:")
                     print(df_with_indicators.tail(1))
             else:
@@ -543,7 +382,7 @@ def main():
                 # 获取股票数据并计算指标
                 df = analyzer.get_stock_data(ts_code, start_date or None, end_date or None)
                 if df is not None:
-                    df_with_indicators = analyzer.calculate_technical_indicators(df)
+                    df_with_indicators = analyzer.calculate_technical_indicators(df, ts_code)
                     
                     # 绘制各种图表
                     analyzer.plot_stock_price(df_with_indicators, ts_code)
@@ -563,7 +402,7 @@ def main():
                 # 获取股票数据并计算指标
                 df = analyzer.get_stock_data(ts_code, start_date or None, end_date or None)
                 if df is not None:
-                    df_with_indicators = analyzer.calculate_technical_indicators(df)
+                    df_with_indicators = analyzer.calculate_technical_indicators(df, ts_code)
                     
                     # 生成分析报告
                     report = analyzer.generate_analysis_report(df_with_indicators, ts_code)
@@ -573,6 +412,36 @@ def main():
             else:
                 print("股票代码不能为空")
         
+        elif choice == '4':
+            codes = input("请输入股票代码，多个用逗号分隔(如: 000001.SZ,600000.SH): ")
+            start_date = input("请输入开始日期(YYYYMMDD，可留空): ")
+            end_date = input("请输入结束日期(YYYYMMDD，可留空): ")
+            fmt = input("请选择图片格式(png/svg，默认png): ").strip() or 'png'
+            
+            frames = {}
+            for ts_code in [code.strip() for code in codes.split(',') if code.strip()]:
+                df = analyzer.get_stock_data(ts_code, start_date or None, end_date or None)
+                if df is not None:
+                    frames[ts_code] = analyzer.calculate_technical_indicators(df, ts_code)
+            
+            if frames:
+                analyzer.batch_plot(frames, fmt=fmt)
+            else:
+                print("没有获取到任何股票数据")
+        
+        elif choice == '5':
+            start_date = input("请输入开始日期(YYYYMMDD，默认最近一年): ")
+            end_date = input("请输入结束日期(YYYYMMDD，可留空): ")
+            
+            start_date = start_date or (datetime.now() - timedelta(days=365)).strftime('%Y%m%d')
+            panel = panel_from_store(BarStore('tushare_data/bars'), start_date, end_date or None)
+            if panel is not None:
+                result = analyzer.generate_batch_reports(panel)
+                print("\n综合判断分布:")
+                print(result['overall'].value_counts().to_string())
+            else:
+                print("本地K线库为空，请先通过TushareCrawler下载数据")
+        
         elif choice == '0':
             print("程序已退出")
             break
@@ -7,9 +7,12 @@
 
 import time
 import datetime as dt
+from concurrent.futures import ThreadPoolExecutor
 from dateutil import tz
 import pandas as pd
 import numpy as np
+from market_snapshot import MarketSnapshotCache
+from bar_store import BarStore
 
 try:
     from easyquant import StrategyTemplate, DefaultLogHandler
@@ -46,14 +49,28 @@ class MovingAverageStrategy(StrategyTemplate):
         self.positions = {}
         self.last_prices = {}
         
+        # 全市场行情快照，每次风控检查只下载一次
+        self.snapshot_cache = MarketSnapshotCache(ak.stock_zh_a_spot_em, ttl=30)
+        
         # 股票池（可以根据需要修改）
         self.stock_pool = ['000001', '000002', '000858', '002415', '600036']
         
+        # 历史K线：开盘前并发预加载到内存，本地K线库保存已下载的数据，每天只补充缺失的部分
+        self.history = {}
+        self.history_date = None  # 历史K线加载的日期
+        self.history_days = 60
+        self.max_workers = 8
+        self.bar_store = BarStore('strategy_data/bars')
+        
     def init(self):
         """策略初始化"""
         print(f"初始化策略: {self.name}")
         
         # 注册定时事件
+        # 开盘前预加载历史K线
+        preload_time = dt.time(9, 15, 0, tzinfo=tz.tzlocal())
+        self.clock_engine.register_moment("preload_history", preload_time)
+        
         # 每天开盘后30分钟执行策略
         morning_time = dt.time(9, 30, 0, tzinfo=tz.tzlocal())
         self.clock_engine.register_moment("morning_check", morning_time)
@@ -71,31 +88,78 @@ class MovingAverageStrategy(StrategyTemplate):
         """时钟事件处理"""
         clock_type = event.data['clock_type']
         
-        if clock_type == "morning_check":
+        if clock_type == "preload_history":
+            self.preload_history()
+        elif clock_type == "morning_check":
             self.morning_strategy()
         elif clock_type == "afternoon_check":
             self.afternoon_strategy()
         elif clock_type == "risk_check":
             self.risk_management()
     
+    def preload_history(self, stock_codes=None):
+        """开盘前并发加载股票池的历史K线（不含当日）
+        
+        Args:
+            stock_codes: 需要加载的股票代码，默认为整个股票池
+        """
+        stock_codes = stock_codes or self.stock_pool
+        start_time = time.perf_counter()
+        
+        end_date = (dt.datetime.now() - dt.timedelta(days=1)).strftime('%Y%m%d')
+        start_date = (dt.datetime.now() - dt.timedelta(days=self.history_days)).strftime('%Y%m%d')
+        
+        def load(stock_code):
+            # 只下载本地K线库中缺失的区间
+            for range_start, range_end in self.bar_store.missing_ranges(stock_code, start_date, end_date):
+                data = self.fetch_history(stock_code, range_start, range_end)
+                self.bar_store.write(stock_code, data, range_start, range_end)
+            data = self.bar_store.read(stock_code, start_date, end_date, columns=['close', 'volume'])
+            if not data.empty:
+                self.history[stock_code] = data
+        
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for stock_code, future in zip(stock_codes, [executor.submit(load, code) for code in stock_codes]):
+                try:
+                    future.result()
+                except Exception as e:
+                    print(f"预加载 {stock_code} 历史数据失败: {e}")
+        self.history_date = dt.date.today()
+        
+        elapsed = time.perf_counter() - start_time
+        print(f"历史数据预加载完成: {len(stock_codes)} 只股票, 耗时 {elapsed:.2f} 秒")
+    
     def morning_strategy(self):
         """早盘策略"""
         print("执行早盘策略检查...")
+        start_time = time.perf_counter()
+        
+        # 历史数据不是今天加载的需要全部刷新；未预加载的股票（例如开盘后才启动策略）在这里补充加载
+        if self.history_date != dt.date.today():
+            missing = list(self.stock_pool)
+        else:
+            missing = [code for code in self.stock_pool if code not in self.history]
+        if missing:
+            self.preload_history(missing)
+        
+        # 当日K线只取一次全市场快照
+        try:
+            snapshot = self.snapshot_cache.refresh(force=True).drop_duplicates('代码').set_index('代码')
+        except Exception as e:
+            print(f"获取实时行情失败: {e}")
+            return
         
         for stock_code in self.stock_pool:
             try:
-                # 获取历史数据
-                data = self.get_stock_data(stock_code)
-                if data is None or len(data) < self.long_window:
+                if stock_code not in snapshot.index:
                     continue
+                quote = snapshot.loc[stock_code]
                 
-                # 计算移动平均线
-                data['MA5'] = data['close'].rolling(window=self.short_window).mean()
-                data['MA20'] = data['close'].rolling(window=self.long_window).mean()
-                
-                # 获取最新数据
-                latest = data.iloc[-1]
-                prev = data.iloc[-2]
+                # 历史K线加上当日K线计算均线
+                signal_data = self.build_signal_data(stock_code, float(quote['最新价']), float(quote['成交量']))
+                if signal_data is None:
+                    continue
+                latest, prev = signal_data
                 
                 # 检查买入信号
                 if self.check_buy_signal(latest, prev, stock_code):
@@ -107,6 +171,36 @@ class MovingAverageStrategy(StrategyTemplate):
                     
             except Exception as e:
                 print(f"处理股票 {stock_code} 时出错: {e}")
+        
+        elapsed = time.perf_counter() - start_time
+        print(f"早盘策略检查完成: {len(self.stock_pool)} 只股票, 耗时 {elapsed:.2f} 秒")
+    
+    def build_signal_data(self, stock_code, price, volume):
+        """用预加载的历史K线和当日最新价计算最新一天和前一天的均线
+        
+        Returns:
+            tuple: (latest, prev)，历史数据不足时返回None
+        """
+        history = self.history.get(stock_code)
+        if history is None or len(history) < self.long_window:
+            return None
+        
+        close = np.append(history['close'].to_numpy(dtype=float)[-self.long_window:], price)
+        volumes = np.append(history['volume'].to_numpy(dtype=float)[-9:], volume)
+        
+        latest = {
+            'close': price,
+            'volume': volume,
+            'MA5': close[-self.short_window:].mean(),
+            'MA20': close[-self.long_window:].mean(),
+            'VOL_MA10': volumes.mean()
+        }
+        prev = {
+            'close': close[-2],
+            'MA5': close[-self.short_window - 1:-1].mean(),
+            'MA20': close[-self.long_window - 1:-1].mean()
+        }
+        return latest, prev
     
     def afternoon_strategy(self):
         """午盘策略"""
@@ -117,31 +211,42 @@ class MovingAverageStrategy(StrategyTemplate):
     def risk_management(self):
         """风险管理"""
         """检查止损止盈"""
-        for stock_code, position in self.positions.items():
+        if not self.positions:
+            return
+        
+        start_time = time.perf_counter()
+        
+        # 持仓表：每行一个持仓
+        codes = list(self.positions.keys())
+        buy_prices = np.array([self.positions[code]['price'] for code in codes], dtype=float)
+        
+        # 每次检查只获取一次全市场快照，所有持仓的价格一次性对齐
+        current_prices = self.get_current_prices(codes)
+        if current_prices is None:
+            return
+        current_prices = current_prices.to_numpy(dtype=float)
+        
+        # 计算收益率，没有价格的持仓收益率为NaN，不会触发任何条件
+        with np.errstate(invalid='ignore'):
+            return_rates = (current_prices - buy_prices) / buy_prices
+            stop_mask = return_rates <= -self.stop_loss
+            profit_mask = ~stop_mask & (return_rates >= self.take_profit)
+        
+        # 只对触发条件的持仓下单，遍历索引而不是持仓字典，卖出时删除持仓不影响遍历
+        for i in np.nonzero(stop_mask | profit_mask)[0]:
+            stock_code = codes[i]
             try:
-                # 获取当前价格
-                current_price = self.get_current_price(stock_code)
-                if current_price is None:
-                    continue
-                
-                buy_price = position['price']
-                quantity = position['quantity']
-                
-                # 计算收益率
-                return_rate = (current_price - buy_price) / buy_price
-                
-                # 止损检查
-                if return_rate <= -self.stop_loss:
-                    print(f"触发止损: {stock_code}, 收益率: {return_rate:.2%}")
-                    self.execute_sell(stock_code, current_price, "止损")
-                
-                # 止盈检查
-                elif return_rate >= self.take_profit:
-                    print(f"触发止盈: {stock_code}, 收益率: {return_rate:.2%}")
-                    self.execute_sell(stock_code, current_price, "止盈")
-                    
+                if stop_mask[i]:
+                    print(f"触发止损: {stock_code}, 收益率: {return_rates[i]:.2%}")
+                    self.execute_sell(stock_code, current_prices[i], "止损")
+                else:
+                    print(f"触发止盈: {stock_code}, 收益率: {return_rates[i]:.2%}")
+                    self.execute_sell(stock_code, current_prices[i], "止盈")
             except Exception as e:
                 print(f"风险管理检查 {stock_code} 时出错: {e}")
+        
+        elapsed = (time.perf_counter() - start_time) * 1000
+        print(f"风控检查完成: {len(codes)} 个持仓, 触发 {int((stop_mask | profit_mask).sum())} 个, 耗时 {elapsed:.1f} 毫秒")
     
     def check_buy_signal(self, latest, prev, stock_code):
         """检查买入信号"""
@@ -154,7 +259,7 @@ class MovingAverageStrategy(StrategyTemplate):
             prev['MA5'] <= prev['MA20']):
             
             # 额外条件：成交量放大
-            volume_ratio = latest['volume'] / data['volume'].rolling(10).mean().iloc[-1]
+            volume_ratio = latest['volume'] / latest['VOL_MA10']
             if volume_ratio > 1.2:  # 成交量比10日均量大20%
                 print(f"发现买入信号: {stock_code}")
                 return True
@@ -254,21 +359,55 @@ class MovingAverageStrategy(StrategyTemplate):
         
         return None
     
+    def fetch_history(self, stock_code, start_date, end_date):
+        """下载日线数据并整理为本地K线库的格式
+        
+        Returns:
+            pandas.DataFrame: 包含trade_date、open、close、high、low、volume、amount列
+        """
+        data = ak.stock_zh_a_hist(symbol=stock_code, start_date=start_date, end_date=end_date)
+        if data is None or data.empty:
+            return None
+        
+        data = data.rename(columns={'日期': 'trade_date', '开盘': 'open', '收盘': 'close', '最高': 'high',
+                                    '最低': 'low', '成交量': 'volume', '成交额': 'amount'})
+        data['trade_date'] = pd.to_datetime(data['trade_date']).dt.strftime('%Y%m%d')
+        return data[['trade_date', 'open', 'close', 'high', 'low', 'volume', 'amount']]
+    
     def get_current_price(self, stock_code):
         """获取当前股价"""
         try:
-            # 获取实时行情
-            realtime_data = ak.stock_zh_a_spot_em()
-            stock_info = realtime_data[realtime_data['代码'] == stock_code]
-            
-            if not stock_info.empty:
-                return float(stock_info.iloc[0]['最新价'])
+            # 从共享快照的代码索引中直接查找
+            row = self.snapshot_cache.get_row(stock_code)
+            if row is not None:
+                return float(row['最新价'])
                 
         except Exception as e:
             print(f"获取实时价格失败: {stock_code}, 错误: {e}")
         
         return None
     
+    def get_current_prices(self, stock_codes):
+        """获取一组股票的当前股价
+        
+        Args:
+            stock_codes: 股票代码列表
+            
+        Returns:
+            pandas.Series: 按输入顺序排列的最新价，找不到的股票为NaN；获取失败时返回None
+        """
+        try:
+            # 强制刷新，保证每次风控检查使用最新的一份快照
+            realtime_data = self.snapshot_cache.refresh(force=True)
+            prices = pd.to_numeric(realtime_data.set_index('代码')['最新价'], errors='coerce')
+            prices = prices[~prices.index.duplicated()]
+            return prices.reindex(stock_codes)
+            
+        except Exception as e:
+            print(f"获取实时价格失败: {e}")
+        
+        return None
+    
     def send_notification(self, message):
         """发送通知（可以扩展为微信、邮件等）"""
         timestamp = dt.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
@@ -6,6 +6,8 @@
 基于beautiful_stock_visualizer.py扩展
 """
 
+# 最先导入，启动耗时从这里开始计
+from lazy_imports import is_available, lazy_import, load_pyplot, preload, startup_timer
 import sys
 import os
 import time
@@ -14,48 +16,34 @@ import threading
 from datetime import datetime, timedelta
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
-import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from matplotlib.figure import Figure
-import matplotlib.dates as mdates
-from matplotlib.patches import Rectangle
 import warnings
 warnings.filterwarnings('ignore')
 
-# 设置中文字体
-plt.rcParams['font.sans-serif'] = ['SimHei', 'Microsoft YaHei']
-plt.rcParams['axes.unicode_minus'] = False
+# pandas、绘图库、交易模块和数据源都在第一次使用时才导入，窗口可以先显示出来
+pd = lazy_import('pandas')
+np = lazy_import('numpy')
+indicators = lazy_import('indicators')
+kline_chart = lazy_import('kline_chart')
 
-# 尝试导入交易相关模块
-try:
-    import easytrader
-    EASYTRADER_AVAILABLE = True
-except ImportError:
-    EASYTRADER_AVAILABLE = False
+# 检查交易相关模块是否已安装，只查找不导入
+EASYTRADER_AVAILABLE = is_available('easytrader')
+easytrader = lazy_import('easytrader')
+if not EASYTRADER_AVAILABLE:
     print("警告: easytrader未安装，交易功能将不可用")
 
-try:
-    import easyquant
-    from easyquant import StrategyTemplate, DefaultLogHandler
-    EASYQUANT_AVAILABLE = True
-except ImportError:
-    EASYQUANT_AVAILABLE = False
+EASYQUANT_AVAILABLE = is_available('easyquant')
+easyquant = lazy_import('easyquant')
+if not EASYQUANT_AVAILABLE:
     print("警告: easyquant未安装，量化策略功能将不可用")
 
-# 尝试导入数据源
-try:
-    import akshare as ak
-    AKSHARE_AVAILABLE = True
-except ImportError:
-    AKSHARE_AVAILABLE = False
+# 检查数据源
+AKSHARE_AVAILABLE = is_available('akshare')
+ak = lazy_import('akshare')
 
-try:
-    import adata
-    ADATA_AVAILABLE = True
-except ImportError:
-    ADATA_AVAILABLE = False
+ADATA_AVAILABLE = is_available('adata')
+adata = lazy_import('adata')
+
+startup_timer.mark("模块导入")
 
 class TradingStockVisualizer:
     """股票可视化分析与交易工具主类"""
@@ -75,6 +63,7 @@ class TradingStockVisualizer:
         self.current_stock_code = None
         self.current_stock_data = None
         self.hot_stocks_data = None
+        self.kline_chart = None  # K线图在第一次显示时创建
         
         # 创建界面
         self.create_widgets()
@@ -82,6 +71,7 @@ class TradingStockVisualizer:
         
         # 检查数据源和交易模块可用性
         self.check_modules_availability()
+        startup_timer.mark("界面创建")
     
     def check_modules_availability(self):
         """检查模块可用性"""
@@ -499,49 +489,16 @@ class TradingStockVisualizer:
             self.load_stock_data(stock_code)
     
     def update_chart_display(self):
-        """更新K线图显示"""
+        """更新K线图显示：图表只创建一次，之后只替换K线数据"""
         if self.current_stock_data is None:
             return
         
-        # 清空现有图表
-        for widget in self.chart_frame.winfo_children():
-            widget.destroy()
-        
-        # 创建图表
-        fig = Figure(figsize=(12, 8), dpi=100)
-        ax = fig.add_subplot(111)
-        
-        # 绘制K线图
-        data = self.current_stock_data.tail(60)  # 显示最近60天
-        
-        for i, (_, row) in enumerate(data.iterrows()):
-            open_price = row['开盘']
-            close_price = row['收盘']
-            high_price = row['最高']
-            low_price = row['最低']
-            
-            # 确定颜色
-            color = 'red' if close_price >= open_price else 'green'
-            
-            # 绘制影线
-            ax.plot([i, i], [low_price, high_price], color='black', linewidth=0.5)
-            
-            # 绘制实体
-            height = abs(close_price - open_price)
-            bottom = min(open_price, close_price)
-            rect = Rectangle((i-0.3, bottom), 0.6, height, 
-                           facecolor=color, alpha=0.7)
-            ax.add_patch(rect)
-        
-        ax.set_title(f"{self.current_stock_code} K线图")
-        ax.set_xlabel("时间")
-        ax.set_ylabel("价格")
-        ax.grid(True, alpha=0.3)
-        
-        # 嵌入到tkinter
-        canvas = FigureCanvasTkAgg(fig, self.chart_frame)
-        canvas.draw()
-        canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        if self.kline_chart is None:
+            self.kline_chart = kline_chart.KLineChart(
+                self.chart_frame, bars=60, show_volume=False, ma_windows=(),
+                column_map=indicators.CHINESE_COLUMNS, up_color='red', down_color='green',
+                figsize=(12, 8), facecolor='white', xlabel="时间", ylabel="价格")
+        self.kline_chart.update(self.current_stock_data, title=f"{self.current_stock_code} K线图")
     
     def update_indicators_display(self):
         """更新技术指标显示"""
@@ -552,20 +509,10 @@ class TradingStockVisualizer:
         for widget in self.indicators_frame.winfo_children():
             widget.destroy()
         
-        # 计算技术指标
-        data = self.current_stock_data.copy()
-        
-        # 计算移动平均线
-        data['MA5'] = data['收盘'].rolling(window=5).mean()
-        data['MA10'] = data['收盘'].rolling(window=10).mean()
-        data['MA20'] = data['收盘'].rolling(window=20).mean()
-        
-        # 计算RSI
-        delta = data['收盘'].diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
-        rs = gain / loss
-        data['RSI'] = 100 - (100 / (1 + rs))
+        # 计算技术指标（同一股票数据未变化时直接使用缓存）
+        data = indicators.calculate_indicators(self.current_stock_data, symbol=self.current_stock_code,
+                                               ma_windows=(5, 10, 20),
+                                               column_map=indicators.CHINESE_COLUMNS)
         
         # 显示最新指标值
         latest = data.iloc[-1]
@@ -762,8 +709,19 @@ class TradingStockVisualizer:
         
         trade_tree.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
     
+    def preload_modules(self):
+        """窗口显示后在后台导入绘图库、数据处理库和数据源"""
+        modules = [load_pyplot, pd, np, indicators, kline_chart]
+        if AKSHARE_AVAILABLE:
+            modules.append(ak)
+        preload(*modules)
+    
     def run(self):
         """运行主程序"""
+        # 窗口显示后打印启动耗时（设置STARTUP_TIMING=1），再在后台预加载其余模块
+        startup_timer.report_when_shown(self.root)
+        self.root.after(100, self.preload_modules)
+        
         self.root.mainloop()
 
 def main():
@@ -0,0 +1,157 @@
+import os
+import time
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Tushare API客户端封装
+# 所有Tushare调用经过同一个令牌桶限流，按账号的每分钟配额发放请求，
+# 并通过有界线程池并发执行，遇到限流或网络错误时按指数退避重试
+
+# 默认每分钟调用次数，可通过环境变量TUSHARE_CALLS_PER_MINUTE按账号积分调整
+DEFAULT_CALLS_PER_MINUTE = int(os.environ.get('TUSHARE_CALLS_PER_MINUTE', 200))
+
+# Tushare的错误都以普通Exception抛出，只能按错误信息区分；
+# 包含这些关键词的是每分钟限流，等一会儿即可恢复
+RATE_LIMIT_KEYWORDS = ('每分钟', '频率', '频繁', 'rate limit', 'too many')
+
+_shared_buckets = {}
+_shared_buckets_lock = threading.Lock()
+
+
+class TokenBucket:
+    def __init__(self, calls_per_minute=DEFAULT_CALLS_PER_MINUTE, burst=None):
+        """初始化令牌桶
+
+        Args:
+            calls_per_minute: 每分钟允许的调用次数
+            burst: 桶容量，即允许的瞬时突发次数，默认为5秒的配额
+        """
+        self.rate = calls_per_minute / 60.0
+        self.capacity = burst or max(1, int(self.rate * 5))
+        self.tokens = float(self.capacity)
+        self.last_refill = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """获取一个令牌，令牌不足时阻塞等待"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.rate)
+                self.last_refill = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+def get_shared_bucket(key, calls_per_minute=DEFAULT_CALLS_PER_MINUTE):
+    """获取按账号共享的令牌桶，同一进程内使用同一token的所有客户端共用一个配额"""
+    with _shared_buckets_lock:
+        bucket = _shared_buckets.get(key)
+        if bucket is None:
+            bucket = TokenBucket(calls_per_minute)
+            _shared_buckets[key] = bucket
+        return bucket
+
+
+def is_retryable(error):
+    """判断调用失败是否值得重试：只重试限流和网络/超时错误
+
+    token错误、没有接口权限、参数错误、每日配额用完等重试也不会成功，应立即抛出
+    """
+    # requests的连接错误和超时都继承自OSError
+    if isinstance(error, (OSError, TimeoutError)):
+        return True
+    message = str(error).lower()
+    return any(keyword in message for keyword in RATE_LIMIT_KEYWORDS)
+
+
+class TushareClient:
+    def __init__(self, pro, token=None, calls_per_minute=DEFAULT_CALLS_PER_MINUTE,
+                 max_workers=8, max_retries=3, backoff=1.0):
+        """初始化Tushare客户端
+
+        用法与ts.pro_api()返回的对象一致，例如 client.daily(ts_code='000001.SZ')，
+        每次调用都会先从令牌桶获取令牌。
+
+        Args:
+            pro: ts.pro_api()返回的原始接口对象
+            token: Tushare Pro的API token，用于在同一账号的客户端间共享配额
+            calls_per_minute: 账号每分钟的调用配额
+            max_workers: 并发线程数上限
+            max_retries: 单次调用遇到限流或网络错误后的最大重试次数
+            backoff: 重试退避的基础秒数，每次重试翻倍
+        """
+        self.pro = pro
+        self.bucket = get_shared_bucket(token or id(pro), calls_per_minute)
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+    def call(self, api_name, **kwargs):
+        """限流并带重试地调用一个Tushare接口
+
+        Args:
+            api_name: 接口名称，如'daily'、'stock_basic'
+            **kwargs: 接口参数
+        """
+        for attempt in range(self.max_retries + 1):
+            self.bucket.acquire()
+            try:
+                return getattr(self.pro, api_name)(**kwargs)
+            except Exception as e:
+                if attempt >= self.max_retries or not is_retryable(e):
+                    raise
+                wait = self.backoff * (2 ** attempt) + random.uniform(0, self.backoff)
+                print(f"调用 {api_name} 失败: {e}，{wait:.1f} 秒后重试 ({attempt + 1}/{self.max_retries})")
+                time.sleep(wait)
+
+    def __getattr__(self, name):
+        # 只代理公开接口名，避免拦截内部属性
+        if name.startswith('_'):
+            raise AttributeError(name)
+
+        def api(**kwargs):
+            return self.call(name, **kwargs)
+
+        api.__name__ = name
+        return api
+
+    def _get_executor(self):
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                    thread_name_prefix='tushare')
+            return self._executor
+
+    def submit(self, func, *args, **kwargs):
+        """把任务提交到线程池，返回Future"""
+        return self._get_executor().submit(func, *args, **kwargs)
+
+    def map(self, func, items):
+        """在线程池中并发执行func(item)，按输入顺序返回结果
+
+        func内部的Tushare调用依然经过令牌桶，所以并发数不会突破账号配额；
+        单个任务失败时对应结果为None，不影响其他任务。
+        """
+        futures = [self.submit(func, item) for item in items]
+        results = []
+        for item, future in zip(items, futures):
+            try:
+                results.append(future.result())
+            except Exception as e:
+                print(f"处理 {item} 失败: {e}")
+                results.append(None)
+        return results
+
+    def shutdown(self):
+        """关闭线程池"""
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
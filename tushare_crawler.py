@@ -1,8 +1,9 @@
 import tushare as ts
 import pandas as pd
 import os
-from datetime import datetime
-import time
+from datetime import datetime, timedelta
+from bar_store import BarStore, next_day
+from tushare_client import TushareClient
 
 # Tushare Pro API示例
 # 注意：使用前需要在tushare.pro网站注册并获取token
@@ -21,12 +22,16 @@ class TushareCrawler:
         # 确保输出目录存在
         if not os.path.exists(self.output_dir):
             os.makedirs(self.output_dir)
+        
+        # 本地K线库，日线数据按股票/年份分区保存，只增量拉取缺失部分
+        self.bar_store = BarStore(os.path.join(self.output_dir, 'bars'))
     
     def login(self):
         """登录Tushare Pro API"""
         if self.token:
             ts.set_token(self.token)
-            self.pro = ts.pro_api()
+            # 所有接口调用经过限流客户端，按账号配额并发执行
+            self.pro = TushareClient(ts.pro_api(), token=self.token)
             print("成功登录Tushare Pro API")
             return True
         else:
@@ -54,6 +59,9 @@ class TushareCrawler:
     def get_daily_data(self, ts_code, start_date=None, end_date=None):
         """获取股票日线数据
         
+        数据保存在本地K线库中，只从Tushare拉取本地尚未同步的区间，
+        然后从本地库读取整个请求区间返回。
+        
         Args:
             ts_code: 股票代码（格式：000001.SZ）
             start_date: 开始日期（格式：YYYYMMDD）
@@ -71,13 +79,15 @@ class TushareCrawler:
             start_date = (datetime.now().replace(day=1)).strftime('%Y%m%d')
         
         try:
-            df = self.pro.daily(ts_code=ts_code, start_date=start_date, end_date=end_date)
-            # 保存数据
-            file_name = f"{ts_code.replace('.', '_')}_{start_date}_{end_date}.csv"
-            file_path = os.path.join(self.output_dir, file_name)
-            df.to_csv(file_path, index=False, encoding='utf-8-sig')
-            print(f"{ts_code} 的日线数据已保存至 {file_path}")
-            return df
+            # 只拉取本地库中缺失的区间
+            for fetch_start, fetch_end in self.bar_store.missing_ranges(ts_code, start_date, end_date):
+                fetched = self.pro.daily(ts_code=ts_code, start_date=fetch_start, end_date=fetch_end)
+                self.bar_store.write(ts_code, fetched, fetch_start, fetch_end)
+            
+            df = self.bar_store.read(ts_code, start_date, end_date)
+            print(f"{ts_code} 的日线数据已同步至本地K线库，共 {len(df)} 条")
+            # 与pro.daily保持一致，按日期降序返回
+            return df.iloc[::-1].reset_index(drop=True)
         except Exception as e:
             print(f"获取 {ts_code} 的日线数据失败: {e}")
             return None
@@ -159,17 +169,23 @@ class TushareCrawler:
             print(f"获取 {index_code} 的指数数据失败: {e}")
             return None
 
-    def batch_download_stock_data(self, stock_list=None, days=30):
+    def batch_download_stock_data(self, stock_list=None, days=30, mode='by_code'):
         """批量下载多只股票的历史数据
         
         Args:
             stock_list: 股票代码列表，如果为None则下载所有A股
             days: 获取天数
+            mode: 下载方式，'by_code' 逐只股票下载，'by_date' 按交易日下载全市场截面
         """
         if not self.pro:
             print("请先登录Tushare Pro API")
             return
         
+        if mode == 'by_date':
+            # 按交易日下载时每次请求都覆盖全市场，不需要先获取股票列表
+            self.batch_download_by_date(stock_list, days)
+            return
+        
         # 如果未提供股票列表，获取所有A股
         if not stock_list:
             all_stocks = self.get_stock_list()
@@ -182,19 +198,94 @@ class TushareCrawler:
         # 简单处理，获取近N天数据
         start_date = (datetime.now().replace(day=1)).strftime('%Y%m%d')
         
-        # 批量下载
-        success_count = 0
-        for i, ts_code in enumerate(stock_list):
-            try:
-                print(f"[{i+1}/{len(stock_list)}] 正在下载 {ts_code} 的数据...")
-                self.get_daily_data(ts_code, start_date, end_date)
-                success_count += 1
-                # 避免请求过于频繁
-                time.sleep(0.5)
-            except Exception as e:
-                print(f"下载 {ts_code} 的数据失败: {e}")
+        # 批量并发下载，请求频率由客户端的令牌桶控制
+        def download(ts_code):
+            return self.get_daily_data(ts_code, start_date, end_date)
+        
+        print(f"正在并发下载 {len(stock_list)} 只股票的数据...")
+        results = self.pro.map(download, stock_list)
+        success_count = sum(1 for df in results if df is not None)
         
         print(f"批量下载完成，成功下载 {success_count}/{len(stock_list)} 只股票的数据")
+    
+    def batch_download_by_date(self, stock_list=None, days=30):
+        """按交易日下载全市场日线截面，并拆分写入本地K线库
+        
+        pro.daily支持按trade_date一次返回全市场数据，回补N天只需要约N次请求，
+        而不是每只股票一次请求。
+        
+        Args:
+            stock_list: 只保留这些股票的数据，为None则保留全市场
+            days: 回补的自然日天数
+        """
+        if not self.pro:
+            print("请先登录Tushare Pro API")
+            return
+        
+        end_date = datetime.now().strftime('%Y%m%d')
+        start_date = (datetime.now() - timedelta(days=days)).strftime('%Y%m%d')
+        
+        try:
+            # 多取几天交易日历，用于确定窗口前一个交易日
+            cal_start = (datetime.now() - timedelta(days=days + 15)).strftime('%Y%m%d')
+            cal = self.pro.trade_cal(exchange='SSE', start_date=cal_start, end_date=end_date, is_open='1')
+            open_dates = sorted(cal['cal_date'].astype(str).tolist())
+        except Exception as e:
+            print(f"获取交易日历失败: {e}")
+            return
+        
+        window_dates = [d for d in open_dates if d >= start_date]
+        synced_dates = self.bar_store.get_synced_market_dates()
+        pending_dates = [d for d in window_dates if d not in synced_dates]
+        if not pending_dates:
+            print("本地K线库已包含该区间内所有交易日的数据")
+            return
+        
+        # 并发拉取各交易日的全市场截面
+        def download(trade_date):
+            print(f"正在下载 {trade_date} 的全市场数据...")
+            return self.pro.daily(trade_date=trade_date)
+        
+        frames = []
+        fetched_dates = []
+        for trade_date, df in zip(pending_dates, self.pro.map(download, pending_dates)):
+            if df is not None and not df.empty:
+                frames.append(df)
+                fetched_dates.append(trade_date)
+        
+        if not frames:
+            print("没有下载到任何数据")
+            return
+        
+        data = pd.concat(frames, ignore_index=True)
+        if stock_list:
+            data = data[data['ts_code'].isin(stock_list)]
+        
+        # 下载失败或为空的交易日不能记为已同步：按交易日历把成功的日期分成连续的段，每段单独写入
+        positions = {d: i for i, d in enumerate(open_dates)}
+        runs = []
+        for trade_date in fetched_dates:
+            if runs and positions[trade_date] == positions[runs[-1][-1]] + 1:
+                runs[-1].append(trade_date)
+            else:
+                runs.append([trade_date])
+        
+        trade_dates = data['trade_date'].astype(str)
+        written = set()
+        for run in runs:
+            # 截面覆盖区间从上一个交易日的次日开始，这样能与已同步的区间衔接
+            position = positions[run[0]]
+            coverage_start = next_day(open_dates[position - 1]) if position > 0 else run[0]
+            part = data[trade_dates.isin(run)]
+            self.bar_store.write_cross_sections(part, coverage_start, run[-1])
+            written.update(part['ts_code'].unique())
+        count = len(written)
+        
+        # 只有保留全市场时，才能把这些交易日记为已整体同步
+        if not stock_list:
+            self.bar_store.mark_market_dates(fetched_dates)
+        
+        print(f"按交易日下载完成，{len(fetched_dates)} 个交易日，共写入 {count} 只股票的数据")
 
 
 def main():
@@ -240,14 +331,16 @@ def main():
             crawler.get_financial_data(ts_code, period or None)
         elif choice == '5':
             num = input("请输入要下载的股票数量(留空则下载所有): ")
+            mode_choice = input("请选择下载方式(1: 按股票逐只下载, 2: 按交易日下载全市场，默认1): ")
+            mode = 'by_date' if mode_choice == '2' else 'by_code'
             if num:
                 # 获取股票列表的前N只
                 stock_list = crawler.get_stock_list()
                 if stock_list is not None:
                     stock_list = stock_list['ts_code'].head(int(num)).tolist()
-                    crawler.batch_download_stock_data(stock_list)
+                    crawler.batch_download_stock_data(stock_list, mode=mode)
             else:
-                crawler.batch_download_stock_data()
+                crawler.batch_download_stock_data(mode=mode)
         elif choice == '0':
             print("程序已退出")
             break
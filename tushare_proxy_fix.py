@@ -6,6 +6,7 @@ import urllib3
 from datetime import datetime
 import time
 import argparse
+from tushare_client import TushareClient
 
 """
 Tushare代理问题修复工具
@@ -92,10 +93,10 @@ class TushareProxyFix:
                 # 注意: 这里使用的是示例地址，实际上tushare可能没有公开的备用地址
                 # 这部分代码仅作为示例，实际使用时可能需要联系tushare官方获取备用地址
                 print("尝试使用备用API地址连接...")
-                self.pro = ts.pro_api(timeout=self.timeout)
+                self.pro = TushareClient(ts.pro_api(timeout=self.timeout), token=self.token)
             else:
                 # 使用标准地址但应用了其他修复方法
-                self.pro = ts.pro_api(timeout=self.timeout)
+                self.pro = TushareClient(ts.pro_api(timeout=self.timeout), token=self.token)
             
             print("成功登录Tushare Pro API")
             return True
@@ -104,7 +105,7 @@ class TushareProxyFix:
             print("\n尝试备用连接方式...")
             try:
                 # 增加超时时间的备用连接
-                self.pro = ts.pro_api(timeout=self.timeout * 2)
+                self.pro = TushareClient(ts.pro_api(timeout=self.timeout * 2), token=self.token)
                 print("成功使用备用连接方式登录")
                 return True
             except Exception as e2:
@@ -0,0 +1,393 @@
+import os
+import re
+import math
+import time
+import threading
+import tkinter as tk
+from tkinter import ttk, messagebox
+from datetime import datetime
+import pandas as pd
+import indicators
+from market_snapshot import normalize_code
+
+# 自选股监控
+# 所有自选股共用一个调度器：每个刷新周期只取一次全市场快照（与单只股票的实时行情共用MarketSnapshotCache），
+# 从快照中批量取出各股票的行情，用StreamingIndicators增量更新当日K线的指标，
+# 只把显示内容有变化的行交给界面；界面只重绘可见的行，滚动到的行再补上最新值
+
+COLUMNS = ('code', 'name', 'price', 'pct_chg', 'MA5', 'MA10', 'MA20', 'RSI')
+HEADINGS = ('代码', '名称', '最新价', '涨跌幅', 'MA5', 'MA10', 'MA20', 'RSI')
+COLUMN_WIDTHS = (80, 100, 80, 80, 80, 80, 80, 60)
+
+
+def _format_number(value, digits=2):
+    if value is None:
+        return '--'
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return '--'
+    if math.isnan(value):
+        return '--'
+    return f"{value:.{digits}f}"
+
+
+def live_bar(row):
+    """把快照中的一行行情转成当日K线，未开盘或停牌时返回None"""
+    try:
+        bar = {
+            'open': float(row['今开']),
+            'high': float(row['最高']),
+            'low': float(row['最低']),
+            'close': float(row['最新价']),
+            'vol': float(row['成交量']) / 100  # 快照单位为股，日线为手
+        }
+    except (KeyError, TypeError, ValueError):
+        return None
+    if bar['open'] <= 0 or bar['close'] <= 0:
+        return None
+    return bar
+
+
+class WatchlistScheduler:
+    def __init__(self, snapshot_cache, history_func=None, ma_windows=(5, 10, 20), warmup_per_tick=20,
+                 trading_day_func=None):
+        """初始化自选股刷新调度器
+
+        Args:
+            snapshot_cache: MarketSnapshotCache，所有自选股共用的全市场行情快照
+            history_func: 获取单只股票日线的函数，返回以日期为索引、包含open、high、low、close的DataFrame，
+                          用于初始化增量指标；为None时只显示行情
+            ma_windows: 均线周期
+            warmup_per_tick: 每个刷新周期最多为多少只股票获取历史数据，避免新加入大量股票时一次发出几百个请求
+            trading_day_func: 判断今天是否为交易日的函数（如TradeCalendar.is_trading_day），为None时只排除周末
+        """
+        self.snapshot_cache = snapshot_cache
+        self.history_func = history_func
+        self.ma_windows = ma_windows
+        self.warmup_per_tick = warmup_per_tick
+        self.trading_day_func = trading_day_func or (lambda: datetime.now().weekday() < 5)
+
+        self._lock = threading.Lock()
+        self.symbols = {}
+        self.tick_count = 0
+        self.last_tick_ms = 0.0
+
+    def add(self, codes):
+        """加入自选股
+
+        Returns:
+            list: 新加入的股票代码
+        """
+        added = []
+        with self._lock:
+            for code in codes:
+                code = normalize_code(code)
+                if code and code not in self.symbols:
+                    self.symbols[code] = {'streaming': None, 'values': None, 'warmed': False, 'display': None}
+                    added.append(code)
+        return added
+
+    def remove(self, codes):
+        """移除自选股"""
+        with self._lock:
+            for code in codes:
+                self.symbols.pop(normalize_code(code), None)
+
+    def codes(self):
+        with self._lock:
+            return list(self.symbols)
+
+    def _warm_up(self, code, state):
+        """用历史日线初始化该股票的增量指标，失败后不再重试"""
+        state['warmed'] = True
+        try:
+            df = self.history_func(code)
+        except Exception as e:
+            print(f"获取 {code} 历史数据失败: {e}")
+            return
+        if df is None or df.empty:
+            return
+        streaming = indicators.StreamingIndicators(ma_windows=self.ma_windows)
+        state['values'] = streaming.warm_up(df)
+        state['streaming'] = streaming
+
+    def format_row(self, code, row, values):
+        """生成Treeview中一行的显示内容"""
+        values = values or {}
+        name = row.get('名称', '') if row else ''
+        price = row.get('最新价') if row else None
+        pct = _format_number(row.get('涨跌幅') if row else None)
+        if pct != '--' and not pct.startswith('-'):
+            pct = '+' + pct
+        if pct != '--':
+            pct += '%'
+        return (code, str(name)[:6], _format_number(price), pct,
+                _format_number(values.get('MA5')), _format_number(values.get('MA10')),
+                _format_number(values.get('MA20')), _format_number(values.get('RSI'), 1))
+
+    def tick(self):
+        """执行一次刷新：取一次快照，增量更新指标
+
+        在工作线程中调用，同一时间只应有一次tick在执行
+
+        Returns:
+            dict: 显示内容有变化的股票代码到行内容的映射
+        """
+        start_time = time.perf_counter()
+        with self._lock:
+            items = list(self.symbols.items())
+        if not items:
+            return {}
+
+        # 整个自选股列表只取一次快照
+        rows = self.snapshot_cache.get_rows([code for code, _ in items])
+
+        budget = self.warmup_per_tick if self.history_func else 0
+        # 休市日（周末和节假日）的快照是上一交易日的行情，不能当作当日K线
+        trading_day = self.trading_day_func()
+        trade_date = pd.Timestamp(datetime.now().date())
+
+        changed = {}
+        for code, state in items:
+            if not state['warmed'] and budget > 0:
+                budget -= 1
+                self._warm_up(code, state)
+
+            row = rows.get(code)
+            if row is not None and state['streaming'] is not None and trading_day:
+                bar = live_bar(row)
+                if bar is not None:
+                    state['values'] = state['streaming'].update(bar, trade_date)
+
+            display = self.format_row(code, row, state['values'])
+            if display != state['display']:
+                state['display'] = display
+                changed[code] = display
+
+        self.tick_count += 1
+        self.last_tick_ms = (time.perf_counter() - start_time) * 1000
+        return changed
+
+
+class WatchlistWindow:
+    def __init__(self, parent, scheduler, loader, interval=60, path=None, on_select=None):
+        """创建自选股监控窗口
+
+        Args:
+            parent: 主窗口
+            scheduler: WatchlistScheduler
+            loader: BackgroundLoader，刷新在它的工作线程中执行
+            interval: 刷新间隔（秒）
+            path: 保存自选股列表的文件
+            on_select: 双击某只股票时的回调，参数为股票代码
+        """
+        self.scheduler = scheduler
+        self.loader = loader
+        self.interval = interval
+        self.path = path
+        self.on_select = on_select
+        self.running = False
+        self._after_id = None  # 下一次定时刷新
+        self._ticking = False  # 是否有刷新正在执行
+        self._refresh_soon = False  # 当前刷新结束后立即再刷新一次
+        self.pending = {}  # 不在可见区域、尚未重绘的行
+        self.order = {}
+
+        self.window = tk.Toplevel(parent)
+        self.window.title("自选股监控")
+        self.window.geometry("760x600")
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+
+        toolbar = ttk.Frame(self.window)
+        toolbar.pack(fill=tk.X, padx=10, pady=10)
+        ttk.Label(toolbar, text="股票代码:").pack(side=tk.LEFT)
+        self.code_entry = ttk.Entry(toolbar, width=30)
+        self.code_entry.pack(side=tk.LEFT, padx=5)
+        self.code_entry.bind('<Return>', lambda e: self.add_codes())
+        ttk.Button(toolbar, text="添加", command=self.add_codes).pack(side=tk.LEFT, padx=2)
+        ttk.Button(toolbar, text="删除选中", command=self.remove_selected).pack(side=tk.LEFT, padx=2)
+        self.toggle_btn = ttk.Button(toolbar, text="开始监控", command=self.toggle)
+        self.toggle_btn.pack(side=tk.LEFT, padx=2)
+
+        table_frame = ttk.Frame(self.window)
+        table_frame.pack(fill=tk.BOTH, expand=True, padx=10)
+        self.tree = ttk.Treeview(table_frame, columns=COLUMNS, show='headings')
+        for column, heading, width in zip(COLUMNS, HEADINGS, COLUMN_WIDTHS):
+            self.tree.heading(column, text=heading)
+            self.tree.column(column, width=width, anchor=tk.E if column not in ('code', 'name') else tk.W)
+        self.tree.tag_configure('up', foreground='#FF4444')
+        self.tree.tag_configure('down', foreground='#00AA00')
+        self.scrollbar = ttk.Scrollbar(table_frame, orient=tk.VERTICAL, command=self.tree.yview)
+        self.tree.configure(yscrollcommand=self.on_scroll)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.tree.bind('<Double-1>', self.on_double_click)
+
+        self.status_label = ttk.Label(self.window, text="自选股: 0 只")
+        self.status_label.pack(anchor=tk.W, padx=10, pady=5)
+
+        self.load()
+
+    def _insert_rows(self, codes):
+        for code in codes:
+            self.tree.insert('', tk.END, iid=code, values=self.scheduler.format_row(code, None, None))
+        self._reindex()
+
+    def _reindex(self):
+        self.order = {code: i for i, code in enumerate(self.tree.get_children())}
+        self.status_label.config(text=f"自选股: {len(self.order)} 只")
+
+    def load(self):
+        """从文件加载自选股列表"""
+        if not self.path or not os.path.exists(self.path):
+            return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            codes = f.read().split()
+        self._insert_rows(self.scheduler.add(codes))
+
+    def save(self):
+        """保存自选股列表"""
+        if not self.path:
+            return
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(self.scheduler.codes()))
+
+    def add_codes(self):
+        """添加输入框中的股票代码，多个代码用空格或逗号分隔"""
+        codes = [code for code in re.split(r'[\s,，]+', self.code_entry.get()) if code]
+        if not codes:
+            return
+        self._insert_rows(self.scheduler.add(codes))
+        self.code_entry.delete(0, tk.END)
+        self.save()
+        # 新股票尽快显示行情；正在刷新时等它结束后再刷新，不会同时执行两次
+        if self.running:
+            if self._ticking:
+                self._refresh_soon = True
+            else:
+                self.refresh()
+
+    def remove_selected(self):
+        selection = self.tree.selection()
+        if not selection:
+            return
+        self.scheduler.remove(selection)
+        for code in selection:
+            self.pending.pop(code, None)
+        self.tree.delete(*selection)
+        self._reindex()
+        self.save()
+
+    def toggle(self):
+        if self.running:
+            self.stop()
+        else:
+            self.start()
+
+    def start(self):
+        if not self.scheduler.codes():
+            messagebox.showwarning("警告", "请先添加自选股", parent=self.window)
+            return
+        self.running = True
+        self.toggle_btn.config(text="停止监控")
+        # 上一次的刷新还没结束时不再提交，它结束后会按间隔安排下一次
+        self.refresh()
+
+    def stop(self):
+        # 正在执行的刷新照常显示结果，只是不再安排下一次
+        self.running = False
+        self._refresh_soon = False
+        self._cancel_timer()
+        self.toggle_btn.config(text="开始监控")
+
+    def refresh(self):
+        """在后台执行一次调度器刷新，同一时间只有一次刷新在执行"""
+        if not self.running or self._ticking:
+            return
+        self._cancel_timer()
+        self._ticking = True
+        self.loader.submit('watchlist', self.scheduler.tick,
+                           on_done=self.apply_changes, on_error=self.on_refresh_error)
+
+    def _cancel_timer(self):
+        if self._after_id is not None:
+            self.window.after_cancel(self._after_id)
+            self._after_id = None
+
+    def _on_timer(self):
+        self._after_id = None
+        self.refresh()
+
+    def _schedule_next(self):
+        """一次刷新结束后安排下一次，任何时候最多只有一个定时器"""
+        self._ticking = False
+        self._cancel_timer()
+        if not self.running:
+            return
+        if self._refresh_soon:
+            self._refresh_soon = False
+            self.refresh()
+        else:
+            self._after_id = self.window.after(self.interval * 1000, self._on_timer)
+
+    def _visible_range(self):
+        first, last = self.tree.yview()
+        n = len(self.order)
+        return int(first * n), math.ceil(last * n) + 1
+
+    def _paint(self, code, values):
+        pct = values[3]
+        tags = ('up',) if pct.startswith('+') and pct != '+0.00%' else ('down',) if pct.startswith('-') else ()
+        self.tree.item(code, values=values, tags=tags)
+
+    def apply_changes(self, changed):
+        """只重绘有变化且在可见区域内的行，其余行留到滚动到时再重绘"""
+        start, end = self._visible_range()
+        painted = 0
+        for code, values in changed.items():
+            index = self.order.get(code)
+            if index is None:
+                continue
+            if start <= index < end:
+                self.pending.pop(code, None)
+                self._paint(code, values)
+                painted += 1
+            else:
+                self.pending[code] = values
+
+        self.status_label.config(
+            text=f"自选股: {len(self.order)} 只 | 本次变化 {len(changed)} 只，重绘 {painted} 行 | "
+                 f"耗时 {self.scheduler.last_tick_ms:.0f} ms | {datetime.now().strftime('%H:%M:%S')}")
+        self._schedule_next()
+
+    def on_refresh_error(self, e):
+        self.status_label.config(text=f"刷新失败: {str(e)[:30]}")
+        self._schedule_next()
+
+    def on_scroll(self, first, last):
+        """滚动时补上新进入可见区域的行"""
+        self.scrollbar.set(first, last)
+        if not self.pending:
+            return
+        start, end = self._visible_range()
+        for code in [code for code in self.pending if start <= self.order.get(code, -1) < end]:
+            self._paint(code, self.pending.pop(code))
+
+    def on_double_click(self, event):
+        selection = self.tree.selection()
+        if selection and self.on_select:
+            self.on_select(selection[0])
+
+    def close(self):
+        self.running = False
+        self._cancel_timer()
+        self.loader.cancel('watchlist')
+        self.save()
+        self.window.destroy()
+
+    def exists(self):
+        try:
+            return bool(self.window.winfo_exists())
+        except tk.TclError:
+            return False